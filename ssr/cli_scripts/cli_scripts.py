@@ -1,4 +1,4 @@
-import subprocess
+from ssr.utility.tool_runner import run_tool
 
 
 def to_shell_str(call_list):
@@ -13,7 +13,7 @@ def run_vissat_as_subprocess(config_fp, vissat_stereo_pipeline_fp, python_fp):
     extract_call = [python_fp, vissat_stereo_pipeline_fp]
     extract_call += ["--config_file", config_fp]
     print_call(extract_call)
-    subprocess.call(extract_call)
+    run_tool(extract_call, heavy=True)
 
 
 if __name__ == "__main__":
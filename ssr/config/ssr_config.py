@@ -1,7 +1,7 @@
 import toml
 import numpy as np
 from pydantic import BaseModel
-from typing import List, Union
+from typing import Dict, List, Union
 import os
 from ssr.utility.logging_extension import logger
 
@@ -57,19 +57,86 @@ class SSRConfig(BaseModel):
 
     meshing_backends: List[str]
     texturing_backends: List[str]
+    decimation_backends: List[str] = ["meshlab"]
 
     reconstruct_sfm_mvs: Union[bool, int]
     run_input_adapter: Union[bool, int]
     extract_msi_pan_image_pairs: Union[bool, int] = False
     use_consistent_msi_pan_extraction: Union[bool, int] = True
+    # If None, the number of cpus is used
+    image_extraction_max_processes: int = None
     pan_sharpening: Union[bool, int] = False
     depth_map_recovery: Union[bool, int]
+    # If None, the number of cpus is used
+    depth_map_recovery_max_processes: int = None
     skew_correction: Union[bool, int]
+    # If None, the number of cpus is used
+    skew_correction_max_processes: int = None
+    # If None, the cpus are evenly distributed among the processes
+    skew_correction_cv2_num_threads: int = None
+    # Fuse the (skew-free) depth maps instead of copying the fused point
+    # cloud of VisSat
+    depth_map_fusion: Union[bool, int] = False
+    # If None, the number of cpus is used
+    depth_map_fusion_max_processes: int = None
+    depth_map_fusion_min_num_consistent_views: int = 2
+    depth_map_fusion_max_reproj_error: float = 2.0
+    depth_map_fusion_max_depth_error: float = 0.01
+    # If None, the footprint of a depth map pixel is used
+    depth_map_fusion_voxel_size: float = None
 
     reconstruct_mesh: Union[bool, int]
     texture_mesh: Union[bool, int]
+    # Compute reduced meshes (levels of detail) of each meshing result
+    reduce_mesh: Union[bool, int] = False
+    # Ratio of the faces of each level of detail
+    mesh_lod_face_ratios: List[float] = [1.0, 0.25, 0.05, 0.01]
+    # Budget for running meshing and texturing tasks of different backends
+    # in parallel. If None, the number of cpus is used.
+    surface_reconstruction_num_cpus: int = None
+    # If None, the memory is not restricted
+    surface_reconstruction_memory_in_gb: float = None
+    # Resources reserved for each task. If None, each task uses all cpus
+    # (i.e. the tasks are executed sequentially).
+    surface_reconstruction_task_num_cpus: int = None
+    surface_reconstruction_task_memory_in_gb: float = 8.0
+
+    # If None, the AOI is not split into tiles
+    tile_size: float = None
+    tile_overlap: float = 50.0
+    # If None, all tiles are processed
+    tile_indices: List[int] = None
+    stitch_tile_meshes: Union[bool, int] = True
+    tile_seam_merge_distance: float = 0.3
 
     lazy: Union[bool, int] = False
+    # Skip (enabled) stages of the pipeline, whose inputs and parameters did
+    # not change since the last run (see StageGraph)
+    skip_unchanged_stages: Union[bool, int] = True
+    # If False, only the size and the modification time of the input files
+    # are used to detect changes
+    stage_manifest_hash_file_content: Union[bool, int] = False
+    # Cache parsed reconstructions (Colmap models) in the workspace
+    use_result_cache: Union[bool, int] = True
+    result_cache_max_size_in_mb: int = 1024
+    # Cache also parsed ply files (meshes, point clouds)
+    result_cache_ply_files: Union[bool, int] = False
+    # If False, only the size and the modification time of the input files
+    # are used to detect changes
+    result_cache_hash_file_content: Union[bool, int] = False
+    # Write the output of the external tools (OpenMVS, MVE, Colmap, ...) to
+    # log files in the workspace (see ToolRunner)
+    write_tool_logs: Union[bool, int] = True
+    # Timeouts (in seconds) per tool, e.g. {"ReconstructMesh": 36000}
+    tool_timeouts: Dict[str, float] = {}
+    # If None, the calls are not restricted
+    tool_default_timeout: float = None
+    # Maximum number of heavy tools (e.g. meshing or texturing) running at the
+    # same time. If None, the number is not restricted.
+    tool_max_num_heavy_calls: int = None
+    # Record the wall time, cpu time, peak memory and I/O of the pipeline
+    # stages and tool calls as trace in the workspace (see Telemetry)
+    write_telemetry: Union[bool, int] = True
 
     vis_sat_config: VisSatConfig = VisSatConfig()
 
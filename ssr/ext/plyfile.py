@@ -667,7 +667,7 @@ class PlyElement(object):
             self._data = _np.memmap(stream, dtype, "c", offset, self.count)
             # Fix stream position
             stream.seek(offset + self.count * dtype.itemsize)
-        else:
+        elif not self._read_bin_fixed_list_lengths(stream, byte_order):
             # A simple load is impossible.
             self._read_bin(stream, byte_order)
 
@@ -683,8 +683,10 @@ class PlyElement(object):
         else:
             if self._have_list:
                 # There are list properties, so serialization is
-                # slightly complicated.
-                self._write_bin(stream, byte_order)
+                # slightly complicated (unless all lists of a property have
+                # the same length).
+                if not self._write_bin_fixed_list_lengths(stream, byte_order):
+                    self._write_bin(stream, byte_order)
             else:
                 # no list properties, so serialization is
                 # straightforward.
@@ -762,6 +764,164 @@ class PlyElement(object):
                         "early end-of-file", self, k, prop
                     )
 
+    @staticmethod
+    def _list_len_field_name(prop):
+        return "__len_" + prop.name
+
+    def _fixed_list_dtype(self, byte_order, list_lengths, with_len_fields):
+        """
+        Return the numpy dtype of the element, if each list property has
+        the length given by list_lengths.  If with_len_fields is True, the
+        dtype contains also the length fields (i.e. the dtype describes the
+        binary representation in the PLY file).
+
+        """
+        fields = []
+        for prop in self.properties:
+            if isinstance(prop, PlyListProperty):
+                (len_t, val_t) = prop.list_dtype(byte_order)
+                if with_len_fields:
+                    fields.append((self._list_len_field_name(prop), len_t))
+                fields.append((prop.name, val_t, (list_lengths[prop.name],)))
+            else:
+                fields.append((prop.name, prop.dtype(byte_order)))
+        return _np.dtype(fields)
+
+    def _peek_list_lengths(self, stream, byte_order):
+        """
+        Return the list lengths of the first row of the element without
+        changing the stream position.  Return None if the lengths can not
+        be determined.
+
+        """
+        if self.count == 0 or not hasattr(stream, "seek"):
+            return None
+        if hasattr(stream, "seekable") and not stream.seekable():
+            return None
+
+        offset = stream.tell()
+        list_lengths = {}
+        try:
+            for prop in self.properties:
+                if isinstance(prop, PlyListProperty):
+                    (len_t, val_t) = prop.list_dtype(byte_order)
+                    len_dtype = _np.dtype(len_t)
+                    buf = stream.read(len_dtype.itemsize)
+                    if len(buf) < len_dtype.itemsize:
+                        return None
+                    n = int(_np.frombuffer(buf, len_dtype)[0])
+                    list_lengths[prop.name] = n
+                    stream.seek(n * _np.dtype(val_t).itemsize, 1)
+                else:
+                    stream.seek(_np.dtype(prop.dtype(byte_order)).itemsize, 1)
+        finally:
+            stream.seek(offset)
+        return list_lengths
+
+    def _read_bin_fixed_list_lengths(self, stream, byte_order):
+        """
+        Load a PLY element with list properties from a binary PLY file as
+        a single block, if all lists of a property have the same length
+        (e.g. the vertex indices of a triangle mesh).  In this case the
+        list properties are stored as fixed size sub-arrays (instead of
+        object arrays).  Return False if the lists are ragged, the stream
+        position is unchanged in this case.
+
+        """
+        list_lengths = self._peek_list_lengths(stream, byte_order)
+        if list_lengths is None:
+            return False
+        names = [prop.name for prop in self.properties]
+        for prop in self.properties:
+            if self._list_len_field_name(prop) in names:
+                return False
+
+        file_dtype = self._fixed_list_dtype(byte_order, list_lengths, True)
+        offset = stream.tell()
+        num_bytes = self.count * file_dtype.itemsize
+        buf = stream.read(num_bytes)
+        if len(buf) < num_bytes:
+            stream.seek(offset)
+            return False
+        file_data = _np.frombuffer(buf, file_dtype)
+
+        for prop in self.properties:
+            if isinstance(prop, PlyListProperty):
+                len_field = file_data[self._list_len_field_name(prop)]
+                if not _np.all(len_field == list_lengths[prop.name]):
+                    stream.seek(offset)
+                    return False
+
+        self._data = _np.empty(
+            self.count,
+            dtype=self._fixed_list_dtype(byte_order, list_lengths, False),
+        )
+        for name in names:
+            self._data[name] = file_data[name]
+        return True
+
+    def _get_fixed_length_lists(self):
+        """
+        Return a dict mapping the list property names to 2D arrays, if all
+        lists of each property have the same length.  Otherwise return None.
+
+        """
+        fixed_length_lists = {}
+        for prop in self.properties:
+            if not isinstance(prop, PlyListProperty):
+                continue
+            column = self.data[prop.name]
+            if column.dtype == object:
+                if len(column) == 0:
+                    return None
+                list_length = len(column[0])
+                for entry in column:
+                    if len(entry) != list_length:
+                        return None
+                column = _np.array(column.tolist()).reshape(
+                    (len(column), list_length)
+                )
+            else:
+                # Sub-array field (e.g. created with PlyElement.describe or
+                # _read_bin_fixed_list_lengths)
+                column = column.reshape((len(column), -1))
+            fixed_length_lists[prop.name] = column
+        return fixed_length_lists
+
+    def _write_bin_fixed_list_lengths(self, stream, byte_order):
+        """
+        Save a PLY element with list properties to a binary PLY file as a
+        single block, if all lists of a property have the same length.
+        Return False if the lists are ragged.
+
+        """
+        names = [prop.name for prop in self.properties]
+        for prop in self.properties:
+            if self._list_len_field_name(prop) in names:
+                return False
+        fixed_length_lists = self._get_fixed_length_lists()
+        if fixed_length_lists is None:
+            return False
+
+        list_lengths = dict(
+            (name, column.shape[1])
+            for (name, column) in fixed_length_lists.items()
+        )
+        file_data = _np.empty(
+            self.count,
+            dtype=self._fixed_list_dtype(byte_order, list_lengths, True),
+        )
+        for prop in self.properties:
+            if isinstance(prop, PlyListProperty):
+                file_data[self._list_len_field_name(prop)] = list_lengths[
+                    prop.name
+                ]
+                file_data[prop.name] = fixed_length_lists[prop.name]
+            else:
+                file_data[prop.name] = self.data[prop.name]
+        stream.write(file_data.view(_np.uint8).data)
+        return True
+
     def _write_bin(self, stream, byte_order):
         """
         Save a PLY element to a binary PLY file.  The element may
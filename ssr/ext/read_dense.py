@@ -32,6 +32,9 @@
 import numpy as np
 import struct
 
+# The dense array reader is shared with read_write_dense.py
+from ssr.ext.read_write_dense import read_array
+
 
 def write_next_bytes(fid, data, format_char_sequence, endian_character="<"):
     """pack and write to a binary file.
@@ -49,25 +52,6 @@ def write_next_bytes(fid, data, format_char_sequence, endian_character="<"):
     fid.write(bytes)
 
 
-def read_array(path):
-    with open(path, "rb") as fid:
-        width, height, channels = np.genfromtxt(
-            fid, delimiter="&", max_rows=1, usecols=(0, 1, 2), dtype=int
-        )
-        fid.seek(0)
-        num_delimiter = 0
-        byte = fid.read(1)
-        while True:
-            if byte == b"&":
-                num_delimiter += 1
-                if num_delimiter >= 3:
-                    break
-            byte = fid.read(1)
-        array = np.fromfile(fid, np.float32)
-    array = array.reshape((width, height, channels), order="F")
-    return np.transpose(array, (1, 0, 2)).squeeze()
-
-
 def test():
     import matplotlib.pyplot as plt
     import os
@@ -34,60 +34,146 @@
 import argparse
 import numpy as np
 import os
-import struct
+import tempfile
 
 
-def read_array(path):
+# The header of a Colmap dense array ("<width>&<height>&<channels>&") is
+# short, i.e. reading a bounded prefix of the file is sufficient to parse it.
+_MAX_HEADER_NUM_BYTES = 64
+
+
+def read_array_header(path):
+    """Parse the header with a single bounded read.
+
+    Returns the width, height, number of channels and the byte offset of the
+    (float32) payload.
+    """
     with open(path, "rb") as fid:
-        width, height, channels = np.genfromtxt(
-            fid, delimiter="&", max_rows=1, usecols=(0, 1, 2), dtype=int
+        header_bytes = fid.read(_MAX_HEADER_NUM_BYTES)
+    tokens = header_bytes.split(b"&", 3)
+    assert len(tokens) == 4, f"Invalid dense array header in {path}"
+    width, height, channels = [int(token) for token in tokens[:3]]
+    offset = len(header_bytes) - len(tokens[3])
+    return width, height, channels, offset
+
+
+def get_compressed_sidecar_path(path):
+    return path + ".npz"
+
+
+def _to_image_layout(array_chw):
+    # The payload is stored in column-major (width, height, channels) order,
+    # which corresponds to a row-major (channels, height, width) array. The
+    # transposition below creates a view (and not a copy) of the data.
+    return np.transpose(array_chw, (1, 2, 0)).squeeze()
+
+
+def read_array(path, mmap_mode="c"):
+    """Read a Colmap dense array (depth / normal map) with shape (H, W[, C]).
+
+    By default, the result is a view of a np.memmap. The default mode "c"
+    (copy-on-write) allows to modify the array in-place without changing
+    the file on disk. Use mmap_mode=None to load the data into memory.
+
+    If only a compressed sidecar file (written with write_array(...,
+    compress=True)) exists, the array is loaded from the sidecar file.
+    """
+    if not os.path.isfile(path) and os.path.isfile(
+        get_compressed_sidecar_path(path)
+    ):
+        with np.load(get_compressed_sidecar_path(path)) as npz_file:
+            return _to_image_layout(npz_file["data"])
+
+    width, height, channels, offset = read_array_header(path)
+    shape = (channels, height, width)
+    if mmap_mode is None:
+        array = np.fromfile(
+            path, dtype="<f4", count=width * height * channels, offset=offset
+        ).reshape(shape)
+    else:
+        array = np.memmap(
+            path, dtype="<f4", mode=mmap_mode, offset=offset, shape=shape
         )
-        fid.seek(0)
-        num_delimiter = 0
-        byte = fid.read(1)
-        while True:
-            if byte == b"&":
-                num_delimiter += 1
-                if num_delimiter >= 3:
-                    break
-            byte = fid.read(1)
-        array = np.fromfile(fid, np.float32)
-    array = array.reshape((width, height, channels), order="F")
-    return np.transpose(array, (1, 0, 2)).squeeze()
-
-
-def write_array(array, path):
+    return _to_image_layout(array)
+
+
+def read_array_window(path, row_start, row_end, col_start=0, col_end=None):
+    """Read only the rows / columns of the given window into memory."""
+    array = read_array(path, mmap_mode="r")
+    return np.array(array[row_start:row_end, col_start:col_end])
+
+
+def iter_array_row_blocks(path, block_height):
+    """Lazily yield (row_start, block) tuples of at most block_height rows."""
+    assert block_height > 0
+    array = read_array(path, mmap_mode="r")
+    height = array.shape[0]
+    for row_start in range(0, height, block_height):
+        row_end = min(row_start + block_height, height)
+        yield row_start, np.array(array[row_start:row_end])
+
+
+def _write_file_atomically(path, write_callback):
+    # Write to a temporary file in the target directory and rename it
+    # afterwards, i.e. readers never observe partially written arrays.
+    odp = os.path.dirname(os.path.abspath(path))
+    fd, temp_fp = tempfile.mkstemp(
+        dir=odp, prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as fid:
+            write_callback(fid)
+        # mkstemp() creates the file with mode 0600, use the permissions of
+        # open() (i.e. respect the umask) instead
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_fp, 0o666 & ~umask)
+        os.replace(temp_fp, path)
+    except BaseException:
+        if os.path.isfile(temp_fp):
+            os.remove(temp_fp)
+        raise
+
+
+def write_array(array, path, compress=False):
     """
     see: src/mvs/mat.h
         void Mat<T>::Write(const std::string& path)
+
+    If compress is True, the array is stored in a compressed sidecar file
+    (see get_compressed_sidecar_path()) instead of the Colmap format.
     """
     assert array.dtype == np.float32
     if len(array.shape) == 2:
         height, width = array.shape
         channels = 1
+        array_chw = array[np.newaxis, :, :]
     elif len(array.shape) == 3:
         height, width, channels = array.shape
+        array_chw = np.transpose(array, (2, 0, 1))
     else:
         assert False
 
-    with open(path, "w") as fid:
-        fid.write(str(width) + "&" + str(height) + "&" + str(channels) + "&")
-
-    with open(path, "ab") as fid:
-        if len(array.shape) == 2:
-            array_trans = np.transpose(array, (1, 0))
-        elif len(array.shape) == 3:
-            array_trans = np.transpose(array, (1, 0, 2))
-        else:
-            assert False
-        data_1d = array_trans.reshape(-1, order="F")
-        data_list = data_1d.tolist()
-        endian_character = "<"
-        format_char_sequence = "".join(["f"] * len(data_list))
-        byte_data = struct.pack(
-            endian_character + format_char_sequence, *data_list
+    # The Colmap layout corresponds to a row-major (channels, height, width)
+    # array, i.e. the payload can be written directly from this buffer.
+    data = np.ascontiguousarray(array_chw, dtype="<f4")
+
+    if compress:
+
+        def write_callback(fid):
+            np.savez_compressed(fid, data=data)
+
+        _write_file_atomically(
+            get_compressed_sidecar_path(path), write_callback
         )
-        fid.write(byte_data)
+    else:
+        header = str(width) + "&" + str(height) + "&" + str(channels) + "&"
+
+        def write_callback(fid):
+            fid.write(header.encode("ascii"))
+            fid.write(memoryview(data).cast("B"))
+
+        _write_file_atomically(path, write_callback)
 
 
 def parse_args():
@@ -56,6 +56,41 @@ class Image(BaseImage):
         return qvec2rotmat(self.qvec)
 
 
+# Columnar (struct of arrays) representation of a model. The 2D points of
+# image i are given by the rows point2D_offsets[i]:point2D_offsets[i + 1] of
+# xys / point3D_ids. Analogously, the track of point i is given by the rows
+# track_offsets[i]:track_offsets[i + 1] of image_ids / point2D_idxs.
+CameraTable = collections.namedtuple(
+    "CameraTable",
+    ["ids", "model_ids", "widths", "heights", "params_offsets", "params"],
+)
+ImageTable = collections.namedtuple(
+    "ImageTable",
+    [
+        "ids",
+        "qvecs",
+        "tvecs",
+        "camera_ids",
+        "names",
+        "point2D_offsets",
+        "xys",
+        "point3D_ids",
+    ],
+)
+Point3DTable = collections.namedtuple(
+    "Point3DTable",
+    [
+        "ids",
+        "xyzs",
+        "rgbs",
+        "errors",
+        "track_offsets",
+        "image_ids",
+        "point2D_idxs",
+    ],
+)
+
+
 CAMERA_MODELS = {
     CameraModel(model_id=0, model_name="SIMPLE_PINHOLE", num_params=3),
     CameraModel(model_id=1, model_name="PINHOLE", num_params=4),
@@ -252,47 +287,9 @@ def read_images_binary(path_to_model_file):
         void Reconstruction::ReadImagesBinary(const std::string& path)
         void Reconstruction::WriteImagesBinary(const std::string& path)
     """
-    images = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_reg_images = read_next_bytes(fid, 8, "Q")[0]
-        for image_index in range(num_reg_images):
-            binary_image_properties = read_next_bytes(
-                fid, num_bytes=64, format_char_sequence="idddddddi"
-            )
-            image_id = binary_image_properties[0]
-            qvec = np.array(binary_image_properties[1:5])
-            tvec = np.array(binary_image_properties[5:8])
-            camera_id = binary_image_properties[8]
-            image_name = ""
-            current_char = read_next_bytes(fid, 1, "c")[0]
-            while current_char != b"\x00":  # look for the ASCII 0 entry
-                image_name += current_char.decode("utf-8")
-                current_char = read_next_bytes(fid, 1, "c")[0]
-            num_points2D = read_next_bytes(
-                fid, num_bytes=8, format_char_sequence="Q"
-            )[0]
-            x_y_id_s = read_next_bytes(
-                fid,
-                num_bytes=24 * num_points2D,
-                format_char_sequence="ddq" * num_points2D,
-            )
-            xys = np.column_stack(
-                [
-                    tuple(map(float, x_y_id_s[0::3])),
-                    tuple(map(float, x_y_id_s[1::3])),
-                ]
-            )
-            point3D_ids = np.array(tuple(map(int, x_y_id_s[2::3])))
-            images[image_id] = Image(
-                id=image_id,
-                qvec=qvec,
-                tvec=tvec,
-                camera_id=camera_id,
-                name=image_name,
-                xys=xys,
-                point3D_ids=point3D_ids,
-            )
-    return images
+    return convert_image_table_to_images(
+        read_images_binary_columnar(path_to_model_file)
+    )
 
 
 def write_images_text(images, path):
@@ -392,36 +389,9 @@ def read_points3d_binary(path_to_model_file):
         void Reconstruction::ReadPoints3DBinary(const std::string& path)
         void Reconstruction::WritePoints3DBinary(const std::string& path)
     """
-    points3D = {}
-    with open(path_to_model_file, "rb") as fid:
-        num_points = read_next_bytes(fid, 8, "Q")[0]
-        for point_line_index in range(num_points):
-            binary_point_line_properties = read_next_bytes(
-                fid, num_bytes=43, format_char_sequence="QdddBBBd"
-            )
-            point3D_id = binary_point_line_properties[0]
-            xyz = np.array(binary_point_line_properties[1:4])
-            rgb = np.array(binary_point_line_properties[4:7])
-            error = np.array(binary_point_line_properties[7])
-            track_length = read_next_bytes(
-                fid, num_bytes=8, format_char_sequence="Q"
-            )[0]
-            track_elems = read_next_bytes(
-                fid,
-                num_bytes=8 * track_length,
-                format_char_sequence="ii" * track_length,
-            )
-            image_ids = np.array(tuple(map(int, track_elems[0::2])))
-            point2D_idxs = np.array(tuple(map(int, track_elems[1::2])))
-            points3D[point3D_id] = Point3D(
-                id=point3D_id,
-                xyz=xyz,
-                rgb=rgb,
-                error=error,
-                image_ids=image_ids,
-                point2D_idxs=point2D_idxs,
-            )
-    return points3D
+    return convert_point3D_table_to_points3D(
+        read_points3d_binary_columnar(path_to_model_file)
+    )
 
 
 def write_points3D_text(points3D, path):
@@ -484,6 +454,337 @@ def read_model(path, ext):
     return cameras, images, points3D
 
 
+def _compute_offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _gather_records(buffer_array, record_starts, record_lengths, dtype):
+    """Return the (variable length) records of the buffer as one array.
+
+    Record i consists of record_lengths[i] elements of the given dtype and
+    starts at the byte record_starts[i].
+    """
+    num_elements = int(np.sum(record_lengths))
+    element_offsets = _compute_offsets(record_lengths)
+    element_starts = (
+        np.repeat(
+            record_starts - element_offsets[:-1] * dtype.itemsize,
+            record_lengths,
+        )
+        + np.arange(num_elements, dtype=np.int64) * dtype.itemsize
+    )
+    # Copy the data byte by byte (i.e. with itemsize vectorized copies) to
+    # avoid creating an index for each byte of the result
+    element_bytes = np.empty((num_elements, dtype.itemsize), dtype=np.uint8)
+    for byte_index in range(dtype.itemsize):
+        element_bytes[:, byte_index] = buffer_array[
+            element_starts + byte_index
+        ]
+    return element_bytes.view(dtype).reshape(num_elements)
+
+
+def _find_list_records(
+    buffer, offset, num_records, fixed_num_bytes, element_num_bytes
+):
+    """Find the records of a binary Colmap file with a trailing list.
+
+    Each record consists of fixed_num_bytes, followed by the list length
+    (uint64) and the list elements. Only the length of each record is
+    unpacked, the remaining data is extracted with numpy.
+    """
+    list_length_struct = struct.Struct("<Q")
+    record_starts = []
+    list_lengths = []
+    for record_index in range(num_records):
+        record_starts.append(offset)
+        list_length = list_length_struct.unpack_from(
+            buffer, offset + fixed_num_bytes
+        )[0]
+        list_lengths.append(list_length)
+        offset += fixed_num_bytes + 8 + element_num_bytes * list_length
+    assert offset == len(buffer)
+    return (
+        np.array(record_starts, dtype=np.int64),
+        np.array(list_lengths, dtype=np.int64),
+    )
+
+
+def read_cameras_binary_columnar(path_to_model_file):
+    # The number of cameras is small, i.e. no special treatment is required
+    return convert_cameras_to_camera_table(
+        read_cameras_binary(path_to_model_file)
+    )
+
+
+def read_images_binary_columnar(path_to_model_file):
+    with open(path_to_model_file, "rb") as fid:
+        buffer = fid.read()
+    buffer_array = np.frombuffer(buffer, dtype=np.uint8)
+    num_reg_images = struct.unpack_from("<Q", buffer, 0)[0]
+    # Corresponds to the format "idddddddi"
+    image_dtype = np.dtype(
+        [
+            ("id", "<i4"),
+            ("qvec", "<f8", (4,)),
+            ("tvec", "<f8", (3,)),
+            ("camera_id", "<i4"),
+        ]
+    )
+    # Corresponds to the format "ddq"
+    point2D_dtype = np.dtype([("xy", "<f8", (2,)), ("point3D_id", "<i8")])
+
+    # The image names have a variable length, i.e. the images are located
+    # with a loop (the number of images is small compared to the number of
+    # 2D points)
+    offset = 8
+    image_starts = []
+    names = []
+    point2D_starts = []
+    num_points2D_list = []
+    for image_index in range(num_reg_images):
+        image_starts.append(offset)
+        offset += image_dtype.itemsize
+        name_end = buffer.index(b"\x00", offset)
+        names.append(buffer[offset:name_end].decode("utf-8"))
+        offset = name_end + 1
+        num_points2D = struct.unpack_from("<Q", buffer, offset)[0]
+        num_points2D_list.append(num_points2D)
+        point2D_starts.append(offset + 8)
+        offset += 8 + point2D_dtype.itemsize * num_points2D
+    assert offset == len(buffer)
+
+    image_data = _gather_records(
+        buffer_array,
+        np.array(image_starts, dtype=np.int64),
+        np.ones(num_reg_images, dtype=np.int64),
+        image_dtype,
+    )
+    num_points2D_array = np.array(num_points2D_list, dtype=np.int64)
+    # The 2D points of each image are stored contiguously
+    point2D_data = np.concatenate(
+        [
+            np.frombuffer(
+                buffer, point2D_dtype, count=num_points2D, offset=start
+            )
+            for start, num_points2D in zip(point2D_starts, num_points2D_list)
+        ]
+        + [np.empty(0, dtype=point2D_dtype)]
+    )
+    return ImageTable(
+        ids=image_data["id"].astype(np.int64),
+        qvecs=image_data["qvec"].astype(np.float64),
+        tvecs=image_data["tvec"].astype(np.float64),
+        camera_ids=image_data["camera_id"].astype(np.int64),
+        names=names,
+        point2D_offsets=_compute_offsets(num_points2D_array),
+        xys=point2D_data["xy"].astype(np.float64),
+        point3D_ids=point2D_data["point3D_id"].astype(np.int64),
+    )
+
+
+def read_points3d_binary_columnar(path_to_model_file):
+    with open(path_to_model_file, "rb") as fid:
+        buffer = fid.read()
+    buffer_array = np.frombuffer(buffer, dtype=np.uint8)
+    num_points = struct.unpack_from("<Q", buffer, 0)[0]
+    # Corresponds to the format "QdddBBBd"
+    point3D_dtype = np.dtype(
+        [
+            ("id", "<u8"),
+            ("xyz", "<f8", (3,)),
+            ("rgb", "u1", (3,)),
+            ("error", "<f8"),
+        ]
+    )
+    # Corresponds to the format "ii"
+    track_element_dtype = np.dtype(
+        [("image_id", "<i4"), ("point2D_idx", "<i4")]
+    )
+
+    point3D_starts, track_lengths = _find_list_records(
+        buffer,
+        8,
+        num_points,
+        point3D_dtype.itemsize,
+        track_element_dtype.itemsize,
+    )
+    point3D_data = _gather_records(
+        buffer_array,
+        point3D_starts,
+        np.ones(num_points, dtype=np.int64),
+        point3D_dtype,
+    )
+    track_data = _gather_records(
+        buffer_array,
+        point3D_starts + point3D_dtype.itemsize + 8,
+        track_lengths,
+        track_element_dtype,
+    )
+    return Point3DTable(
+        ids=point3D_data["id"].astype(np.int64),
+        xyzs=point3D_data["xyz"].astype(np.float64),
+        rgbs=point3D_data["rgb"].astype(np.uint8),
+        errors=point3D_data["error"].astype(np.float64),
+        track_offsets=_compute_offsets(track_lengths),
+        image_ids=track_data["image_id"].astype(np.int64),
+        point2D_idxs=track_data["point2D_idx"].astype(np.int64),
+    )
+
+
+def read_model_columnar(path, ext):
+    if ext == ".txt":
+        cameras, images, points3D = read_model(path, ext)
+        camera_table = convert_cameras_to_camera_table(cameras)
+        image_table = convert_images_to_image_table(images)
+        point3D_table = convert_points3D_to_point3D_table(points3D)
+    else:
+        camera_table = read_cameras_binary_columnar(
+            os.path.join(path, "cameras" + ext)
+        )
+        image_table = read_images_binary_columnar(
+            os.path.join(path, "images" + ext)
+        )
+        point3D_table = read_points3d_binary_columnar(
+            os.path.join(path, "points3D") + ext
+        )
+    return camera_table, image_table, point3D_table
+
+
+def convert_cameras_to_camera_table(cameras):
+    cameras = list(cameras.values())
+    params_list = [
+        np.asarray(camera.params, dtype=float) for camera in cameras
+    ]
+    return CameraTable(
+        ids=np.array([camera.id for camera in cameras], dtype=np.int64),
+        model_ids=np.array(
+            [CAMERA_MODEL_NAMES[camera.model].model_id for camera in cameras],
+            dtype=np.int64,
+        ),
+        widths=np.array([camera.width for camera in cameras], dtype=np.int64),
+        heights=np.array(
+            [camera.height for camera in cameras], dtype=np.int64
+        ),
+        params_offsets=_compute_offsets([len(p) for p in params_list]),
+        params=np.concatenate(params_list + [np.empty(0)]),
+    )
+
+
+def convert_camera_table_to_cameras(camera_table):
+    cameras = {}
+    offsets = camera_table.params_offsets
+    for index, camera_id in enumerate(camera_table.ids.tolist()):
+        cameras[camera_id] = Camera(
+            id=camera_id,
+            model=CAMERA_MODEL_IDS[
+                int(camera_table.model_ids[index])
+            ].model_name,
+            width=int(camera_table.widths[index]),
+            height=int(camera_table.heights[index]),
+            params=camera_table.params[offsets[index] : offsets[index + 1]],
+        )
+    return cameras
+
+
+def convert_images_to_image_table(images):
+    images = list(images.values())
+    xys_list = [np.asarray(image.xys, dtype=float) for image in images]
+    point3D_ids_list = [
+        np.asarray(image.point3D_ids, dtype=np.int64) for image in images
+    ]
+    return ImageTable(
+        ids=np.array([image.id for image in images], dtype=np.int64),
+        qvecs=np.array([image.qvec for image in images], dtype=float).reshape(
+            (-1, 4)
+        ),
+        tvecs=np.array([image.tvec for image in images], dtype=float).reshape(
+            (-1, 3)
+        ),
+        camera_ids=np.array(
+            [image.camera_id for image in images], dtype=np.int64
+        ),
+        names=[image.name for image in images],
+        point2D_offsets=_compute_offsets(
+            [len(point3D_ids) for point3D_ids in point3D_ids_list]
+        ),
+        xys=np.concatenate(
+            [xys.reshape((-1, 2)) for xys in xys_list] + [np.empty((0, 2))]
+        ),
+        point3D_ids=np.concatenate(
+            point3D_ids_list + [np.empty(0, dtype=np.int64)]
+        ),
+    )
+
+
+def convert_image_table_to_images(image_table):
+    images = {}
+    offsets = image_table.point2D_offsets.tolist()
+    for index, image_id in enumerate(image_table.ids.tolist()):
+        start = offsets[index]
+        end = offsets[index + 1]
+        images[image_id] = Image(
+            id=image_id,
+            qvec=image_table.qvecs[index],
+            tvec=image_table.tvecs[index],
+            camera_id=int(image_table.camera_ids[index]),
+            name=image_table.names[index],
+            xys=image_table.xys[start:end],
+            point3D_ids=image_table.point3D_ids[start:end],
+        )
+    return images
+
+
+def convert_points3D_to_point3D_table(points3D):
+    points3D = list(points3D.values())
+    image_ids_list = [
+        np.asarray(point3D.image_ids, dtype=np.int64) for point3D in points3D
+    ]
+    return Point3DTable(
+        ids=np.array([point3D.id for point3D in points3D], dtype=np.int64),
+        xyzs=np.array(
+            [point3D.xyz for point3D in points3D], dtype=float
+        ).reshape((-1, 3)),
+        rgbs=np.array(
+            [point3D.rgb for point3D in points3D], dtype=np.uint8
+        ).reshape((-1, 3)),
+        errors=np.array([point3D.error for point3D in points3D], dtype=float),
+        track_offsets=_compute_offsets(
+            [len(image_ids) for image_ids in image_ids_list]
+        ),
+        image_ids=np.concatenate(
+            image_ids_list + [np.empty(0, dtype=np.int64)]
+        ),
+        point2D_idxs=np.concatenate(
+            [
+                np.asarray(point3D.point2D_idxs, dtype=np.int64)
+                for point3D in points3D
+            ]
+            + [np.empty(0, dtype=np.int64)]
+        ),
+    )
+
+
+def convert_point3D_table_to_points3D(point3D_table):
+    points3D = {}
+    offsets = point3D_table.track_offsets.tolist()
+    # Same data types as in read_points3D_text()
+    rgbs = point3D_table.rgbs.astype(np.int64)
+    for index, point3D_id in enumerate(point3D_table.ids.tolist()):
+        start = offsets[index]
+        end = offsets[index + 1]
+        points3D[point3D_id] = Point3D(
+            id=point3D_id,
+            xyz=point3D_table.xyzs[index],
+            rgb=rgbs[index],
+            error=point3D_table.errors[index],
+            image_ids=point3D_table.image_ids[start:end],
+            point2D_idxs=point3D_table.point2D_idxs[start:end],
+        )
+    return points3D
+
+
 def write_model(cameras, images, points3D, path, ext):
     if ext == ".txt":
         write_cameras_text(cameras, os.path.join(path, "cameras" + ext))
@@ -6,18 +6,33 @@ from ssr.ext.read_write_model import (
     read_cameras_binary,
     read_images_text,
     read_images_binary,
+    read_points3D_text,
+    read_cameras_binary_columnar,
+    read_images_binary_columnar,
+    read_points3d_binary_columnar,
+    convert_cameras_to_camera_table,
+    convert_images_to_image_table,
+    convert_points3D_to_point3D_table,
+    convert_camera_table_to_cameras,
+    convert_image_table_to_images,
     write_model,
     write_cameras_text,
     write_cameras_binary,
+    CameraTable,
+    ImageTable,
+    Point3DTable,
 )
 from ssr.ext.read_write_model import Camera as ColmapCamera
 from ssr.ext.read_write_model import Image as ColmapImage
 from ssr.ext.read_write_model import Point3D as ColmapPoint3D
 
 from ssr.ssr_types.camera import Camera
+from ssr.ssr_types.camera_batch import CameraBatch
 from ssr.ssr_types.point import Point
+from ssr.ssr_types.point_cloud import PointCloud
 
 from ssr.utility.logging_extension import logger
+from ssr.utility.result_cache import get_cached_arrays
 
 # From ssr\ext\read_write_model.py
 # CAMERA_MODELS = {
@@ -156,6 +171,26 @@ class ColmapFileHandler(object):
 
         return cameras
 
+    @staticmethod
+    def convert_colmap_tables_to_camera_batch(camera_table, image_table):
+        # Vectorized counterpart of convert_colmap_cams_to_cams()
+        id_to_calibration_mat = {}
+        id_to_col_cameras = convert_camera_table_to_cameras(camera_table)
+        for camera_id, camera_model in id_to_col_cameras.items():
+            fx, fy, cx, cy, skew = parse_camera_param_list(camera_model)
+            id_to_calibration_mat[camera_id] = np.array(
+                [[fx, skew, cx], [0, fy, cy], [0, 0, 1]], dtype=float
+            )
+        camera_ids = np.asarray(image_table.camera_ids)
+        return CameraBatch.from_quaternions(
+            [id_to_calibration_mat[camera_id] for camera_id in camera_ids],
+            image_table.qvecs,
+            image_table.tvecs,
+            [id_to_col_cameras[camera_id].width for camera_id in camera_ids],
+            [id_to_col_cameras[camera_id].height for camera_id in camera_ids],
+            file_names=image_table.names,
+        )
+
     @staticmethod
     def convert_colmap_points_to_points(id_to_col_points3D):
         # From ssr\ext\read_write_model.py
@@ -171,6 +206,156 @@ class ColmapFileHandler(object):
 
         return points3D
 
+    @staticmethod
+    def convert_colmap_point_table_to_points(point3D_table):
+        # Same as convert_colmap_points_to_points(), but for a Point3DTable
+        points3D = []
+        for point3D_id, xyz, rgb in zip(
+            point3D_table.ids.tolist(),
+            point3D_table.xyzs,
+            point3D_table.rgbs,
+        ):
+            current_point = Point(coord=xyz, color=rgb)
+            current_point.id = point3D_id
+            points3D.append(current_point)
+        return points3D
+
+    @staticmethod
+    def convert_colmap_points_to_point_cloud(id_to_col_points3D):
+        # Same as convert_colmap_points_to_points(), but returns a PointCloud
+        col_points3D = list(id_to_col_points3D.values())
+        num_points = len(col_points3D)
+        coords = np.empty((num_points, 3), dtype=float)
+        colors = np.empty((num_points, 3), dtype=np.uint8)
+        ids = np.empty(num_points, dtype=np.int64)
+        for index, col_point3D in enumerate(col_points3D):
+            coords[index] = col_point3D.xyz
+            colors[index] = col_point3D.rgb
+            ids[index] = col_point3D.id
+        return PointCloud(coords, colors=colors, ids=ids)
+
+    @staticmethod
+    def convert_colmap_point_table_to_point_cloud(
+        point3D_table, image_table=None
+    ):
+        # Convert the columnar points (see read_model_columnar()). If the
+        # image table is provided, the tracks are stored as measurements
+        # (with camera_index=image_id and feature_index=point2D_idx)
+        measurement_offsets = None
+        measurement_data = None
+        if image_table is not None:
+            image_id_to_index = {
+                image_id: index
+                for index, image_id in enumerate(image_table.ids.tolist())
+            }
+            unique_image_ids, inverse = np.unique(
+                point3D_table.image_ids, return_inverse=True
+            )
+            image_indices = np.array(
+                [image_id_to_index[image_id] for image_id in unique_image_ids],
+                dtype=np.int64,
+            )[inverse]
+            xys = image_table.xys[
+                image_table.point2D_offsets[image_indices]
+                + point3D_table.point2D_idxs
+            ]
+            measurement_offsets = point3D_table.track_offsets
+            measurement_data = np.column_stack(
+                (point3D_table.image_ids, point3D_table.point2D_idxs, xys)
+            )
+        return PointCloud(
+            point3D_table.xyzs,
+            colors=point3D_table.rgbs,
+            ids=point3D_table.ids,
+            measurement_offsets=measurement_offsets,
+            measurement_data=measurement_data,
+        )
+
+    # Increase the version, if the data returned by _read_model_tables()
+    # changes. This invalidates the corresponding cache entries.
+    MODEL_TABLES_CACHE_VERSION = 1
+    MODEL_TABLE_TYPES = {
+        "cameras": CameraTable,
+        "images": ImageTable,
+        "points3D": Point3DTable,
+    }
+
+    @staticmethod
+    def _convert_model_tables_to_arrays(name_to_table):
+        arrays = {}
+        for name, table in name_to_table.items():
+            for field, value in table._asdict().items():
+                if field == "names":
+                    value = np.array(value, dtype=str)
+                arrays[name + "." + field] = np.asarray(value)
+        return arrays
+
+    @staticmethod
+    def _convert_arrays_to_model_tables(arrays):
+        name_to_table = {}
+        for name, table_type in ColmapFileHandler.MODEL_TABLE_TYPES.items():
+            if name + ".ids" not in arrays:
+                continue
+            field_dict = {
+                field: arrays[name + "." + field]
+                for field in table_type._fields
+            }
+            if "names" in field_dict:
+                field_dict["names"] = field_dict["names"].tolist()
+            name_to_table[name] = table_type(**field_dict)
+        return name_to_table
+
+    @staticmethod
+    def _read_model_tables(model_idp, ext, with_points3D):
+        if ext == ".txt":
+            name_to_table = {
+                "cameras": convert_cameras_to_camera_table(
+                    read_cameras_text(os.path.join(model_idp, "cameras.txt"))
+                ),
+                "images": convert_images_to_image_table(
+                    read_images_text(os.path.join(model_idp, "images.txt"))
+                ),
+            }
+            if with_points3D:
+                name_to_table["points3D"] = convert_points3D_to_point3D_table(
+                    read_points3D_text(os.path.join(model_idp, "points3D.txt"))
+                )
+        elif ext == ".bin":
+            name_to_table = {
+                "cameras": read_cameras_binary_columnar(
+                    os.path.join(model_idp, "cameras.bin")
+                ),
+                "images": read_images_binary_columnar(
+                    os.path.join(model_idp, "images.bin")
+                ),
+            }
+            if with_points3D:
+                name_to_table["points3D"] = read_points3d_binary_columnar(
+                    os.path.join(model_idp, "points3D.bin")
+                )
+        else:
+            assert False
+        return ColmapFileHandler._convert_model_tables_to_arrays(name_to_table)
+
+    @staticmethod
+    def read_model_tables(model_idp, ext, with_points3D=True):
+        """Return the columnar model (see read_model_columnar()) as dict.
+
+        If a ResultCache is configured, the tables are read from the cache
+        (as long as the model files do not change).
+        """
+        model_fns = ["cameras" + ext, "images" + ext]
+        if with_points3D:
+            model_fns.append("points3D" + ext)
+        arrays = get_cached_arrays(
+            ColmapFileHandler._read_model_tables,
+            [os.path.join(model_idp, model_fn) for model_fn in model_fns],
+            "ColmapFileHandler.read_model_tables",
+            ColmapFileHandler.MODEL_TABLES_CACHE_VERSION,
+            params=(model_idp, ext, with_points3D),
+        )
+        return ColmapFileHandler._convert_arrays_to_model_tables(arrays)
+
     @staticmethod
     def parse_colmap_model_folder(model_idp, image_idp):
 
@@ -201,14 +386,18 @@ class ColmapFileHandler(object):
 
         # Cameras represent information about the camera model.
         # Images contain pose information.
-        id_to_col_cameras, id_to_col_images, id_to_col_points3D = read_model(
-            model_idp, ext=ext
+        name_to_table = ColmapFileHandler.read_model_tables(model_idp, ext)
+        id_to_col_cameras = convert_camera_table_to_cameras(
+            name_to_table["cameras"]
+        )
+        id_to_col_images = convert_image_table_to_images(
+            name_to_table["images"]
         )
         cameras = ColmapFileHandler.convert_colmap_cams_to_cams(
             id_to_col_cameras, id_to_col_images, image_idp
         )
-        points3D = ColmapFileHandler.convert_colmap_points_to_points(
-            id_to_col_points3D
+        points3D = ColmapFileHandler.convert_colmap_point_table_to_points(
+            name_to_table["points3D"]
         )
 
         return cameras, points3D
@@ -225,23 +414,15 @@ class ColmapFileHandler(object):
         else:
             assert False  # No valid model folder
 
-        if ext == ".txt":
-            id_to_col_cameras = read_cameras_text(
-                os.path.join(model_idp, "cameras" + ext)
-            )
-            id_to_col_images = read_images_text(
-                os.path.join(model_idp, "images" + ext)
-            )
-
-        elif ext == ".bin":
-            id_to_col_cameras = read_cameras_binary(
-                os.path.join(model_idp, "cameras" + ext)
-            )
-            id_to_col_images = read_images_binary(
-                os.path.join(model_idp, "images" + ext)
-            )
-        else:
-            assert False
+        name_to_table = ColmapFileHandler.read_model_tables(
+            model_idp, ext, with_points3D=False
+        )
+        id_to_col_cameras = convert_camera_table_to_cameras(
+            name_to_table["cameras"]
+        )
+        id_to_col_images = convert_image_table_to_images(
+            name_to_table["images"]
+        )
 
         cameras = ColmapFileHandler.convert_colmap_cams_to_cams(
             id_to_col_cameras, id_to_col_images, image_dp
@@ -249,6 +430,24 @@ class ColmapFileHandler(object):
 
         return cameras
 
+    @staticmethod
+    def parse_colmap_camera_batch(model_idp):
+        ifp_s = os.listdir(model_idp)
+
+        if len(set(ifp_s).intersection(["cameras.txt", "images.txt"])) == 2:
+            ext = ".txt"
+        elif len(set(ifp_s).intersection(["cameras.bin", "images.bin"])) == 2:
+            ext = ".bin"
+        else:
+            assert False  # No valid model folder
+
+        name_to_table = ColmapFileHandler.read_model_tables(
+            model_idp, ext, with_points3D=False
+        )
+        return ColmapFileHandler.convert_colmap_tables_to_camera_batch(
+            name_to_table["cameras"], name_to_table["images"]
+        )
+
     @staticmethod
     def convert_cams_to_colmap_cams_and_colmap_images(
         cameras, colmap_camera_model_name="SIMPLE_PINHOLE"
@@ -352,3 +551,46 @@ class ColmapFileHandler(object):
             write_cameras_binary(
                 colmap_cams, os.path.join(odp, "cameras" + ext)
             )
+
+    @staticmethod
+    def write_fused_vis_file(ofp, vis_offsets, vis_image_idxs):
+        """Write the visibility of fused points (i.e. fused.ply.vis).
+
+        The images visible in point i are given by
+            vis_image_idxs[vis_offsets[i]:vis_offsets[i + 1]]
+        where the image indices refer to the order of the images in the
+        corresponding Colmap model.
+        """
+        # Format (see colmap/src/mvs/fusion.cc - WritePointsVisibility()):
+        #   uint64 num_points
+        #   for each point: uint32 num_images, uint32 image_idx * num_images
+        vis_offsets = np.asarray(vis_offsets, dtype=np.int64)
+        num_points = len(vis_offsets) - 1
+        num_images = np.diff(vis_offsets)
+        vis_data = np.empty(num_points + vis_offsets[-1], dtype="<u4")
+        count_positions = vis_offsets[:-1] + np.arange(num_points)
+        is_count_position = np.zeros(len(vis_data), dtype=bool)
+        is_count_position[count_positions] = True
+        vis_data[count_positions] = num_images
+        vis_data[~is_count_position] = vis_image_idxs
+        with open(ofp, "wb") as ofile:
+            ofile.write(np.array([num_points], dtype="<u8").tobytes())
+            ofile.write(vis_data.tobytes())
+
+    @staticmethod
+    def read_fused_vis_file(ifp):
+        """Return vis_offsets and vis_image_idxs (see write_fused_vis_file)."""
+        with open(ifp, "rb") as ifile:
+            num_points = int(np.frombuffer(ifile.read(8), dtype="<u8")[0])
+            vis_data = np.frombuffer(ifile.read(), dtype="<u4")
+        vis_offsets = np.zeros(num_points + 1, dtype=np.int64)
+        is_count_position = np.zeros(len(vis_data), dtype=bool)
+        # The count positions depend on the previous counts
+        count_position = 0
+        for point_idx in range(num_points):
+            is_count_position[count_position] = True
+            num_images = int(vis_data[count_position])
+            vis_offsets[point_idx + 1] = vis_offsets[point_idx] + num_images
+            count_position += num_images + 1
+        assert count_position == len(vis_data)
+        return vis_offsets, vis_data[~is_count_position].astype(np.int64)
@@ -1,7 +1,9 @@
 import numpy as np
-from ssr.ext.plyfile import PlyData, PlyElement
+from ssr.ext.plyfile import PlyData, PlyElement, PlyListProperty
 from ssr.utility.logging_extension import logger
+from ssr.utility.result_cache import get_cached_arrays
 from ssr.ssr_types.point import Point, Measurement
+from ssr.ssr_types.point_cloud import PointCloud
 
 
 class Face:
@@ -18,6 +20,77 @@ class Face:
 
 
 class PLYFileHandler:
+    @staticmethod
+    def __has_properties(dtype, names):
+        return dtype.names is not None and all(
+            name in dtype.names for name in names
+        )
+
+    @staticmethod
+    def __get_vertex_columns(vertex_data, names):
+        # Copy whole columns of the (memory mapped) structured array at once
+        column_mat = np.empty(
+            (len(vertex_data), len(names)),
+            dtype=np.result_type(*[vertex_data.dtype[name] for name in names]),
+        )
+        for column_idx, name in enumerate(names):
+            column_mat[:, column_idx] = vertex_data[name]
+        return column_mat
+
+    @staticmethod
+    def __get_face_mat(ply_data):
+        # Returns the first three vertex indices of each face as (n, 3)
+        # array (polygons with more vertices are not triangulated)
+        vertex_indices = ply_data["face"].data["vertex_indices"]
+        if vertex_indices.dtype == object:
+            # Lists with variable length (i.e. each entry is an array)
+            if len(vertex_indices) == 0:
+                return np.empty((0, 3), dtype=np.int32)
+            face_sizes = np.fromiter(
+                map(len, vertex_indices), dtype=int, count=len(vertex_indices)
+            )
+            if np.all(face_sizes == 3):
+                return np.vstack(vertex_indices)
+            assert np.all(face_sizes >= 3)
+            return np.array(
+                [face_indices[:3] for face_indices in vertex_indices]
+            )
+        # Lists with fixed length
+        face_mat = np.asarray(vertex_indices).reshape(
+            (len(vertex_indices), -1)
+        )
+        assert face_mat.shape[1] >= 3
+        return face_mat[:, :3]
+
+    @staticmethod
+    def __vertex_columns_to_vertex_list(coords, colors, scalars):
+        scalar_columns = {
+            scalar_key: scalar_values.tolist()
+            for scalar_key, scalar_values in scalars.items()
+        }
+        vertices = []
+        for point_index in range(len(coords)):
+            current_point = Point()
+            current_point.coord = coords[point_index]
+            if colors is not None:
+                current_point.color = colors[point_index]
+            current_point.id = point_index
+
+            for scalar_key, scalar_column in scalar_columns.items():
+                current_point.scalars[scalar_key] = scalar_column[point_index]
+
+            vertices.append(current_point)
+        return vertices
+
+    @staticmethod
+    def __face_mat_to_face_list(face_mat):
+        faces = []
+        for vertex_indices in face_mat:
+            current_face = Face()
+            current_face.vertex_indices = vertex_indices
+            faces.append(current_face)
+        return faces
+
     @staticmethod
     def __ply_data_vertices_to_vetex_list(ply_data):
 
@@ -60,36 +133,33 @@ class PLYFileHandler:
         )
 
         logger.info("Found " + str(len(ply_data["vertex"].data)) + " vertices")
-        for point_index, line in enumerate(ply_data["vertex"].data):
-            current_point = Point()
-            current_point.coord = np.array([line["x"], line["y"], line["z"]])
-            if use_color:
-                current_point.color = np.array(
-                    [line["red"], line["green"], line["blue"]]
-                )
-            current_point.id = point_index
-
-            for scalar_value_key in scalar_value_keys:
-                current_point.scalars[scalar_value_key] = line[
-                    scalar_value_key
+        vertex_data = ply_data["vertex"].data
+        coords = PLYFileHandler.__get_vertex_columns(
+            vertex_data, ["x", "y", "z"]
+        )
+        colors = None
+        if use_color:
+            colors = PLYFileHandler.__get_vertex_columns(
+                vertex_data, ["red", "green", "blue"]
+            )
+        vertices = PLYFileHandler.__vertex_columns_to_vertex_list(
+            coords,
+            colors,
+            {
+                scalar_value_key: vertex_data[scalar_value_key]
+                for scalar_value_key in scalar_value_keys
+            },
+        )
+        if "measurements" in vertex_data.dtype.names:
+            for current_point, measurements in zip(
+                vertices, vertex_data["measurements"]
+            ):
+                measurement_mat = np.asarray(measurements).reshape((-1, 4))
+                current_point.measurements = [
+                    Measurement.init_from_list(measurement_list)
+                    for measurement_list in measurement_mat
                 ]
 
-            if "measurements" in line.dtype.names:
-                elements_per_measurement = 4
-                current_point.measurements = []
-                for measurement_idx in range(
-                    len(line["measurements"]) / elements_per_measurement
-                ):
-                    array_idx = measurement_idx * elements_per_measurement
-                    slice = line["measurements"][
-                        array_idx : array_idx + elements_per_measurement
-                    ]
-                    current_point.measurements.append(
-                        Measurement.init_from_list(slice)
-                    )
-
-            vertices.append(current_point)
-
         ply_data_vertex_dtype = ply_data["vertex"].dtype
         ply_data_vertex_data_dtype = ply_data["vertex"].data.dtype
 
@@ -104,12 +174,9 @@ class PLYFileHandler:
             # read faces
             ply_data_face_type = ply_data["face"].dtype
             logger.info("Found " + str(len(ply_data["face"].data)) + " faces")
-            for line in ply_data["face"].data["vertex_indices"]:
-                current_face = Face()
-                current_face.vertex_indices = np.array(
-                    [line[0], line[1], line[2]]
-                )
-                faces.append(current_face)
+            faces = PLYFileHandler.__face_mat_to_face_list(
+                PLYFileHandler.__get_face_mat(ply_data)
+            )
 
             ply_data_face_data_type = [("vertex_indices", "i4", (3,))]
             face_names = ply_data["face"].data.dtype.names
@@ -158,29 +225,37 @@ class PLYFileHandler:
         with_measurements = "measurements" in ply_data_vertex_data_dtype.names
 
         # set all the values, offered / defined by property_type_list
-        for index, point in enumerate(point_list):
-
-            # row = np.empty(1, dtype=ply_data_vertex_data_dtype)
-            vertex_output_array[index]["x"] = point.coord[0]
-            vertex_output_array[index]["y"] = point.coord[1]
-            vertex_output_array[index]["z"] = point.coord[2]
-
-            if with_color:
-                vertex_output_array[index]["red"] = point.color[0]
-                vertex_output_array[index]["green"] = point.color[1]
-                vertex_output_array[index]["blue"] = point.color[2]
-
-            if with_normals:
-                vertex_output_array[index]["nx"] = point.normal[0]
-                vertex_output_array[index]["ny"] = point.normal[1]
-                vertex_output_array[index]["nz"] = point.normal[2]
-
-            for scalar_key in point.scalars:
-                vertex_output_array[index][scalar_key] = point.scalars[
-                    scalar_key
+        coords = np.array([point.coord for point in point_list]).reshape(
+            (-1, 3)
+        )
+        PLYFileHandler.__set_vertex_columns(
+            vertex_output_array, ["x", "y", "z"], coords
+        )
+
+        if with_color:
+            colors = np.array([point.color for point in point_list]).reshape(
+                (-1, 3)
+            )
+            PLYFileHandler.__set_vertex_columns(
+                vertex_output_array, ["red", "green", "blue"], colors
+            )
+
+        if with_normals:
+            normals = np.array([point.normal for point in point_list]).reshape(
+                (-1, 3)
+            )
+            PLYFileHandler.__set_vertex_columns(
+                vertex_output_array, ["nx", "ny", "nz"], normals
+            )
+
+        if len(point_list) > 0:
+            for scalar_key in point_list[0].scalars:
+                vertex_output_array[scalar_key] = [
+                    point.scalars[scalar_key] for point in point_list
                 ]
 
-            if with_measurements:
+        if with_measurements:
+            for index, point in enumerate(point_list):
                 measurements = []
                 for measurement in point.measurements:
                     measurements += measurement.to_list()
@@ -199,19 +274,27 @@ class PLYFileHandler:
 
         return description
 
+    @staticmethod
+    def __set_vertex_columns(vertex_output_array, names, column_mat):
+        for column_idx, name in enumerate(names):
+            vertex_output_array[name] = column_mat[:, column_idx]
+
     @staticmethod
     def __faces_to_ply_face_element(face_list, property_type_list):
+        face_mat = np.array(
+            [face.vertex_indices for face in face_list], dtype=int
+        ).reshape((-1, 3))
+        return PLYFileHandler.__face_mat_to_ply_face_element(
+            face_mat, property_type_list
+        )
 
-        face_output_array = np.empty(len(face_list), dtype=property_type_list)
-        for index, face in enumerate(face_list):
+    @staticmethod
+    def __face_mat_to_ply_face_element(face_mat, property_type_list):
 
-            row = np.empty(1, dtype=property_type_list)
-            # We don't use face colors, the color of the faces is defined using
-            # the vertex colors!
-            row[
-                "vertex_indices"
-            ] = face.vertex_indices  # face.vertex_indices is a np.array
-            face_output_array[index] = row
+        face_output_array = np.empty(len(face_mat), dtype=property_type_list)
+        # We don't use face colors, the color of the faces is defined using
+        # the vertex colors!
+        face_output_array["vertex_indices"] = face_mat
 
         output_ply_data_face_element = PlyElement.describe(
             face_output_array, "face"
@@ -275,8 +358,30 @@ class PLYFileHandler:
             ply_data_face_data_type,
         )
 
+    @staticmethod
+    def __has_vertex_list_properties(ifp):
+        with open(ifp, "rb") as ifile:
+            ply_header = PlyData._parse_header(ifile)
+        return any(
+            isinstance(prop, PlyListProperty)
+            for prop in ply_header["vertex"].properties
+        )
+
     @staticmethod
     def parse_ply_file(ifp):
+        if not PLYFileHandler.__has_vertex_list_properties(ifp):
+            # Use the (cached) arrays, if the points have no measurements
+            coords, colors, _, scalars, face_mat = (
+                PLYFileHandler.read_ply_arrays(ifp)
+            )
+            vertices = PLYFileHandler.__vertex_columns_to_vertex_list(
+                coords, colors, scalars
+            )
+            faces = []
+            if face_mat is not None:
+                faces = PLYFileHandler.__face_mat_to_face_list(face_mat)
+            return vertices, faces
+
         logger.info("Parse PLY File: ...")
         logger.vinfo("ifp", ifp)
         ply_data = PlyData.read(ifp)
@@ -290,12 +395,201 @@ class PLYFileHandler:
 
         return vertices, faces
 
+    # Increase the version, if the data returned by
+    # __read_ply_arrays_uncached() changes. This invalidates the
+    # corresponding cache entries.
+    PLY_ARRAYS_CACHE_VERSION = 1
+    PLY_ARRAYS_CACHE_NAME = "PLYFileHandler.read_ply_arrays"
+
+    @staticmethod
+    def __read_ply_arrays_uncached(ifp):
+        # Binary files without list properties (e.g. point clouds) are memory
+        # mapped by PlyData.read()
+        ply_data = PlyData.read(ifp)
+
+        vertex_data = ply_data["vertex"].data
+        vertex_dtype = vertex_data.dtype
+        arrays = {}
+        arrays["coords"] = PLYFileHandler.__get_vertex_columns(
+            vertex_data, ["x", "y", "z"]
+        )
+        if PLYFileHandler.__has_properties(
+            vertex_dtype, ["red", "green", "blue"]
+        ):
+            arrays["colors"] = PLYFileHandler.__get_vertex_columns(
+                vertex_data, ["red", "green", "blue"]
+            )
+        if PLYFileHandler.__has_properties(vertex_dtype, ["nx", "ny", "nz"]):
+            arrays["normals"] = PLYFileHandler.__get_vertex_columns(
+                vertex_data, ["nx", "ny", "nz"]
+            )
+        non_scalar_value_keys = [
+            "x",
+            "y",
+            "z",
+            "red",
+            "green",
+            "blue",
+            "nx",
+            "ny",
+            "nz",
+        ]
+        for name in vertex_dtype.names:
+            if (
+                name not in non_scalar_value_keys
+                and vertex_dtype[name] != object
+            ):
+                arrays["scalar." + name] = np.array(vertex_data[name])
+
+        if "face" in ply_data:
+            arrays["faces"] = PLYFileHandler.__get_face_mat(ply_data)
+        return arrays
+
+    @staticmethod
+    def read_ply_arrays(ifp):
+        """Read the vertices and faces of a ply file as numpy arrays.
+
+        Returns the vertex coordinates (N x 3), colors (N x 3), normals
+        (N x 3), a dict with the remaining (scalar) vertex properties and the
+        faces (F x 3). Missing entries are None. If a ResultCache is
+        configured, the arrays are read from the cache (as long as the ply
+        file does not change).
+        """
+        logger.info("Parse PLY File: ...")
+        logger.vinfo("ifp", ifp)
+        arrays = get_cached_arrays(
+            PLYFileHandler.__read_ply_arrays_uncached,
+            [ifp],
+            PLYFileHandler.PLY_ARRAYS_CACHE_NAME,
+            PLYFileHandler.PLY_ARRAYS_CACHE_VERSION,
+            params=(ifp,),
+        )
+        coords = arrays["coords"]
+        colors = arrays.get("colors")
+        normals = arrays.get("normals")
+        scalars = {
+            name[len("scalar.") :]: values
+            for name, values in arrays.items()
+            if name.startswith("scalar.")
+        }
+        faces = arrays.get("faces")
+        logger.info("Found " + str(len(coords)) + " vertices")
+        if faces is not None:
+            logger.info("Found " + str(len(faces)) + " faces")
+        logger.info("Parse PLY File: Done")
+        return coords, colors, normals, scalars, faces
+
+    @staticmethod
+    def write_ply_arrays(
+        ofp,
+        coords,
+        colors=None,
+        normals=None,
+        scalars=None,
+        faces=None,
+        plain_text_output=False,
+    ):
+        """Write vertices and faces given as numpy arrays to a ply file.
+
+        The vertex properties correspond to the ones of write_ply_file().
+        """
+        logger.info("write_ply_file: " + ofp)
+        coords = np.asarray(coords).reshape((-1, 3))
+        ply_data_vertex_data_dtype_list = [
+            ("x", "<f4"),
+            ("y", "<f4"),
+            ("z", "<f4"),
+        ]
+        if colors is not None:
+            ply_data_vertex_data_dtype_list += [
+                ("red", "u1"),
+                ("green", "u1"),
+                ("blue", "u1"),
+            ]
+        if normals is not None:
+            ply_data_vertex_data_dtype_list += [
+                ("nx", "<f4"),
+                ("ny", "<f4"),
+                ("nz", "<f4"),
+            ]
+        if scalars is None:
+            scalars = {}
+        for scalar_key in scalars:
+            ply_data_vertex_data_dtype_list += [(scalar_key, "<f4")]
+
+        vertex_output_array = np.empty(
+            len(coords), dtype=ply_data_vertex_data_dtype_list
+        )
+        PLYFileHandler.__set_vertex_columns(
+            vertex_output_array, ["x", "y", "z"], coords
+        )
+        if colors is not None:
+            PLYFileHandler.__set_vertex_columns(
+                vertex_output_array,
+                ["red", "green", "blue"],
+                np.asarray(colors).reshape((-1, 3)),
+            )
+        if normals is not None:
+            PLYFileHandler.__set_vertex_columns(
+                vertex_output_array,
+                ["nx", "ny", "nz"],
+                np.asarray(normals).reshape((-1, 3)),
+            )
+        for scalar_key, scalar_values in scalars.items():
+            vertex_output_array[scalar_key] = scalar_values
+
+        output_ply_data_elements = [
+            PlyElement.describe(vertex_output_array, "vertex")
+        ]
+        if faces is not None and len(faces) > 0:
+            logger.info("Number faces" + str(len(faces)))
+            output_ply_data_elements.append(
+                PLYFileHandler.__face_mat_to_ply_face_element(
+                    np.asarray(faces).reshape((-1, 3)),
+                    [("vertex_indices", "i4", (3,))],
+                )
+            )
+        output_data = PlyData(output_ply_data_elements, text=plain_text_output)
+        output_data.write(ofp)
+
+    @staticmethod
+    def parse_ply_file_as_point_cloud(ifp):
+        coords, colors, normals, scalars, faces = (
+            PLYFileHandler.read_ply_arrays(ifp)
+        )
+        point_cloud = PointCloud(
+            coords,
+            colors=colors,
+            normals=normals,
+            ids=np.arange(len(coords)),
+            scalars=scalars,
+        )
+        return point_cloud, faces
+
+    @staticmethod
+    def write_ply_file_from_point_cloud(
+        ofp,
+        point_cloud,
+        with_colors=True,
+        with_normals=False,
+        faces=None,
+        plain_text_output=False,
+    ):
+        PLYFileHandler.write_ply_arrays(
+            ofp,
+            point_cloud.coords,
+            colors=point_cloud.colors if with_colors else None,
+            normals=point_cloud.normals if with_normals else None,
+            scalars=point_cloud.scalars,
+            faces=faces,
+            plain_text_output=plain_text_output,
+        )
+
     @staticmethod
     def write_ply_file_from_vertex_mat(ofp, vertex_mat):
-        vertices = []
-        for entry in vertex_mat:
-            vertices.append(Point(coord=entry))
-        PLYFileHandler.write_ply_file(ofp, vertices)
+        vertex_mat = np.asarray(vertex_mat).reshape((-1, 3))
+        colors = np.full((len(vertex_mat), 3), 255, dtype=np.uint8)
+        PLYFileHandler.write_ply_arrays(ofp, vertex_mat, colors=colors)
 
     @staticmethod
     def build_type_list(
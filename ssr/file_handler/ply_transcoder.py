@@ -0,0 +1,237 @@
+import os
+import shutil
+import numpy as np
+from ssr.utility.logging_extension import logger
+
+# Scalar property types of the PLY format (including the alternative names)
+_PLY_TYPE_TO_DTYPE_STR = {
+    "char": "i1",
+    "int8": "i1",
+    "uchar": "u1",
+    "uint8": "u1",
+    "short": "i2",
+    "int16": "i2",
+    "ushort": "u2",
+    "uint16": "u2",
+    "int": "i4",
+    "int32": "i4",
+    "uint": "u4",
+    "uint32": "u4",
+    "float": "f4",
+    "float32": "f4",
+    "double": "f8",
+    "float64": "f8",
+}
+
+_PLY_FORMAT_TO_BYTE_ORDER = {
+    "binary_little_endian": "<",
+    "binary_big_endian": ">",
+}
+
+
+class _PLYHeaderElement:
+    def __init__(self, name, count):
+        self.name = name
+        self.count = count
+        # List of (property_name, ply_type) or (property_name, None) for
+        # list properties
+        self.properties = []
+
+    def has_list_properties(self):
+        return any(ply_type is None for _, ply_type in self.properties)
+
+    def get_dtype(self, byte_order):
+        return np.dtype(
+            [
+                (name, byte_order + _PLY_TYPE_TO_DTYPE_STR[ply_type])
+                for name, ply_type in self.properties
+            ]
+        )
+
+
+class _PLYHeader:
+    def __init__(self, ply_format, elements, lines, num_bytes):
+        self.ply_format = ply_format
+        self.elements = elements
+        # Lines of the header (including the line endings)
+        self.lines = lines
+        # Size of the header, i.e. the offset of the data
+        self.num_bytes = num_bytes
+
+
+class PLYTranscoder:
+    """Rewrite binary PLY files without parsing the whole file.
+
+    The vertex records are processed in chunks, i.e. the memory usage does
+    not depend on the size of the file. The data following the vertex
+    element (e.g. the faces) is copied byte by byte.
+    """
+
+    @staticmethod
+    def read_header(ifp):
+        with open(ifp, "rb") as ply_file:
+            assert ply_file.readline().strip() == b"ply", ifp
+            lines = [b"ply\n"]
+            ply_format = None
+            elements = []
+            while True:
+                line = ply_file.readline()
+                assert line, f"Missing end_header in {ifp}"
+                lines.append(line)
+                words = line.decode("ascii").split()
+                if not words:
+                    continue
+                if words[0] == "format":
+                    ply_format = words[1]
+                elif words[0] == "element":
+                    elements.append(_PLYHeaderElement(words[1], int(words[2])))
+                elif words[0] == "property":
+                    if words[1] == "list":
+                        elements[-1].properties.append((words[-1], None))
+                    else:
+                        elements[-1].properties.append((words[2], words[1]))
+                elif words[0] == "end_header":
+                    break
+            num_bytes = ply_file.tell()
+        return _PLYHeader(ply_format, elements, lines, num_bytes)
+
+    @staticmethod
+    def is_supported(header, element_name="vertex"):
+        """Check if the element can be processed in a streaming fashion.
+
+        This requires a binary file, in which the element and all previous
+        elements have a fixed record size (i.e. no list properties).
+        """
+        if header.ply_format not in _PLY_FORMAT_TO_BYTE_ORDER:
+            return False
+        for element in header.elements:
+            if element.has_list_properties():
+                return False
+            if element.name == element_name:
+                return True
+        return False
+
+    @staticmethod
+    def _create_header_lines(header, element_name, kept_property_names):
+        lines = []
+        current_element_name = None
+        for line in header.lines:
+            words = line.decode("ascii").split()
+            if words and words[0] == "element":
+                current_element_name = words[1]
+            if (
+                words
+                and words[0] == "property"
+                and current_element_name == element_name
+                and words[-1] not in kept_property_names
+            ):
+                continue
+            lines.append(line)
+        return lines
+
+    @staticmethod
+    def transcode_element_properties(
+        ply_ifp,
+        ply_ofp,
+        drop_property_names=None,
+        keep_property_names=None,
+        element_name="vertex",
+        chunk_num_records=2**20,
+    ):
+        """Write a copy of ply_ifp without some properties of an element.
+
+        Either the properties to drop or the properties to keep can be
+        specified. Returns False (without writing ply_ofp), if the file is
+        not supported (see is_supported()).
+        """
+        assert (drop_property_names is None) != (keep_property_names is None)
+        header = PLYTranscoder.read_header(ply_ifp)
+        if not PLYTranscoder.is_supported(header, element_name):
+            return False
+
+        byte_order = _PLY_FORMAT_TO_BYTE_ORDER[header.ply_format]
+        preceding_num_bytes = 0
+        for element in header.elements:
+            if element.name == element_name:
+                break
+            element_dtype = element.get_dtype(byte_order)
+            preceding_num_bytes += element.count * element_dtype.itemsize
+
+        input_dtype = element.get_dtype(byte_order)
+        property_names = list(input_dtype.names)
+        if keep_property_names is None:
+            kept_property_names = [
+                name
+                for name in property_names
+                if name not in drop_property_names
+            ]
+        else:
+            kept_property_names = [
+                name for name in property_names if name in keep_property_names
+            ]
+        output_dtype = np.dtype(
+            [(name, input_dtype[name]) for name in kept_property_names]
+        )
+
+        # Write to a temporary file and rename it afterwards, so that an
+        # interrupted run never leaves an incomplete file
+        stem, ext = os.path.splitext(ply_ofp)
+        tmp_ply_ofp = stem + "_tmp" + ext
+        with open(ply_ifp, "rb") as ply_ifile, open(
+            tmp_ply_ofp, "wb"
+        ) as ply_ofile:
+            ply_ofile.writelines(
+                PLYTranscoder._create_header_lines(
+                    header, element_name, kept_property_names
+                )
+            )
+            ply_ifile.seek(header.num_bytes)
+            # Elements in front of the transcoded element
+            PLYTranscoder._copy_num_bytes(
+                ply_ifile, ply_ofile, preceding_num_bytes
+            )
+            num_remaining_records = element.count
+            while num_remaining_records > 0:
+                num_records = min(chunk_num_records, num_remaining_records)
+                buffer = ply_ifile.read(num_records * input_dtype.itemsize)
+                assert (
+                    len(buffer) == num_records * input_dtype.itemsize
+                ), f"Unexpected end of file in {ply_ifp}"
+                input_records = np.frombuffer(buffer, dtype=input_dtype)
+                output_records = np.empty(num_records, dtype=output_dtype)
+                for name in kept_property_names:
+                    output_records[name] = input_records[name]
+                ply_ofile.write(output_records.tobytes())
+                num_remaining_records -= num_records
+            # The remaining elements (e.g. the faces) are copied unchanged
+            shutil.copyfileobj(ply_ifile, ply_ofile, length=2**24)
+        os.replace(tmp_ply_ofp, ply_ofp)
+        return True
+
+    @staticmethod
+    def _copy_num_bytes(ifile, ofile, num_bytes, chunk_num_bytes=2**24):
+        while num_bytes > 0:
+            buffer = ifile.read(min(chunk_num_bytes, num_bytes))
+            assert buffer, "Unexpected end of file"
+            ofile.write(buffer)
+            num_bytes -= len(buffer)
+
+    @staticmethod
+    def remove_vertex_color(ply_ifp, ply_ofp):
+        """Remove the vertex colors, returns False for unsupported files."""
+        result = PLYTranscoder.transcode_element_properties(
+            ply_ifp,
+            ply_ofp,
+            drop_property_names=[
+                "red",
+                "green",
+                "blue",
+                "alpha",
+                "diffuse_red",
+                "diffuse_green",
+                "diffuse_blue",
+            ],
+        )
+        if result:
+            logger.info("Removed vertex colors by transcoding: " + ply_ifp)
+        return result
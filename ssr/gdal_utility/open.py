@@ -13,6 +13,10 @@ def get_image_statistics_per_band(ifp):
 
     # https://gdal.org/doxygen/classGDALDataset.html
     ds = gdal.Open(ifp)
+    return get_dataset_statistics_per_band(ds)
+
+
+def get_dataset_statistics_per_band(ds):
 
     band_statistics_list = []
     for i in range(ds.RasterCount):
@@ -27,8 +31,12 @@ def get_image_statistics_per_band(ifp):
 
 
 def get_image_min_max(ifp):
+    return get_dataset_min_max(gdal.Open(ifp))
+
+
+def get_dataset_min_max(ds):
 
-    band_statistics_list = get_image_statistics_per_band(ifp)
+    band_statistics_list = get_dataset_statistics_per_band(ds)
     image_min = float("inf")
     image_max = float("-inf")
 
@@ -1,6 +1,5 @@
 import os
-import subprocess
-from ssr.utility.logging_extension import logger
+from ssr.utility.tool_runner import run_tool
 from ssr.utility.os_extension import get_corresponding_files_in_directories
 from ssr.utility.os_extension import mkdir_safely
 
@@ -19,9 +18,7 @@ def perform_pan_sharpening(
     call_params += ["-of", of, "-r", resampling_algorithm]
 
     call_params += [pan_ifp, msi_ifp, ofp]
-    logger.vinfo("call_params", call_params)
-    sharp_process = subprocess.Popen(call_params)
-    sharp_process.wait()
+    run_tool(call_params, remove_on_failure=[ofp])
 
 
 def perform_pan_sharpening_for_folder(
@@ -1,6 +1,6 @@
 import logging
-import subprocess
 import shlex
+from ssr.utility.tool_runner import run_tool
 
 
 def run_gdal_cmd(cmd, disable_log=False, input=None):
@@ -8,38 +8,8 @@ def run_gdal_cmd(cmd, disable_log=False, input=None):
     if not disable_log:
         logging.info("Running subprocess: {}".format(cmd))
 
-    try:
-        process = subprocess.Popen(
-            shlex.split(cmd),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            stdin=subprocess.PIPE,
-        )
-
-        if input is not None:
-            # interacting with short-running subprocess
-            output = process.communicate(input=input.encode())[0]
-            if not disable_log:
-                logging.info(output.decode())
-            else:
-                process.wait()
-        else:
-            # interacting with long-running subprocess
-            if not disable_log:
-                while True:
-                    output = process.stdout.readline().decode()
-                    if output == "" and process.poll() is not None:
-                        break
-                    if output:
-                        logging.info(output)
-            else:
-                process.wait()
-    except (OSError, subprocess.CalledProcessError) as exception:
-        logging.info("oh my goodness!")
-        logging.error("Exception occured: {}, cmd: {}".format(exception, cmd))
-        logging.error("Subprocess failed")
-        exit(-1)
-    else:
-        if not disable_log:
-            # no exception was raised
-            logging.info("Subprocess finished")
+    if input is not None:
+        input = input.encode()
+    # The ToolRunner checks the exit code and writes the output to the tool
+    # logs
+    run_tool(shlex.split(cmd), stdin_input=input)
@@ -1,11 +1,14 @@
 import os
 import logging
+import numpy as np
+from osgeo import gdal
+from osgeo import gdal_array
 
-from ssr.gdal_utility.open import get_image_min_max
+from ssr.gdal_utility.open import get_dataset_min_max
 from ssr.gdal_utility.run_gdal import run_gdal_cmd
 
 
-def compute_src_win(in_ntf, bbx_size, ntf_size):
+def compute_src_win_values(in_ntf, bbx_size, ntf_size):
     # =========================
     # See VisSat/image_crop.py
     # =========================
@@ -31,16 +34,42 @@ def compute_src_win(in_ntf, bbx_size, ntf_size):
                 ul_col, ul_row, width, height
             )
         )
-        scrwin_string = "-srcwin {} {} {} {}".format(
-            ul_col, ul_row, width, height
-        )
+        src_win_values = [ul_col, ul_row, width, height]
     else:
-        scrwin_string = None
+        src_win_values = None
+
+    return src_win_values
 
+
+def compute_src_win(in_ntf, bbx_size, ntf_size):
+    src_win_values = compute_src_win_values(in_ntf, bbx_size, ntf_size)
+    if src_win_values is not None:
+        scrwin_string = "-srcwin {} {} {} {}".format(*src_win_values)
+    else:
+        scrwin_string = None
     return scrwin_string
 
 
-def perform_translation(
+def compute_scale_params_list(ds, scale_params, tone_mapping):
+    # Corresponds to the "-scale" options of gdal_translate
+    assert not ((scale_params is not None) and (tone_mapping is not None))
+    scale_params_list = None
+    if scale_params is not None:
+        assert len(scale_params) in [0, 2, 4]
+        scale_params_list = [list(scale_params)]
+
+        # TODO
+        # https://gdal.org/programs/gdal_translate.html#cmdoption-gdal-translate-exponent
+        # To apply non-linear scaling with a power function
+
+    if tone_mapping:
+        # Use the already opened dataset to compute the statistics
+        ntf_min, ntf_max = get_dataset_min_max(ds)
+        scale_params_list = [[ntf_min, ntf_max, 0, 65536]]
+    return scale_params_list
+
+
+def perform_translation_with_subprocess(
     in_ntf,
     hdr_img_ofp,
     ntf_size=None,
@@ -51,47 +80,28 @@ def perform_translation(
     tone_mapping=None,
     exponent=None,
     a_srs_string=None,
-    remove_aux_file=False,
 ):
-    # If scale_params is omitted the output range is 0 to 255
-
-    # ================================================================================
-    # Use QGIS to examine the result (i.e. color range of the created file)
-    # ================================================================================
-
-    assert not ((scale_params is not None) and (tone_mapping is not None))
-
     cmd = "gdal_translate"
 
     if bands is not None:
         for band in bands:
             cmd += " -b " + str(band)
 
-    # Output Format (of)
-    #   https://gdal.org/programs/gdal_translate.html
-    #       Starting with GDAL 2.3, if not specified, the format is guessed
-    #       from the extension (previously was GTiff)
-    #   https://gdal.org/programs/raster_common_options.html#raster-common-options-formats
-    #       Supported (output) formats
-    #           E.g. gdal_translate --formats
     of = os.path.splitext(hdr_img_ofp)[1][1:]
     logging.info("of: {}".format(of))
     cmd += " -of " + of
     cmd += " -ot " + ot
 
-    if scale_params is not None:
-        assert len(scale_params) in [0, 2, 4]
-        cmd += " -scale"
-        for scale_param in scale_params:
-            cmd += " " + str(scale_param)
-
-        # TODO
-        # https://gdal.org/programs/gdal_translate.html#cmdoption-gdal-translate-exponent
-        # To apply non-linear scaling with a power function
-
-    if tone_mapping:
-        ntf_min, ntf_max = get_image_min_max(in_ntf)
-        cmd += " -scale {} {} {} {}".format(ntf_min, ntf_max, 0, 65536)
+    scale_params_list = compute_scale_params_list(
+        gdal.Open(in_ntf) if tone_mapping else None,
+        scale_params,
+        tone_mapping,
+    )
+    if scale_params_list is not None:
+        for scale_param_list in scale_params_list:
+            cmd += " -scale"
+            for scale_param in scale_param_list:
+                cmd += " " + str(scale_param)
 
     scrwin_string = compute_src_win(in_ntf, bbx_size, ntf_size)
     if scrwin_string is not None:
@@ -103,6 +113,176 @@ def perform_translation(
     cmd += " {} {}".format(in_ntf, hdr_img_ofp)
     run_gdal_cmd(cmd)
 
+
+def create_translate_options(
+    of,
+    ds,
+    in_ntf,
+    ntf_size=None,
+    bbx_size=None,
+    bands=None,
+    ot="UInt16",
+    scale_params=None,
+    tone_mapping=None,
+    a_srs_string=None,
+):
+    # https://gdal.org/python/osgeo.gdal-module.html#TranslateOptions
+    #   The options correspond to the command line options of gdal_translate
+    return gdal.TranslateOptions(
+        format=of,
+        outputType=gdal.GetDataTypeByName(ot),
+        bandList=bands,
+        scaleParams=compute_scale_params_list(ds, scale_params, tone_mapping),
+        srcWin=compute_src_win_values(in_ntf, bbx_size, ntf_size),
+        outputSRS=a_srs_string,
+    )
+
+
+def perform_translation(
+    in_ntf,
+    hdr_img_ofp,
+    ntf_size=None,
+    bbx_size=None,
+    bands=None,
+    ot="UInt16",
+    scale_params=None,
+    tone_mapping=None,
+    exponent=None,
+    a_srs_string=None,
+    remove_aux_file=False,
+    use_subprocess=False,
+):
+    # If scale_params is omitted the output range is 0 to 255
+
+    # ================================================================================
+    # Use QGIS to examine the result (i.e. color range of the created file)
+    # ================================================================================
+
+    # Output Format (of)
+    #   https://gdal.org/programs/gdal_translate.html
+    #       Starting with GDAL 2.3, if not specified, the format is guessed
+    #       from the extension (previously was GTiff)
+    #   https://gdal.org/programs/raster_common_options.html#raster-common-options-formats
+    #       Supported (output) formats
+    #           E.g. gdal_translate --formats
+    of = os.path.splitext(hdr_img_ofp)[1][1:]
+
+    if use_subprocess:
+        perform_translation_with_subprocess(
+            in_ntf,
+            hdr_img_ofp,
+            ntf_size=ntf_size,
+            bbx_size=bbx_size,
+            bands=bands,
+            ot=ot,
+            scale_params=scale_params,
+            tone_mapping=tone_mapping,
+            exponent=exponent,
+            a_srs_string=a_srs_string,
+        )
+    else:
+        # Perform the translation in-process (i.e. without spawning a
+        # gdal_translate process for each image)
+        logging.info("of: {}".format(of))
+        ds = gdal.Open(in_ntf)
+        translate_options = create_translate_options(
+            of,
+            ds,
+            in_ntf,
+            ntf_size=ntf_size,
+            bbx_size=bbx_size,
+            bands=bands,
+            ot=ot,
+            scale_params=scale_params,
+            tone_mapping=tone_mapping,
+            a_srs_string=a_srs_string,
+        )
+        out_ds = gdal.Translate(hdr_img_ofp, ds, options=translate_options)
+        assert out_ds is not None, "Translation of {} failed".format(in_ntf)
+        # Closing the dataset flushes the data to disk
+        out_ds = None
+
     if remove_aux_file and of.lower() == "png":
         aux_xml_path = "{}.aux.xml".format(hdr_img_ofp)
         os.remove(aux_xml_path)
+
+
+def read_translated_dataset(
+    in_ntf,
+    ntf_size=None,
+    bbx_size=None,
+    bands=None,
+    ot="UInt16",
+    scale_params=None,
+    tone_mapping=None,
+):
+    """Translate the (cropped) image into an in-memory (MEM) dataset.
+
+    In contrast to the pixel values, the dataset contains also the (updated)
+    metadata of the crop.
+    """
+    ds = gdal.Open(in_ntf)
+    assert ds is not None, "Could not open {}".format(in_ntf)
+    translate_options = create_translate_options(
+        "MEM",
+        ds,
+        in_ntf,
+        ntf_size=ntf_size,
+        bbx_size=bbx_size,
+        bands=bands,
+        ot=ot,
+        scale_params=scale_params,
+        tone_mapping=tone_mapping,
+    )
+    mem_ds = gdal.Translate("", ds, options=translate_options)
+    assert mem_ds is not None, "Translation of {} failed".format(in_ntf)
+    return mem_ds
+
+
+def get_dataset_array(ds):
+    band_arrays = [
+        ds.GetRasterBand(band_idx + 1).ReadAsArray()
+        for band_idx in range(ds.RasterCount)
+    ]
+    if len(band_arrays) == 1:
+        array = band_arrays[0]
+    else:
+        array = np.dstack(band_arrays)
+    return array
+
+
+def write_array_as_image(array, ofp, reference_ds=None):
+    """Write the array with GDAL using the metadata of reference_ds.
+
+    Metadata that can not be stored in the output format (e.g. RPCs in PNG
+    files) is written to an .aux.xml file, like gdal_translate does.
+    """
+    height, width = array.shape[0:2]
+    num_bands = 1 if array.ndim == 2 else array.shape[2]
+    data_type = gdal_array.NumericTypeCodeToGDALTypeCode(array.dtype)
+    mem_ds = gdal.GetDriverByName("MEM").Create(
+        "", width, height, num_bands, data_type
+    )
+    if reference_ds is not None:
+        for domain in reference_ds.GetMetadataDomainList() or []:
+            if domain.startswith("xml:"):
+                continue
+            mem_ds.SetMetadata(reference_ds.GetMetadata(domain), domain)
+        if reference_ds.GetGCPCount() > 0:
+            mem_ds.SetGCPs(
+                reference_ds.GetGCPs(), reference_ds.GetGCPProjection()
+            )
+        else:
+            mem_ds.SetGeoTransform(reference_ds.GetGeoTransform())
+            mem_ds.SetProjection(reference_ds.GetProjection())
+    for band_idx in range(num_bands):
+        band_array = array if array.ndim == 2 else array[:, :, band_idx]
+        mem_ds.GetRasterBand(band_idx + 1).WriteArray(band_array)
+
+    of = os.path.splitext(ofp)[1][1:]
+    out_ds = gdal.Translate(
+        ofp, mem_ds, options=gdal.TranslateOptions(format=of)
+    )
+    assert out_ds is not None, "Writing {} failed".format(ofp)
+    # Closing the dataset flushes the data to disk
+    out_ds = None
@@ -4,6 +4,7 @@ from ssr.path_manager import PathManager
 from ssr.utility.logging_extension import logger
 from ssr.utility.os_extension import assert_dirs_equal
 from ssr.gdal_utility.pan_sharpening import perform_pan_sharpening_for_folder
+from ssr.utility.telemetry import trace_span
 
 
 class InputAdapter:
@@ -15,17 +16,19 @@ class InputAdapter:
         logger.info("Importing the MVS3DM dataset")
 
         if self.config.extract_msi_pan_image_pairs:
-            image_extraction_pipeline = ImageExtractionPipeline(self.pm)
-            image_extraction_pipeline.run(
-                use_consistent_msi_pan_extraction=self.config.use_consistent_msi_pan_extraction,
-            )
+            with trace_span("image_extraction"):
+                image_extraction_pipeline = ImageExtractionPipeline(self.pm)
+                image_extraction_pipeline.run(
+                    use_consistent_msi_pan_extraction=self.config.use_consistent_msi_pan_extraction,
+                )
 
         if self.config.pan_sharpening:
-            resampling_algorithm = "cubic"
-            perform_pan_sharpening_for_folder(
-                self.pm.pan_png_idp,
-                self.pm.msi_png_idp,
-                self.pm.sharpened_with_skew_png_dp,
-                resampling_algorithm=resampling_algorithm,
-                check_consistent_msi_pan_extraction=self.config.use_consistent_msi_pan_extraction,
-            )
+            with trace_span("pan_sharpening"):
+                resampling_algorithm = "cubic"
+                perform_pan_sharpening_for_folder(
+                    self.pm.pan_png_idp,
+                    self.pm.msi_png_idp,
+                    self.pm.sharpened_with_skew_png_dp,
+                    resampling_algorithm=resampling_algorithm,
+                    check_consistent_msi_pan_extraction=self.config.use_consistent_msi_pan_extraction,
+                )
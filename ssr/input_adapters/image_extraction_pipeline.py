@@ -24,6 +24,7 @@ class ImageExtractionPipeline:
         apply_tone_mapping,
         joint_tone_mapping,
         geo_crop_coordinates_list=None,
+        max_processes=None,
     ):
 
         pipeline = ExtractionPipeline(pan_or_msi_config_fp)
@@ -35,6 +36,7 @@ class ImageExtractionPipeline:
             apply_tone_mapping,
             joint_tone_mapping,
             geo_crop_coordinates_list=geo_crop_coordinates_list,
+            max_processes=max_processes,
         )
         return extracted_crops
 
@@ -57,6 +59,7 @@ class ImageExtractionPipeline:
             apply_tone_mapping=apply_tone_mapping,
             joint_tone_mapping=joint_tone_mapping,
             geo_crop_coordinates_list=None,
+            max_processes=self.ssr_config.image_extraction_max_processes,
         )
         return msi_geo_crop_coordinate_list
 
@@ -79,7 +82,8 @@ class ImageExtractionPipeline:
             remove_aux_file=remove_aux_file,
             apply_tone_mapping=apply_tone_mapping,
             joint_tone_mapping=joint_tone_mapping,
-            geo_crop_coordinates_list=msi_geo_crop_coordinate_list
+            geo_crop_coordinates_list=msi_geo_crop_coordinate_list,
+            max_processes=self.ssr_config.image_extraction_max_processes,
         )
         return pan_geo_crops
 
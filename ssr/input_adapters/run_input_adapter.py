@@ -1,5 +1,8 @@
 import importlib
+import os
 from ssr.utility.logging_extension import logger
+from ssr.utility.os_extension import get_file_paths_in_dir
+from ssr.utility.telemetry import trace_span
 
 
 class RunInputAdapterPipeline:
@@ -15,4 +18,10 @@ class RunInputAdapterPipeline:
             dataset_adapter = f"ssr.input_adapters.{dataset_adapter}"
             adapter_file = importlib.import_module(dataset_adapter)
             adapter = getattr(adapter_file, "InputAdapter")(self.pm)
-            adapter.run()
+            with trace_span(dataset_adapter, category="input_adapter") as span:
+                adapter.run()
+                image_dp = self.pm.sharpened_with_skew_png_dp
+                if os.path.isdir(image_dp):
+                    span.set_count(
+                        "num_images", len(get_file_paths_in_dir(image_dp))
+                    )
@@ -1,9 +1,9 @@
-import tempfile
 import os
+import numpy as np
 from ssr.utility.logging_extension import logger
 import xml.etree.ElementTree as ET
 from ssr.config.ssr_config import SSRConfig
-from ssr.utility.os_extension import makedirs_safely
+from ssr.file_handler.ply_transcoder import PLYTranscoder
 import pymeshlab
 
 
@@ -27,6 +27,35 @@ class _MLXFileHandler:
             assert False, assertion_msg
         return result
 
+    @staticmethod
+    def get_filter_params(mlx_ifp):
+        """Return the parameters of the (first) filter as python values.
+
+        The parameter names are converted to the (lower case) names used by
+        pymeshlab. Parameters without a plain python equivalent (e.g.
+        RichAbsPerc or RichMesh) are skipped, i.e. pymeshlab uses the
+        corresponding default values.
+        """
+        converters = {
+            "RichInt": int,
+            "RichEnum": int,
+            "RichFloat": float,
+            "RichBool": lambda value: value.lower() == "true",
+        }
+        tree = ET.parse(mlx_ifp)
+        meshlab_filter = tree.getroot().find("filter")
+        params = {}
+        for parameter in meshlab_filter:
+            if parameter.tag != "Param":
+                continue
+            converter = converters.get(parameter.attrib["type"])
+            if converter is None:
+                continue
+            params[parameter.attrib["name"].lower()] = converter(
+                parameter.attrib["value"]
+            )
+        return params
+
     @staticmethod
     def set_value(mlx_ofp, target_name, value):
         tree = ET.parse(mlx_ofp)
@@ -40,6 +69,190 @@ class _MLXFileHandler:
         tree.write(open(mlx_ofp, "w"), encoding="unicode")
 
 
+class MeshlabSession:
+    """Keeps a single pymeshlab.MeshSet alive across several operations.
+
+    The mesh is loaded once (from disk or from numpy arrays), processed by
+    an arbitrary number of filters and saved once, i.e. there are no
+    temporary mlx files and no ply round trips between the operations.
+    """
+
+    # The pymeshlab names of the filters changed with version 2022.2, the
+    # old names are used as fallback
+    _FILTER_NAMES = {
+        "simplification_quadric_edge_collapse_decimation": [
+            "meshing_decimation_quadric_edge_collapse",
+            "simplification_quadric_edge_collapse_decimation",
+        ],
+        "montecarlo_sampling": [
+            "generate_sampling_montecarlo",
+            "montecarlo_sampling",
+        ],
+        "poisson_disk_sampling": [
+            "generate_sampling_poisson_disk",
+            "poisson_disk_sampling",
+        ],
+        "stratified_triangle_sampling": [
+            "generate_sampling_stratified_triangle",
+            "stratified_triangle_sampling",
+        ],
+    }
+
+    def __init__(self, mesh_ifp=None):
+        self.ms = pymeshlab.MeshSet()
+        # Vertex colors of meshes in this set are not saved
+        self.removed_color_mesh_ids = set()
+        if mesh_ifp is not None:
+            self.load_mesh(mesh_ifp)
+
+    @staticmethod
+    def _get_template_ifp(template_fn):
+        return os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), "mlx", template_fn
+        )
+
+    def load_mesh(self, mesh_ifp):
+        self.ms.load_new_mesh(mesh_ifp)
+        return self.get_current_mesh_id()
+
+    def add_mesh_from_arrays(
+        self, vertices, faces=None, vertex_normals=None, vertex_colors=None
+    ):
+        """Add a mesh (or a point cloud, if faces is None).
+
+        The vertex colors are given as RGB(A) values in [0, 255].
+        """
+        vertices = np.asarray(vertices, dtype=np.float64)
+        kwargs = {"vertex_matrix": vertices}
+        if faces is not None:
+            kwargs["face_matrix"] = np.asarray(faces, dtype=np.int32)
+        if vertex_normals is not None:
+            kwargs["v_normals_matrix"] = np.asarray(
+                vertex_normals, dtype=np.float64
+            )
+        if vertex_colors is not None:
+            vertex_colors = np.asarray(vertex_colors, dtype=np.float64)
+            if vertex_colors.shape[1] == 3:
+                alpha = np.full((len(vertex_colors), 1), 255.0)
+                vertex_colors = np.hstack((vertex_colors, alpha))
+            kwargs["v_color_matrix"] = vertex_colors / 255.0
+        self.ms.add_mesh(pymeshlab.Mesh(**kwargs))
+        return self.get_current_mesh_id()
+
+    def get_current_mesh_id(self):
+        return self.ms.current_mesh_id()
+
+    def set_current_mesh(self, mesh_id):
+        self.ms.set_current_mesh(mesh_id)
+
+    def get_num_vertices(self):
+        return self.ms.current_mesh().vertex_number()
+
+    def get_num_faces(self):
+        return self.ms.current_mesh().face_number()
+
+    def get_mesh_arrays(self):
+        """Return the vertices, faces and vertex colors of the current mesh.
+
+        The vertex colors are RGBA values in [0, 255] (or None).
+        """
+        mesh = self.ms.current_mesh()
+        vertices = mesh.vertex_matrix()
+        faces = mesh.face_matrix()
+        vertex_colors = None
+        if (
+            mesh.has_vertex_color()
+            and self.get_current_mesh_id() not in self.removed_color_mesh_ids
+        ):
+            vertex_colors = np.round(mesh.vertex_color_matrix() * 255.0)
+            vertex_colors = vertex_colors.astype(np.uint8)
+        return vertices, faces, vertex_colors
+
+    def apply_filter(self, filter_name, **params):
+        """Apply a filter (given by its pymeshlab name) to the current mesh.
+
+        For the filters in _FILTER_NAMES, the name of the installed pymeshlab
+        version is used.
+        """
+        filter_names = self._FILTER_NAMES.get(filter_name, [filter_name])
+        exceptions = []
+        for filter_name_candidate in filter_names:
+            try:
+                return self.ms.apply_filter(filter_name_candidate, **params)
+            except pymeshlab.PyMeshLabException as exception:
+                exceptions.append(exception)
+        # Report the error of the preferred filter name
+        raise exceptions[0]
+
+    def apply_template_filter(self, template_fn, **params):
+        """Apply the filter defined by an mlx template (see mlx folder).
+
+        The parameters of the template can be overwritten with params (using
+        the lower case names of pymeshlab).
+        """
+        template_params = _MLXFileHandler.get_filter_params(
+            self._get_template_ifp(template_fn)
+        )
+        template_params.update(params)
+        filter_name = os.path.splitext(template_fn)[0]
+        return self.apply_filter(filter_name, **template_params)
+
+    def remove_color(self):
+        # The colors are omitted when saving or exporting the mesh
+        self.removed_color_mesh_ids.add(self.get_current_mesh_id())
+
+    def sample(self, num_vertices, sampling_method):
+        """Sample points on the current mesh and return the id of the result.
+
+        The current mesh is not changed.
+        """
+        assert sampling_method in [
+            "poisson_disk",
+            "stratified_triangle",
+            "montecarlo",
+        ], f"Received unsupported sampling method: {sampling_method}"
+        mesh_id = self.get_current_mesh_id()
+        self.apply_template_filter(
+            sampling_method + "_sampling.mlx", samplenum=num_vertices
+        )
+        sample_mesh_id = self.get_current_mesh_id()
+        self.set_current_mesh(mesh_id)
+        return sample_mesh_id
+
+    def decimate(self, face_ratio):
+        """Reduce the number of faces to face_ratio * (number of faces)."""
+        assert 0 < face_ratio <= 1
+        num_faces = self.get_num_faces()
+        target_num_faces = max(1, int(round(face_ratio * num_faces)))
+        logger.vinfo("num_faces", num_faces)
+        logger.vinfo("target_num_faces", target_num_faces)
+        # A percentage of zero enforces the usage of targetfacenum
+        self.apply_template_filter(
+            "simplification_quadric_edge_collapse_decimation.mlx",
+            targetfacenum=target_num_faces,
+            targetperc=0.0,
+        )
+
+    def save_mesh(self, mesh_ofp, mesh_id=None):
+        """Save the current mesh (or the mesh with mesh_id)."""
+        # https://pymeshlab.readthedocs.io/en/latest/io_format_list.html#save-mesh-parameters
+        current_mesh_id = self.get_current_mesh_id()
+        if mesh_id is not None:
+            self.set_current_mesh(mesh_id)
+        save_vertex_color = (
+            self.get_current_mesh_id() not in self.removed_color_mesh_ids
+        )
+        # Write to a temporary file and rename it afterwards, so that an
+        # interrupted run never leaves an incomplete mesh
+        stem, ext = os.path.splitext(mesh_ofp)
+        tmp_mesh_ofp = stem + "_tmp" + ext
+        self.ms.save_current_mesh(
+            tmp_mesh_ofp, save_vertex_color=save_vertex_color
+        )
+        os.replace(tmp_mesh_ofp, mesh_ofp)
+        self.set_current_mesh(current_mesh_id)
+
+
 class Meshlab:
     """This is an interface to the meshlab command line mode.
 
@@ -60,27 +273,6 @@ class Meshlab:
                     False
                 ), "Choose a valid path (in the config file) for Meshlab's temp directory"
 
-    def _create_lmx_template(self, template_fn):
-        assert template_fn in [
-            "montecarlo_sampling.mlx",
-            "simplification_quadric_edge_collapse_decimation.mlx",
-            "stratified_triangle_sampling.mlx",
-            "poisson_disk_sampling.mlx",
-        ], f"Received unsupported template_fn: {template_fn}"
-        mlx_template_ifp = os.path.join(
-            os.path.dirname(os.path.realpath(__file__)),
-            os.path.join("mlx", template_fn),
-        )
-        makedirs_safely(self.meshlab_temp_dp)
-        tmp_file = tempfile.NamedTemporaryFile(
-            suffix=".mlx", dir=self.meshlab_temp_dp, delete=False
-        )
-        tmp_ofp = tmp_file.name
-        tree = ET.parse(mlx_template_ifp)
-        tree.write(open(tmp_ofp, "w"), encoding="unicode")
-
-        return tmp_ofp
-
     def sample_mesh(
         self, mesh_ifp, point_cloud_ofp, num_vertices, sampling_method
     ):
@@ -89,12 +281,6 @@ class Meshlab:
         # points.
         # https://pymeshlab.readthedocs.io/en/latest/filter_scripts.html
 
-        assert sampling_method in [
-            "poisson_disk",
-            "stratified_triangle",
-            "montecarlo",
-        ], f"Received unsupported sampling method: {sampling_method}"
-
         #   Poisson-disk Sampling
         #       Requires the definition of
         #           number of samples OR radius or percentage
@@ -102,33 +288,28 @@ class Meshlab:
         #       Requires the definition of number of samples
         #       Results look better than Monte Carlo Sampling
 
-        template_fp = self._create_lmx_template(
-            sampling_method + "_sampling.mlx"
-        )
-        logger.vinfo("template_fp", template_fp)
-        assert os.path.isfile(template_fp)
+        session = MeshlabSession(mesh_ifp)
+        sample_mesh_id = session.sample(num_vertices, sampling_method)
+        session.save_mesh(point_cloud_ofp, mesh_id=sample_mesh_id)
 
-        _MLXFileHandler.set_value(template_fp, "SampleNum", num_vertices)
-        num_vertices_str = _MLXFileHandler.get_value_as_str(
-            template_fp, "SampleNum"
-        )
-        assertion_msg = f"{num_vertices_str} vs {num_vertices}"
-        assert int(num_vertices_str) == num_vertices, assertion_msg
+    def remove_color(self, mesh_ifp, mesh_ofp):
+        # Binary ply files are transcoded without parsing the whole mesh
+        if os.path.splitext(mesh_ifp)[1].lower() == ".ply":
+            if PLYTranscoder.remove_vertex_color(mesh_ifp, mesh_ofp):
+                return
+        session = MeshlabSession(mesh_ifp)
+        session.remove_color()
+        session.save_mesh(mesh_ofp)
 
-        ms = pymeshlab.MeshSet()
-        ms.load_new_mesh(mesh_ifp)
-        ms.load_filter_script(template_fp)
-        ms.apply_filter_script()
-        ms.save_current_mesh(point_cloud_ofp)
+    def decimate_mesh(self, mesh_ifp, mesh_ofp, face_ratio):
+        """Reduce the number of faces to face_ratio * (number of faces).
 
-    def remove_color(self, mesh_ifp, mesh_ofp):
-        # https://pymeshlab.readthedocs.io/en/latest/io_format_list.html#save-mesh-parameters
-        ms = pymeshlab.MeshSet()
-        ms.load_new_mesh(mesh_ifp)
-        ms.save_current_mesh(
-            mesh_ofp,
-            save_vertex_color=False,
-        )
+        Uses the quadric edge collapse decimation of meshlab.
+        """
+        session = MeshlabSession(mesh_ifp)
+        session.decimate(face_ratio)
+        session.remove_color()
+        session.save_mesh(mesh_ofp)
 
 
 if __name__ == "__main__":
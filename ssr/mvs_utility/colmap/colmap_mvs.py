@@ -1,6 +1,6 @@
 import os
-import subprocess
 from ssr.utility.logging_extension import logger
+from ssr.utility.tool_runner import run_tool
 from ssr.config.ssr_config import SSRConfig
 
 
@@ -30,8 +30,11 @@ class ColmapMVSReconstructor:
                 "--PoissonMeshing.trim",
                 trim_thresh_str,
             ]
-            logger.vinfo("dense_mesher_call: ", dense_mesher_call)
-            subprocess.call(dense_mesher_call)
+            run_tool(
+                dense_mesher_call,
+                heavy=True,
+                remove_on_failure=[mesh_ply_ofp],
+            )
 
         logger.info("reconstruct_mesh: Done")
 
@@ -74,7 +77,10 @@ class ColmapMVSReconstructor:
                     str(max_depth_dist),
                 ]
 
-            logger.vinfo("dense_mesher_call: ", dense_mesher_call)
-            subprocess.call(dense_mesher_call)
+            run_tool(
+                dense_mesher_call,
+                heavy=True,
+                remove_on_failure=[mesh_ply_ofp],
+            )
 
         logger.info("reconstruct_mesh: Done")
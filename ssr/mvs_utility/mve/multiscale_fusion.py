@@ -1,6 +1,6 @@
-import subprocess
 import os
 from ssr.config.ssr_config import SSRConfig
+from ssr.utility.tool_runner import run_tool
 
 
 class MultiScaleReconstructor:
@@ -49,17 +49,20 @@ class MultiScaleReconstructor:
         octree_options = ["--density-threshold=" + str(density_threshold)]
         octree_options += ["--filter-radius=" + str(filter_radius)]
 
-        subprocess.call(
+        run_tool(
             [self.octree_executable_fp, "-o", octree_fp]
             + octree_options
-            + [point_cloud_ifp]
+            + [point_cloud_ifp],
+            heavy=True,
         )
 
         # pointfusion_surface -o mesh.ply octree
         surface_options = ["--lambda1=" + str(lambda1)]
         surface_options += ["--lambda2=" + str(lambda2)]
-        subprocess.call(
+        run_tool(
             [self.surface_executable_fp, "-o", mesh_ofp]
             + surface_options
-            + [octree_fp]
+            + [octree_fp],
+            heavy=True,
+            remove_on_failure=[mesh_ofp],
         )
@@ -1,8 +1,8 @@
 import os
-import subprocess
 import platform
 
 from ssr.utility.logging_extension import logger
+from ssr.utility.tool_runner import run_tool
 from ssr.config.ssr_config import SSRConfig
 
 
@@ -63,8 +63,7 @@ class MVECreator:
             image_idp,
             self.workspace_folder,
         ]
-        logger.vinfo("make_scene_call", make_scene_call)
-        subprocess.call(make_scene_call)
+        run_tool(make_scene_call)
 
     def create_scene_from_sfm_result(self, sfm_fp_or_dp, downscale_level=None):
         # Input can be a nvm file or a colmap model folder
@@ -79,15 +78,13 @@ class MVECreator:
             sfm_fp_or_dp,
             self.workspace_folder,
         ]
-        logger.vinfo("make_scene_call", make_scene_call)
-        subprocess.call(make_scene_call)
+        run_tool(make_scene_call)
         logger.info("Creating Scene: Done")
 
     def compute_sfm(self):
         logger.info("Compute SfM: ...")
         sfm_recon_call = [self.sfm_recon_fp, self.workspace_folder]
-        logger.vinfo("sfm_recon_call", sfm_recon_call)
-        subprocess.call(sfm_recon_call)
+        run_tool(sfm_recon_call, heavy=True)
         logger.info("Compute SfM: Done")
 
     def compute_depth_maps(self, downscale_level=0):
@@ -99,8 +96,7 @@ class MVECreator:
             downscale_s_str,
             self.workspace_folder,
         ]
-        logger.vinfo("dm_recon_call", dm_recon_call)
-        subprocess.call(dm_recon_call)
+        run_tool(dm_recon_call, heavy=True)
         logger.info("compute_depth_maps: ...")
 
     def compute_dense_point_cloud_from_depth_maps(
@@ -122,8 +118,7 @@ class MVECreator:
             scene2pset_call.append(view_id_str)
         scene2pset_call.append(self.workspace_folder)
         scene2pset_call.append(mve_point_cloud_ply_ofp)
-        logger.vinfo("scene2pset_call", scene2pset_call)
-        subprocess.call(scene2pset_call)
+        run_tool(scene2pset_call, remove_on_failure=[mve_point_cloud_ply_ofp])
 
         logger.info("compute_dense_point_cloud_from_depth_maps: Done")
 
@@ -131,8 +126,10 @@ class MVECreator:
         self, mve_point_cloud_with_scale_ply_fp, mesh_ply_fp
     ):
         logger.info("compute_mesh_from_point_cloud: ...")
-        subprocess.call(
-            [self.fssrecon_fp, mve_point_cloud_with_scale_ply_fp, mesh_ply_fp]
+        run_tool(
+            [self.fssrecon_fp, mve_point_cloud_with_scale_ply_fp, mesh_ply_fp],
+            heavy=True,
+            remove_on_failure=[mesh_ply_fp],
         )
         logger.info("compute_mesh_from_point_cloud: Done")
 
@@ -165,7 +162,7 @@ class MVECreator:
 
         clean_call += [mesh_ifp, mesh_ofp]
 
-        subprocess.call(clean_call)
+        run_tool(clean_call, remove_on_failure=[mesh_ofp])
         logger.info("compute_cleaned_mesh: Done")
 
     def process_mve_create_scene_tasks(self, mve_create_scene_tasks):
@@ -1,7 +1,7 @@
 import os
-import subprocess
 import platform
 from ssr.utility.logging_extension import logger
+from ssr.utility.tool_runner import run_tool
 from ssr.config.ssr_config import SSRConfig
 
 
@@ -30,13 +30,8 @@ class MVETexrecon:
         occlusion_handling=True,
     ):
         logger.vinfo("texture_odp", texture_odp)
-        current_working_dir = os.getcwd()
         if not os.path.isdir(texture_odp):
             os.makedirs(texture_odp)
-        # Change the directory, since texrecon creates the files in the current
-        # directory
-        os.chdir(texture_odp)
-        logger.vinfo("texture_odp", texture_odp)
 
         options = []
         options += ["--keep_unseen_faces"]
@@ -53,11 +48,9 @@ class MVETexrecon:
                 "textured",
             ]
         )
-        logger.vinfo("texturing_call", texturing_call)
-        subprocess.call(texturing_call)
-
-        # reset the working directory
-        os.chdir(current_working_dir)
+        # Run texrecon in the output directory, since texrecon creates the
+        # files in the current directory
+        run_tool(texturing_call, heavy=True, cwd=texture_odp)
 
     def process_mve_create_textured_mesh_tasks(
         self, mve_create_textured_mesh_tasks
@@ -1,7 +1,7 @@
 import os
-import subprocess
 import shutil
 from ssr.utility.logging_extension import logger
+from ssr.utility.tool_runner import run_tool
 from ssr.config.ssr_config import SSRConfig
 
 
@@ -53,9 +53,7 @@ class OpenMVSReconstructor:
             openmvs_ofp,
         ]
 
-        logger.info(str(visualsfm_to_openmvs_call))
-        visualsfm_to_openmvs_proc = subprocess.Popen(visualsfm_to_openmvs_call)
-        visualsfm_to_openmvs_proc.wait()
+        run_tool(visualsfm_to_openmvs_call)
         logger.info("convert_visualsfm_to_openMVS: Done")
 
     def convert_colmap_to_openMVS(
@@ -88,9 +86,7 @@ class OpenMVSReconstructor:
                 openmvs_ofn,
             ]
 
-            logger.info(str(colmap_to_openmvs_call))
-            colmap_to_openmvs_proc = subprocess.Popen(colmap_to_openmvs_call)
-            colmap_to_openmvs_proc.wait()
+            run_tool(colmap_to_openmvs_call, remove_on_failure=[openmvs_ofp])
         # logger.info('convert_colmap_to_openMVS: Done')
 
     def densify_point_cloud(
@@ -115,9 +111,13 @@ class OpenMVSReconstructor:
                 openmvs_ofn,
             ]
 
-            logger.info(str(densify_point_cloud_call))
-            densify_proc = subprocess.Popen(densify_point_cloud_call)
-            densify_proc.wait()
+            run_tool(
+                densify_point_cloud_call,
+                heavy=True,
+                remove_on_failure=[
+                    os.path.join(openmvs_workspace_dp, openmvs_ofn)
+                ],
+            )
         logger.info("densify_point_cloud: Done ")
 
     def reconstruct_mesh(
@@ -184,9 +184,13 @@ class OpenMVSReconstructor:
                     "--mesh-export",
                     str(int(mesh_export)),
                 ]
-            logger.info(str(reconstruct_mesh_call))
-            reconstruct_proc = subprocess.Popen(reconstruct_mesh_call)
-            reconstruct_proc.wait()
+            run_tool(
+                reconstruct_mesh_call,
+                heavy=True,
+                remove_on_failure=[
+                    os.path.join(openmvs_workspace_dp, openmvs_ofn)
+                ],
+            )
 
         logger.info("reconstruct_mesh: Done")
 
@@ -222,9 +226,13 @@ class OpenMVSReconstructor:
             if mesh_ifp is not None:
                 refine_mesh_call += ["--mesh-file", mesh_ifp]
 
-            logger.info(str(refine_mesh_call))
-            refine_mesh_proc = subprocess.Popen(refine_mesh_call)
-            refine_mesh_proc.wait()
+            run_tool(
+                refine_mesh_call,
+                heavy=True,
+                remove_on_failure=[
+                    os.path.join(openmvs_workspace_dp, openmvs_ofn)
+                ],
+            )
 
         # logger.info('refine_mesh: Done')
 
@@ -243,11 +251,12 @@ class OpenMVSReconstructor:
             logger.vinfo("export_type", export_type)
             assert False
 
-        export_file = os.path.splitext(openmvs_ofn)[0] + "." + export_type
+        openmvs_ofp = os.path.join(openmvs_workspace_dp, openmvs_ofn)
+        export_fp = os.path.splitext(openmvs_ofp)[0] + "." + export_type
 
         if (
-            not os.path.isfile(openmvs_ofn)
-            or not os.path.isfile(export_file)
+            not os.path.isfile(openmvs_ofp)
+            or not os.path.isfile(export_fp)
             or not lazy
         ):
             texture_mesh_call = [
@@ -262,9 +271,11 @@ class OpenMVSReconstructor:
                 export_type,
             ]
 
-            logger.info(str(texture_mesh_call))
-            pRecons = subprocess.Popen(texture_mesh_call)
-            pRecons.wait()
+            run_tool(
+                texture_mesh_call,
+                heavy=True,
+                remove_on_failure=[openmvs_ofp, export_fp],
+            )
         logger.info("texture_mesh: Done")
 
     def perform_mvs(
@@ -19,6 +19,7 @@ class PathManager:
         hemisphere,
         ul_easting,
         ul_northing,
+        tile_name=None,
     ):
         self.pan_ntf_idp = os.path.join(pan_ntf_idp, aoi_specific_idn).rstrip(
             os.sep
@@ -45,6 +46,7 @@ class PathManager:
                 hemisphere,
                 ul_easting,
                 ul_northing,
+                tile_name,
             ),
         )
 
@@ -57,6 +59,7 @@ class PathManager:
                 hemisphere,
                 ul_easting,
                 ul_northing,
+                tile_name,
             ),
         )
         self.ssr_workspace_dp = os.path.join(
@@ -68,6 +71,7 @@ class PathManager:
                 hemisphere,
                 ul_easting,
                 ul_northing,
+                tile_name,
             ),
         )
         self.meshlab_temp_dp = os.path.join(
@@ -79,6 +83,7 @@ class PathManager:
                 hemisphere,
                 ul_easting,
                 ul_northing,
+                tile_name,
             ),
         )
 
@@ -133,6 +138,10 @@ class PathManager:
         self.fused_vis_ifp = os.path.join(
             self.vissat_mvs_workspace_dp, "fused.ply.vis"
         )
+        # Bounding box (including lat / lon values) of the reconstruction
+        self.vissat_aoi_json_ifp = os.path.join(
+            self.vissat_workspace_dp, "aoi.json"
+        )
 
         # === Output Workspace File Paths ===
 
@@ -159,6 +168,22 @@ class PathManager:
             "stereo",
             "depth_map_real_with_skew",
         )
+        self.depth_map_recovery_runtime_ofp = os.path.join(
+            self.colmap_workspace_no_skew_dp,
+            "stereo",
+            "depth_map_recovery_runtime.txt",
+        )
+
+        # Cache of parsed reconstructions (see ResultCache)
+        self.result_cache_dp = os.path.join(self.ssr_workspace_dp, "cache")
+        # Manifests of the executed pipeline stages (see StageGraph)
+        self.stage_manifest_dp = os.path.join(
+            self.ssr_workspace_dp, "stage_manifests"
+        )
+        # Output and statistics of the external tools (see ToolRunner)
+        self.tool_log_dp = os.path.join(self.ssr_workspace_dp, "tool_logs")
+        # Traces with timings and resource usage (see Telemetry)
+        self.telemetry_dp = os.path.join(self.ssr_workspace_dp, "telemetry")
 
         # Additional results (no skew)
         self.pan_no_skew_png_dp = os.path.join(
@@ -198,6 +223,14 @@ class PathManager:
         self.mesh_ply_ofn = "mesh.ply"
         self.plain_mesh_ply_ofn = "plain_mesh.ply"
         self.plain_mesh_refined_ply_ofn = "plain_mesh_refined.ply"
+        # Reduced meshes (levels of detail) of each meshing backend
+        self.lod_mesh_dn = "lod"
+
+        # Stitched meshes of the tiles (see ssr/tiling)
+        self.stitched_mesh_workspace_dp = os.path.join(
+            self.surface_workspace_dp, "stitched_meshing"
+        )
+        self.stitched_mesh_offset_ofn = "utm_offset.json"
 
         # Texturing workspace
         self.texturing_workspace_dp = os.path.join(
@@ -213,6 +246,11 @@ class PathManager:
             self.texturing_workspace_dp, "open3d"
         )
 
+    def get_lod_mesh_ply_ofn(self, face_ratio):
+        # E.g. "plain_mesh_lod_25.ply" for a face ratio of 0.25
+        stem, ext = os.path.splitext(self.plain_mesh_ply_ofn)
+        return "{}_lod_{:g}{}".format(stem, face_ratio * 100, ext)
+
     @staticmethod
     def _get_relative_dp(
         full_dataset_adapter_str,
@@ -221,6 +259,7 @@ class PathManager:
         hemisphere,
         ul_easting,
         ul_northing,
+        tile_name=None,
     ):
         dn = f"{aoi_name}_{zone_number}_{hemisphere}"
         if ul_easting is not None or ul_northing is not None:
@@ -232,6 +271,10 @@ class PathManager:
         dataset_str = full_dataset_adapter_str[len("adapter_") :]
 
         relative_dp = os.path.join(dataset_str, dn)
+        if tile_name is not None:
+            # The workspaces of the tiles are located in the workspace of the
+            # corresponding AOI
+            relative_dp = os.path.join(relative_dp, "tiles", tile_name)
         return relative_dp
 
     def check_vissat_workspace(self):
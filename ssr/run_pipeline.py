@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 from shutil import copyfile
 from ssr.utility.logging_extension import logger
 from ssr.path_manager import PathManager
@@ -15,7 +16,17 @@ from ssr.surface_rec.backends.backend_manager import (
 )
 from ssr.input_adapters.run_input_adapter import RunInputAdapterPipeline
 from ssr.utility.os_extension import makedirs_safely
+from ssr.file_handler.ply_file_handler import PLYFileHandler
+from ssr.utility.result_cache import ResultCache
+from ssr.utility.stage_graph import Stage, StageGraph
+from ssr.utility.tool_runner import ToolRunner
+from ssr.utility.telemetry import Telemetry, trace_span
 from ssr.config.ssr_config import SSRConfig
+from ssr.tiling.aoi_tiling import (
+    compute_tiles_from_config,
+    create_tile_config,
+)
+from ssr.tiling.mesh_stitching import stitch_tile_meshes
 
 
 def check_imageio_freeimage_plugin_installation():
@@ -47,24 +58,8 @@ def create_config_from_template(config_template_ifp, config_fp):
     return ssr_config
 
 
-if __name__ == "__main__":
-
-    check_imageio_freeimage_plugin_installation()
-
-    ssr_config_template_ifp = "./configs/pipeline_template.toml"
-    ssr_config_fp = "./configs/pipeline.toml"
-
-    # check if a config was optionally passed as command line argument
-    if len(sys.argv) > 1:
-        ssr_config_fp = sys.argv[1]
-
-    ssr_config = create_config_from_template(
-        ssr_config_template_ifp, ssr_config_fp
-    )
-    SSRConfig.set_instance(ssr_config)
-    ssr_config.read_missing_aoi_data()
-
-    pm = PathManager(
+def create_path_manager(ssr_config, tile_name=None):
+    return PathManager(
         pan_ntf_idp=ssr_config.satellite_image_pan_dp,
         msi_ntf_idp=ssr_config.satellite_image_msi_dp,
         rgb_tif_idp=ssr_config.satellite_image_rgb_tif_dp,
@@ -79,36 +74,313 @@ if __name__ == "__main__":
         hemisphere=ssr_config.hemisphere,
         ul_easting=ssr_config.ul_easting,
         ul_northing=ssr_config.ul_northing,
+        tile_name=tile_name,
     )
-    bm = BackendManager(
-        meshing_backends=ssr_config.meshing_backends,
-        texturing_backends=ssr_config.texturing_backends,
-    )
 
+
+def run_pipeline(ssr_config, pm, bm):
     makedirs_safely(pm.vissat_workspace_dp)
     makedirs_safely(pm.ssr_workspace_dp)
     makedirs_safely(pm.meshlab_temp_dp)
 
+    if ssr_config.use_result_cache:
+        # Meshes and point clouds are large and usually read only once
+        if ssr_config.result_cache_ply_files:
+            excluded_function_names = []
+        else:
+            excluded_function_names = [PLYFileHandler.PLY_ARRAYS_CACHE_NAME]
+        ResultCache.set_instance(
+            ResultCache(
+                pm.result_cache_dp,
+                max_num_bytes=ssr_config.result_cache_max_size_in_mb * 1024**2,
+                hash_file_content=ssr_config.result_cache_hash_file_content,
+                excluded_function_names=excluded_function_names,
+            )
+        )
+
+    ToolRunner.set_instance(
+        ToolRunner(
+            log_dp=pm.tool_log_dp if ssr_config.write_tool_logs else None,
+            timeouts=ssr_config.tool_timeouts,
+            default_timeout=ssr_config.tool_default_timeout,
+            max_num_heavy_calls=ssr_config.tool_max_num_heavy_calls,
+            # Shared by all tiles
+            slot_dp=ssr_config.workspace_ssr_root_dp,
+        )
+    )
+
+    stage_graph = create_stage_graph(ssr_config, pm, bm)
+    run_with_telemetry(
+        ssr_config,
+        pm,
+        "pipeline",
+        lambda: stage_graph.run(
+            skip_unchanged_stages=ssr_config.skip_unchanged_stages
+        ),
+    )
+
+
+def run_with_telemetry(ssr_config, pm, span_name, callback):
+    # Each run writes a separate trace (in the workspace of the AOI), i.e.
+    # the traces of different runs / releases can be compared
+    telemetry = None
+    if ssr_config.write_telemetry:
+        trace_ofn = "trace_{}.jsonl".format(time.strftime("%Y%m%d_%H%M%S"))
+        telemetry = Telemetry(os.path.join(pm.telemetry_dp, trace_ofn))
+    Telemetry.set_instance(telemetry)
+    try:
+        with trace_span(span_name, workspace=pm.ssr_workspace_dp):
+            callback()
+    finally:
+        if telemetry is not None:
+            logger.vinfo("chrome_trace_fp", telemetry.write_chrome_trace())
+        Telemetry.set_instance(None)
+
+
+def create_stage_graph(ssr_config, pm, bm):
+    """Create the stages of the pipeline and their inputs and outputs.
+
+    The params of each stage contain the options of the config influencing
+    its results. The AOI is part of the first stages, i.e. changing the AOI
+    invalidates all stages.
+    """
+    stage_graph = StageGraph(
+        pm.stage_manifest_dp,
+        hash_file_content=ssr_config.stage_manifest_hash_file_content,
+    )
+    aoi_params = {
+        "zone_number": ssr_config.zone_number,
+        "hemisphere": ssr_config.hemisphere,
+        "ul_easting": ssr_config.ul_easting,
+        "ul_northing": ssr_config.ul_northing,
+        "width": ssr_config.width,
+        "height": ssr_config.height,
+        "alt_min": ssr_config.alt_min,
+        "alt_max": ssr_config.alt_max,
+    }
+
     input_adapter_pipeline = RunInputAdapterPipeline(pm)
-    input_adapter_pipeline.run(
-        dataset_adapter=ssr_config.dataset_adapter,
-        run_input_adapter=ssr_config.run_input_adapter,
+    stage_graph.add_stage(
+        Stage(
+            "input_adapter",
+            lambda: input_adapter_pipeline.run(
+                dataset_adapter=ssr_config.dataset_adapter
+            ),
+            input_paths=[pm.pan_ntf_idp, pm.msi_ntf_idp, pm.rgb_tif_idp],
+            output_paths=[pm.sharpened_with_skew_png_dp],
+            params={
+                **aoi_params,
+                "dataset_adapter": ssr_config.dataset_adapter,
+                "extract_msi_pan_image_pairs": ssr_config.extract_msi_pan_image_pairs,
+                "use_consistent_msi_pan_extraction": ssr_config.use_consistent_msi_pan_extraction,
+                "pan_sharpening": ssr_config.pan_sharpening,
+            },
+            enabled=ssr_config.run_input_adapter,
+        )
     )
 
     vissat_pipeline = VisSatPipeline(pm)
     vissat_pipeline.init_vissat()
-    vissat_pipeline.run(ssr_config.reconstruct_sfm_mvs)
+    stage_graph.add_stage(
+        Stage(
+            "vissat",
+            lambda: vissat_pipeline.run(reconstruct_sfm_mvs=True),
+            input_paths=[
+                pm.pan_ntf_idp,
+                pm.pan_png_idp,
+                pm.sharpened_with_skew_png_dp,
+            ],
+            output_paths=[
+                pm.sparse_model_with_skew_idp,
+                pm.depth_map_reparam_with_skew_idp,
+                pm.last_rows_ifp,
+                pm.fused_ifp,
+                pm.fused_vis_ifp,
+            ],
+            params={
+                **aoi_params,
+                "vis_sat_config": ssr_config.vis_sat_config.dict(),
+            },
+            dependencies=["input_adapter"],
+            enabled=ssr_config.reconstruct_sfm_mvs,
+        )
+    )
 
-    pm.check_rec_pan_png_idp()
     preparation_pipeline = PreparationPipeline(pm)
-    preparation_pipeline.run(
-        depth_map_recovery=ssr_config.depth_map_recovery,
-        skew_correction=ssr_config.skew_correction,
+    stage_graph.add_stage(
+        Stage(
+            "depth_map_recovery",
+            preparation_pipeline.run_depth_map_recovery,
+            input_paths=[
+                pm.sparse_model_with_skew_idp,
+                pm.last_rows_ifp,
+                pm.sharpened_with_skew_png_dp,
+                pm.depth_map_reparam_with_skew_idp,
+            ],
+            output_paths=[pm.depth_map_real_with_skew_dp],
+            dependencies=["vissat"],
+            enabled=ssr_config.depth_map_recovery,
+        )
     )
 
+    def run_skew_correction():
+        pm.check_rec_pan_png_idp()
+        preparation_pipeline.run_skew_correction(
+            copy_fused_point_cloud=not ssr_config.depth_map_fusion
+        )
+
+    skew_correction_input_paths = [
+        pm.sparse_model_with_skew_idp,
+        pm.rec_pan_png_idp,
+        pm.sharpened_with_skew_png_dp,
+        pm.depth_map_real_with_skew_dp,
+    ]
+    skew_correction_output_paths = [
+        pm.sparse_model_no_skew_dp,
+        pm.pan_no_skew_png_dp,
+        pm.sharpened_no_skew_png_dp,
+        pm.depth_map_real_no_skew_dp,
+    ]
+    if not ssr_config.depth_map_fusion:
+        skew_correction_input_paths += [pm.fused_ifp, pm.fused_vis_ifp]
+        skew_correction_output_paths += [
+            pm.fused_ofp,
+            pm.fused_vis_no_skew_ofp,
+        ]
+    stage_graph.add_stage(
+        Stage(
+            "skew_correction",
+            run_skew_correction,
+            input_paths=skew_correction_input_paths,
+            output_paths=skew_correction_output_paths,
+            params={"depth_map_fusion": ssr_config.depth_map_fusion},
+            dependencies=["vissat", "depth_map_recovery"],
+            enabled=ssr_config.skew_correction,
+        )
+    )
+
+    stage_graph.add_stage(
+        Stage(
+            "depth_map_fusion",
+            preparation_pipeline.run_depth_map_fusion,
+            input_paths=[
+                pm.sparse_model_no_skew_dp,
+                pm.sharpened_no_skew_png_dp,
+                pm.depth_map_real_no_skew_dp,
+            ],
+            output_paths=[pm.fused_ofp, pm.fused_vis_no_skew_ofp],
+            params={
+                "min_num_consistent_views": ssr_config.depth_map_fusion_min_num_consistent_views,
+                "max_reproj_error": ssr_config.depth_map_fusion_max_reproj_error,
+                "max_depth_error": ssr_config.depth_map_fusion_max_depth_error,
+                "voxel_size": ssr_config.depth_map_fusion_voxel_size,
+            },
+            dependencies=["skew_correction"],
+            enabled=ssr_config.depth_map_fusion,
+        )
+    )
+
+    # The meshing, texturing and reduction tasks are executed as a single
+    # stage, since they are scheduled together
     surface_reconstruction_pipeline = SurfaceReconstructionPipeline(pm, bm)
-    surface_reconstruction_pipeline.run(
-        reconstruct_mesh=ssr_config.reconstruct_mesh,
-        texture_mesh=ssr_config.texture_mesh,
-        lazy=ssr_config.lazy,
+    stage_graph.add_stage(
+        Stage(
+            "surface_reconstruction",
+            lambda: surface_reconstruction_pipeline.run(
+                reconstruct_mesh=ssr_config.reconstruct_mesh,
+                texture_mesh=ssr_config.texture_mesh,
+                reduce_mesh=ssr_config.reduce_mesh,
+                lazy=ssr_config.lazy,
+            ),
+            input_paths=[
+                pm.sparse_model_no_skew_dp,
+                pm.sharpened_no_skew_png_dp,
+                pm.depth_map_real_no_skew_dp,
+                pm.fused_ofp,
+                pm.fused_vis_no_skew_ofp,
+            ],
+            output_paths=[pm.surface_workspace_dp],
+            params={
+                "reconstruct_mesh": ssr_config.reconstruct_mesh,
+                "texture_mesh": ssr_config.texture_mesh,
+                "meshing_backends": bm.meshing_backends,
+                "texturing_backends": bm.texturing_backends,
+                "reduce_mesh": ssr_config.reduce_mesh,
+                "decimation_backends": bm.decimation_backends,
+                "mesh_lod_face_ratios": ssr_config.mesh_lod_face_ratios,
+            },
+            dependencies=["skew_correction", "depth_map_fusion"],
+            enabled=ssr_config.reconstruct_mesh
+            or ssr_config.texture_mesh
+            or ssr_config.reduce_mesh,
+        )
     )
+    return stage_graph
+
+
+def run_tiled_pipeline(ssr_config, pm, bm):
+    # Each tile is processed with a config containing the bounding box of the
+    # tile and a path manager pointing to a separate workspace
+    tiles = compute_tiles_from_config(ssr_config)
+    tile_pms = [
+        create_path_manager(ssr_config, tile_name=tile.get_name())
+        for tile in tiles
+    ]
+    logger.vinfo("num_tiles", len(tiles))
+
+    tile_indices = ssr_config.tile_indices
+    if tile_indices is None:
+        tile_indices = list(range(len(tiles)))
+    for tile_idx in tile_indices:
+        tile = tiles[tile_idx]
+        logger.vinfo("tile", tile)
+        tile_config = create_tile_config(ssr_config, tile)
+        SSRConfig.set_instance(tile_config)
+        run_pipeline(tile_config, tile_pms[tile_idx], bm)
+    SSRConfig.set_instance(ssr_config)
+
+    if ssr_config.stitch_tile_meshes:
+        run_with_telemetry(
+            ssr_config,
+            pm,
+            "stitch_tile_meshes",
+            lambda: stitch_tile_meshes(
+                tiles,
+                tile_pms,
+                pm,
+                bm.meshing_backends,
+                zone_number=ssr_config.zone_number,
+                hemisphere=ssr_config.hemisphere,
+                merge_distance=ssr_config.tile_seam_merge_distance,
+            ),
+        )
+
+
+if __name__ == "__main__":
+
+    check_imageio_freeimage_plugin_installation()
+
+    ssr_config_template_ifp = "./configs/pipeline_template.toml"
+    ssr_config_fp = "./configs/pipeline.toml"
+
+    # check if a config was optionally passed as command line argument
+    if len(sys.argv) > 1:
+        ssr_config_fp = sys.argv[1]
+
+    ssr_config = create_config_from_template(
+        ssr_config_template_ifp, ssr_config_fp
+    )
+    SSRConfig.set_instance(ssr_config)
+    ssr_config.read_missing_aoi_data()
+
+    pm = create_path_manager(ssr_config)
+    bm = BackendManager(
+        meshing_backends=ssr_config.meshing_backends,
+        texturing_backends=ssr_config.texturing_backends,
+        decimation_backends=ssr_config.decimation_backends,
+    )
+
+    if ssr_config.tile_size is None:
+        run_pipeline(ssr_config, pm, bm)
+    else:
+        run_tiled_pipeline(ssr_config, pm, bm)
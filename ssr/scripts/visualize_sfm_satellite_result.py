@@ -6,7 +6,6 @@ from lxml import etree
 
 from lib.latlonalt_enu_converter import enu_to_latlonalt
 
-# from ssr.ssr_types.python_cache import PythonCache
 from ssr.file_handler.colmap_file_handler import ColmapFileHandler
 
 
@@ -106,12 +105,6 @@ def compute_sfm_visualization(
     }
     """
 
-    # cache = PythonCache()
-    # cameras, _ = cache.get_cached_result(
-    #     callback=ColmapFileHandler.parse_colmap_model_folder,
-    #     params=[colmap_model_idp, None],
-    #     unique_id_or_path=1,
-    # )
     cameras, _ = ColmapFileHandler.parse_colmap_model_folder(
         colmap_model_idp, None
     )
@@ -0,0 +1,253 @@
+import numpy as np
+from ssr.ssr_types.camera import Camera
+from ssr.ssr_types.extrinsics import quaternions_to_rotation_matrices
+
+
+class CameraBatch:
+    """Stacked parameters of N cameras for vectorized camera computations.
+
+    The methods operate on all cameras at once. Coordinates with shape (P, 3)
+    (or (P, 2) for image coordinates) are shared by all cameras, coordinates
+    with shape (N, P, 3) are specific to each camera. The results have the
+    shape (N, P, ...).
+    """
+
+    def __init__(
+        self,
+        calibration_mats,
+        rotation_mats,
+        translation_vecs,
+        widths,
+        heights,
+        file_names=None,
+    ):
+        self.calibration_mats = np.asarray(
+            calibration_mats, dtype=float
+        ).reshape((-1, 3, 3))
+        num_cameras = len(self.calibration_mats)
+        self.rotation_mats = np.asarray(rotation_mats, dtype=float).reshape(
+            (-1, 3, 3)
+        )
+        # t = -R c
+        self.translation_vecs = np.asarray(
+            translation_vecs, dtype=float
+        ).reshape((-1, 3))
+        self.widths = np.asarray(widths, dtype=np.int64).reshape(-1)
+        self.heights = np.asarray(heights, dtype=np.int64).reshape(-1)
+        assert len(self.rotation_mats) == num_cameras
+        assert len(self.translation_vecs) == num_cameras
+        assert len(self.widths) == num_cameras
+        assert len(self.heights) == num_cameras
+
+        self.file_names = file_names
+        if file_names is not None:
+            self.file_names = list(file_names)
+            assert len(self.file_names) == num_cameras
+
+    def __len__(self):
+        return len(self.calibration_mats)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return "CameraBatch(num_cameras={})".format(len(self))
+
+    @classmethod
+    def from_cameras(cls, cameras):
+        return cls(
+            [camera.get_calibration_mat() for camera in cameras],
+            [camera.get_rotation_mat() for camera in cameras],
+            [camera.get_translation_vec() for camera in cameras],
+            [camera.width for camera in cameras],
+            [camera.height for camera in cameras],
+            file_names=[camera.file_name for camera in cameras],
+        )
+
+    @classmethod
+    def from_quaternions(
+        cls,
+        calibration_mats,
+        quaternions,
+        translation_vecs,
+        widths,
+        heights,
+        file_names=None,
+    ):
+        return cls(
+            calibration_mats,
+            quaternions_to_rotation_matrices(quaternions),
+            translation_vecs,
+            widths,
+            heights,
+            file_names=file_names,
+        )
+
+    def select(self, key):
+        """Return a new batch with the cameras defined by key.
+
+        The key can be a slice, a boolean mask or an array of indices.
+        """
+        indices = np.arange(len(self))[key]
+        file_names = None
+        if self.file_names is not None:
+            file_names = [self.file_names[index] for index in indices]
+        return CameraBatch(
+            self.calibration_mats[indices],
+            self.rotation_mats[indices],
+            self.translation_vecs[indices],
+            self.widths[indices],
+            self.heights[indices],
+            file_names=file_names,
+        )
+
+    def get_camera_centers(self):
+        # c = -R^T t
+        return -np.einsum(
+            "nji,nj->ni", self.rotation_mats, self.translation_vecs
+        )
+
+    def get_4x4_world_to_cam_mats(self):
+        mats = np.zeros((len(self), 4, 4), dtype=float)
+        mats[:, 0:3, 0:3] = self.rotation_mats
+        mats[:, 0:3, 3] = self.translation_vecs
+        mats[:, 3, 3] = 1
+        return mats
+
+    def get_4x4_cam_to_world_mats(self):
+        mats = np.zeros((len(self), 4, 4), dtype=float)
+        mats[:, 0:3, 0:3] = np.swapaxes(self.rotation_mats, 1, 2)
+        mats[:, 0:3, 3] = self.get_camera_centers()
+        mats[:, 3, 3] = 1
+        return mats
+
+    def get_3x4_proj_mats(self):
+        # P = K [R | t]
+        return (
+            self.calibration_mats @ self.get_4x4_world_to_cam_mats()[:, 0:3, :]
+        )
+
+    def world_to_cam_coords(self, world_coords):
+        # x_cam = R x_world + t
+        world_coords = np.asarray(world_coords, dtype=float)
+        cam_coords = world_coords @ np.swapaxes(self.rotation_mats, 1, 2)
+        cam_coords += self.translation_vecs[:, np.newaxis, :]
+        return cam_coords
+
+    def cam_to_world_coords(self, cam_coords):
+        # x_world = R^T (x_cam - t)
+        cam_coords = np.asarray(cam_coords, dtype=float)
+        return (
+            cam_coords - self.translation_vecs[:, np.newaxis, :]
+        ) @ self.rotation_mats
+
+    def project_world_coords(self, world_coords):
+        """Return the image coordinates (N, P, 2) and depths (N, P).
+
+        The depth corresponds to the z component in camera coordinates.
+        Image coordinates of points with a depth of zero are inf or nan.
+        """
+        cam_coords = self.world_to_cam_coords(world_coords)
+        hom_image_coords = cam_coords @ np.swapaxes(
+            self.calibration_mats, 1, 2
+        )
+        depths = hom_image_coords[..., 2]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            image_coords = hom_image_coords[..., 0:2] / depths[..., np.newaxis]
+        return image_coords, depths
+
+    def is_inside_image(self, image_coords):
+        # The upper left pixel center is (0.5, 0.5), i.e. the image covers
+        # [0, width] x [0, height]
+        x_coords = image_coords[..., 0]
+        y_coords = image_coords[..., 1]
+        return (
+            (x_coords >= 0)
+            & (x_coords < self.widths[:, np.newaxis])
+            & (y_coords >= 0)
+            & (y_coords < self.heights[:, np.newaxis])
+        )
+
+    def compute_visibility(self, world_coords, min_depth=0.0):
+        """Return a boolean array (N, P) indicating visible points.
+
+        A point is visible, if it lies in front of the camera and is
+        projected inside the image (occlusions are not considered).
+        """
+        image_coords, depths = self.project_world_coords(world_coords)
+        return (depths > min_depth) & self.is_inside_image(image_coords)
+
+    def compute_canonical_vectors(self, image_coords):
+        # Vectors K^{-1} [x, y, 1]^T, i.e. vectors with a last component of 1
+        # (see Camera.convert_depth_map_to_cam_coords())
+        image_coords = np.asarray(image_coords, dtype=float)
+        hom_image_coords = np.concatenate(
+            (image_coords, np.ones(image_coords.shape[:-1] + (1,))), axis=-1
+        )
+        inv_calibration_mats = np.linalg.inv(self.calibration_mats)
+        return hom_image_coords @ np.swapaxes(inv_calibration_mats, 1, 2)
+
+    def back_project_image_coords(
+        self,
+        image_coords,
+        depths,
+        depth_map_semantic=Camera.DEPTH_MAP_WRT_CANONICAL_VECTORS,
+    ):
+        """Return the world coordinates (N, P, 3) of the image coordinates.
+
+        The depths (with shape (N, P)) are interpreted according to
+        depth_map_semantic (see Camera).
+        """
+        canonical_vectors = self.compute_canonical_vectors(image_coords)
+        depths = np.asarray(depths, dtype=float)
+        if depth_map_semantic == Camera.DEPTH_MAP_WRT_CANONICAL_VECTORS:
+            cam_coords = canonical_vectors * depths[..., np.newaxis]
+        elif depth_map_semantic == Camera.DEPTH_MAP_WRT_UNIT_VECTORS:
+            norms = np.linalg.norm(canonical_vectors, axis=-1)
+            cam_coords = canonical_vectors * (depths / norms)[..., np.newaxis]
+        else:
+            assert False
+        return self.cam_to_world_coords(cam_coords)
+
+    def compute_extended_proj_and_inv_proj_mats(
+        self, last_rows, value_range=10
+    ):
+        """Vectorized version of compute_extended_proj_and_inv_proj_mat().
+
+        See ssr/surface_rec/preparation/depth_map_recovery.
+        """
+        last_rows = np.asarray(last_rows, dtype=float).reshape((-1, 1, 4))
+        assert len(last_rows) == len(self)
+        proj_mats_4_x_4 = np.concatenate(
+            (self.get_3x4_proj_mats(), last_rows), axis=1
+        )
+
+        proj_scaling_factors = np.ones(len(self), dtype=float)
+        overall_inv_proj_scaling_factors = np.ones(len(self), dtype=float)
+
+        if value_range is not None:
+            proj_scaling_factors = value_range / np.amax(
+                proj_mats_4_x_4, axis=(1, 2)
+            )
+            proj_mats_4_x_4 = (
+                proj_mats_4_x_4 * proj_scaling_factors[:, None, None]
+            )
+
+        inv_proj_mats_4_x_4 = np.linalg.inv(proj_mats_4_x_4)
+        if value_range is not None:
+            inv_proj_scaling_factors = value_range / np.amax(
+                inv_proj_mats_4_x_4, axis=(1, 2)
+            )
+            inv_proj_mats_4_x_4 = (
+                inv_proj_mats_4_x_4 * inv_proj_scaling_factors[:, None, None]
+            )
+            overall_inv_proj_scaling_factors = (
+                inv_proj_scaling_factors / proj_scaling_factors
+            )
+
+        return (
+            proj_mats_4_x_4,
+            inv_proj_mats_4_x_4,
+            proj_scaling_factors,
+            overall_inv_proj_scaling_factors,
+        )
@@ -28,6 +28,30 @@ def quaternion_to_rotation_matrix(q):
     return m
 
 
+def quaternions_to_rotation_matrices(quaternions):
+    # Vectorized version of quaternion_to_rotation_matrix() for an array of
+    # quaternions with shape (..., 4). Returns an array with shape (..., 3, 3)
+    quaternions = np.asarray(quaternions, dtype=float)
+    qq = np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    # Invalid quaternions (i.e. qq == 0) are mapped to the identity
+    identity_quaternion = np.array([1, 0, 0, 0], dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        quaternions = np.where(qq > 0, quaternions / qq, identity_quaternion)
+    qw, qx, qy, qz = np.moveaxis(quaternions, -1, 0)
+
+    m = np.empty(quaternions.shape[:-1] + (3, 3), dtype=float)
+    m[..., 0, 0] = qw * qw + qx * qx - qz * qz - qy * qy
+    m[..., 0, 1] = 2 * qx * qy - 2 * qz * qw
+    m[..., 0, 2] = 2 * qy * qw + 2 * qz * qx
+    m[..., 1, 0] = 2 * qx * qy + 2 * qw * qz
+    m[..., 1, 1] = qy * qy + qw * qw - qz * qz - qx * qx
+    m[..., 1, 2] = 2 * qz * qy - 2 * qx * qw
+    m[..., 2, 0] = 2 * qx * qz - 2 * qy * qw
+    m[..., 2, 1] = 2 * qy * qz + 2 * qw * qx
+    m[..., 2, 2] = qz * qz + qw * qw - qy * qy - qx * qx
+    return m
+
+
 def rotation_matrix_to_quaternion(m):
     # Original C++ Method defined in  pba/src/pba/DataInterface.h
     q = np.array([0, 0, 0, 0], dtype=float)
@@ -180,12 +204,9 @@ class Extrinsics:
         return homogeneous_mat
 
     def cam_to_world_coord_multiple_coords(self, cam_coords):
-
-        num_coords = cam_coords.shape[0]
-        hom_entries = np.ones(num_coords).reshape((num_coords, 1))
-        cam_coords_hom = np.hstack((cam_coords, hom_entries))
-        world_coords_hom = (
-            self.get_4x4_cam_to_world_mat().dot(cam_coords_hom.T).T
-        )
-        world_coords = np.delete(world_coords_hom, 3, 1)
+        # Equivalent to multiplying the homogeneous coordinates with
+        # get_4x4_cam_to_world_mat(), i.e. x_world = R^T x_cam + c
+        cam_coords = np.asarray(cam_coords, dtype=float).reshape((-1, 3))
+        world_coords = cam_coords @ self.get_rotation_mat()
+        world_coords += self.get_camera_center()
         return world_coords
@@ -0,0 +1,306 @@
+import numpy as np
+from ssr.ssr_types.point import Point, Measurement
+
+
+class PointCloud:
+    """Point cloud stored as struct of arrays (instead of a list of Points).
+
+    The measurements of all points are stored in a single (M, 4) array with
+    the columns camera_index, feature_index, x and y. The measurements of
+    point i are given by
+        measurement_data[measurement_offsets[i]:measurement_offsets[i + 1]]
+    """
+
+    COORD_DTYPE = np.float32
+    COLOR_DTYPE = np.uint8
+    NORMAL_DTYPE = np.float32
+    MEASUREMENT_DTYPE = np.float64
+
+    def __init__(
+        self,
+        coords,
+        colors=None,
+        normals=None,
+        ids=None,
+        scalars=None,
+        measurement_offsets=None,
+        measurement_data=None,
+    ):
+        self.coords = np.asarray(coords, dtype=self.COORD_DTYPE).reshape(
+            (-1, 3)
+        )
+        num_points = len(self.coords)
+
+        if colors is None:
+            self.colors = np.full((num_points, 3), 255, dtype=self.COLOR_DTYPE)
+        else:
+            self.colors = np.asarray(colors, dtype=self.COLOR_DTYPE).reshape(
+                (-1, 3)
+            )
+        assert len(self.colors) == num_points
+
+        self.normals = None
+        if normals is not None:
+            self.normals = np.asarray(
+                normals, dtype=self.NORMAL_DTYPE
+            ).reshape((-1, 3))
+            assert len(self.normals) == num_points
+
+        self.ids = None
+        if ids is not None:
+            self.ids = np.asarray(ids, dtype=np.int64)
+            assert len(self.ids) == num_points
+
+        # self.scalars[scalar_key] = array of scalar values
+        self.scalars = {}
+        if scalars is not None:
+            for scalar_key, scalar_values in scalars.items():
+                scalar_values = np.asarray(scalar_values)
+                assert len(scalar_values) == num_points
+                self.scalars[scalar_key] = scalar_values
+
+        assert (measurement_offsets is None) == (measurement_data is None)
+        self.measurement_offsets = None
+        self.measurement_data = None
+        if measurement_offsets is not None:
+            self.measurement_offsets = np.asarray(
+                measurement_offsets, dtype=np.int64
+            )
+            self.measurement_data = np.asarray(
+                measurement_data, dtype=self.MEASUREMENT_DTYPE
+            ).reshape((-1, 4))
+            assert len(self.measurement_offsets) == num_points + 1
+            assert self.measurement_offsets[0] == 0
+            assert self.measurement_offsets[-1] == len(self.measurement_data)
+
+    def __len__(self):
+        return len(self.coords)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return (
+            "PointCloud(num_points={}, normals={}, scalars={}, "
+            "measurements={})".format(
+                len(self),
+                self.has_normals(),
+                list(self.scalars.keys()),
+                self.has_measurements(),
+            )
+        )
+
+    def __getitem__(self, key):
+        # An integer returns a single Point, slices, boolean masks and index
+        # arrays return a new PointCloud
+        if isinstance(key, (int, np.integer)):
+            return self.get_point(key)
+        return self.select(key)
+
+    def has_normals(self):
+        return self.normals is not None
+
+    def has_measurements(self):
+        return self.measurement_offsets is not None
+
+    def get_num_measurements(self):
+        assert self.has_measurements()
+        return np.diff(self.measurement_offsets)
+
+    def get_measurement_data(self, index):
+        assert self.has_measurements()
+        # Normalize negative indices (and check the bounds)
+        index = range(len(self))[index]
+        start = self.measurement_offsets[index]
+        end = self.measurement_offsets[index + 1]
+        return self.measurement_data[start:end]
+
+    def get_hom_coords(self):
+        return np.hstack(
+            (self.coords, np.ones((len(self), 1), dtype=self.COORD_DTYPE))
+        )
+
+    def _select_measurements(self, indices):
+        starts = self.measurement_offsets[:-1][indices]
+        ends = self.measurement_offsets[1:][indices]
+        num_measurements = ends - starts
+        measurement_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(num_measurements, out=measurement_offsets[1:])
+        # Index of each selected measurement in self.measurement_data
+        measurement_indices = np.repeat(
+            starts - measurement_offsets[:-1], num_measurements
+        ) + np.arange(measurement_offsets[-1])
+        return measurement_offsets, self.measurement_data[measurement_indices]
+
+    def select(self, key):
+        """Return a new point cloud with the points defined by key.
+
+        The key can be a slice, a boolean mask or an array of indices.
+        """
+        if isinstance(key, slice):
+            indices = np.arange(len(self))[key]
+        else:
+            key = np.asarray(key)
+            if key.dtype == bool:
+                assert len(key) == len(self)
+                indices = np.flatnonzero(key)
+            else:
+                indices = key.astype(np.int64).reshape(-1)
+
+        measurement_offsets = None
+        measurement_data = None
+        if self.has_measurements():
+            measurement_offsets, measurement_data = self._select_measurements(
+                indices
+            )
+
+        return PointCloud(
+            self.coords[indices],
+            colors=self.colors[indices],
+            normals=None if self.normals is None else self.normals[indices],
+            ids=None if self.ids is None else self.ids[indices],
+            scalars={
+                scalar_key: scalar_values[indices]
+                for scalar_key, scalar_values in self.scalars.items()
+            },
+            measurement_offsets=measurement_offsets,
+            measurement_data=measurement_data,
+        )
+
+    @classmethod
+    def concatenate(cls, point_clouds):
+        """Concatenate point clouds with the same attributes."""
+        assert len(point_clouds) > 0
+        first = point_clouds[0]
+        for point_cloud in point_clouds[1:]:
+            assert point_cloud.has_normals() == first.has_normals()
+            assert (point_cloud.ids is None) == (first.ids is None)
+            assert point_cloud.scalars.keys() == first.scalars.keys()
+            assert point_cloud.has_measurements() == first.has_measurements()
+
+        normals = None
+        if first.has_normals():
+            normals = np.concatenate([pc.normals for pc in point_clouds])
+        ids = None
+        if first.ids is not None:
+            ids = np.concatenate([pc.ids for pc in point_clouds])
+        scalars = {
+            scalar_key: np.concatenate(
+                [pc.scalars[scalar_key] for pc in point_clouds]
+            )
+            for scalar_key in first.scalars.keys()
+        }
+
+        measurement_offsets = None
+        measurement_data = None
+        if first.has_measurements():
+            num_measurements = np.concatenate(
+                [pc.get_num_measurements() for pc in point_clouds]
+            )
+            measurement_offsets = np.zeros(
+                len(num_measurements) + 1, dtype=np.int64
+            )
+            np.cumsum(num_measurements, out=measurement_offsets[1:])
+            measurement_data = np.concatenate(
+                [pc.measurement_data for pc in point_clouds]
+            )
+
+        return cls(
+            np.concatenate([pc.coords for pc in point_clouds]),
+            colors=np.concatenate([pc.colors for pc in point_clouds]),
+            normals=normals,
+            ids=ids,
+            scalars=scalars,
+            measurement_offsets=measurement_offsets,
+            measurement_data=measurement_data,
+        )
+
+    @classmethod
+    def from_coords(cls, coords):
+        # Corresponds to Point.get_points_from_coords()
+        coords = np.asarray(coords).reshape((-1, 3))
+        return cls(coords, ids=np.arange(len(coords)))
+
+    @classmethod
+    def from_points(cls, points):
+        num_points = len(points)
+        coords = np.array(
+            [point.coord for point in points], dtype=float
+        ).reshape((-1, 3))
+        colors = np.array(
+            [point.color for point in points], dtype=float
+        ).reshape((-1, 3))
+
+        normals = None
+        if num_points > 0 and all(point.with_normal for point in points):
+            normals = np.array([point.normal for point in points])
+
+        ids = None
+        if num_points > 0 and all(point.id is not None for point in points):
+            ids = np.array([point.id for point in points])
+
+        scalar_keys = []
+        for point in points:
+            for scalar_key, scalar_value in point.scalars.items():
+                if scalar_value is not None and scalar_key not in scalar_keys:
+                    scalar_keys.append(scalar_key)
+        scalars = {
+            scalar_key: np.array(
+                [
+                    (
+                        np.nan
+                        if point.scalars[scalar_key] is None
+                        else point.scalars[scalar_key]
+                    )
+                    for point in points
+                ]
+            )
+            for scalar_key in scalar_keys
+        }
+
+        measurement_offsets = None
+        measurement_data = None
+        if num_points > 0 and all(
+            point.measurements is not None for point in points
+        ):
+            num_measurements = [len(point.measurements) for point in points]
+            measurement_offsets = np.zeros(num_points + 1, dtype=np.int64)
+            np.cumsum(num_measurements, out=measurement_offsets[1:])
+            measurement_data = np.array(
+                [
+                    measurement.to_list()
+                    for point in points
+                    for measurement in point.measurements
+                ],
+                dtype=cls.MEASUREMENT_DTYPE,
+            ).reshape((-1, 4))
+
+        return cls(
+            coords,
+            colors=np.clip(colors, 0, 255),
+            normals=normals,
+            ids=ids,
+            scalars=scalars,
+            measurement_offsets=measurement_offsets,
+            measurement_data=measurement_data,
+        )
+
+    def get_point(self, index):
+        index = range(len(self))[index]
+        point = Point(coord=self.coords[index], color=self.colors[index])
+        if self.normals is not None:
+            point.set_normal(self.normals[index])
+        if self.ids is not None:
+            point.id = int(self.ids[index])
+        for scalar_key, scalar_values in self.scalars.items():
+            point.scalars[scalar_key] = scalar_values[index]
+        if self.has_measurements():
+            point.measurements = [
+                Measurement.init_from_list(measurement_list)
+                for measurement_list in self.get_measurement_data(index)
+            ]
+        return point
+
+    def to_points(self):
+        # Only use this for code that still requires a list of Points
+        return [self.get_point(index) for index in range(len(self))]
@@ -30,11 +30,13 @@
 #  ===============================================================================================================
 
 
+import io
 import os
 import tarfile
 import shutil
 import unicodedata
 import logging
+import multiprocessing
 
 # first find .NTF file, and extract order_id, prod_id, standard name
 # then extract rpc file and preview image from the .tar file
@@ -55,7 +57,51 @@ def clean_image_info_general(file_name, ift):
     return img_name, order_id, prod_id
 
 
-def process_clean_data_item_general(item, dataset_dir, out_dir, tmp_dir, ift):
+def find_tar_member(tar_members, order_id, prod_id_with_suffix, file_name):
+    # The members are stored in
+    #   <order_id>/<DVD_VOL_X>/<order_id>/<prod_id>_<suffix>/<file_name>
+    for member in tar_members:
+        parts = member.name.split("/")
+        if (
+            len(parts) == 5
+            and parts[0] == order_id
+            and "DVD_VOL" in parts[1]
+            and parts[2] == order_id
+            and parts[3] == prod_id_with_suffix
+            and parts[4] == file_name
+            and member.isfile()
+        ):
+            return member
+    return None
+
+
+def copy_tar_member(tar, member, ofp, chunk_size=1024 * 1024):
+    with tar.extractfile(member) as member_file, open(ofp, "wb") as fp:
+        shutil.copyfileobj(member_file, fp, chunk_size)
+
+
+def copy_tar_member_without_control_characters(
+    tar, member, ofp, chunk_size=1024 * 1024
+):
+    # remove control characters in the (xml) file while streaming it
+    with tar.extractfile(member) as member_file, open(ofp, "w") as fp:
+        text_file = io.TextIOWrapper(
+            member_file, encoding="utf-8", errors="ignore"
+        )
+        while True:
+            content = text_file.read(chunk_size)
+            if not content:
+                break
+            # Classify only the distinct characters of the chunk
+            control_chars = {
+                ord(ch)
+                for ch in set(content)
+                if unicodedata.category(ch)[0] == "C"
+            }
+            fp.write(content.translate(dict.fromkeys(control_chars)))
+
+
+def process_clean_data_item_general(item, dataset_dir, out_dir, ift):
     logging.info("process_clean_data_item: ...")
     if item[-4:] == ".NTF" and os.path.exists(
         os.path.join(dataset_dir, "{}.tar".format(item[:-4]))
@@ -66,20 +112,6 @@ def process_clean_data_item_general(item, dataset_dir, out_dir, tmp_dir, ift):
             os.path.join(dataset_dir, item),
             os.path.join(out_dir, "{}.NTF".format(img_name)),
         )
-        tar = tarfile.open(
-            os.path.join(dataset_dir, "{}.tar".format(item[:-4]))
-        )
-        tar.extractall(os.path.join(tmp_dir, img_name))
-
-        subfolder = "DVD_VOL_1"
-        for x in os.listdir(os.path.join(tmp_dir, img_name, order_id)):
-            if "DVD_VOL" in x:
-                subfolder = x
-                break
-
-        des_folder = os.path.join(
-            tmp_dir, img_name, order_id, subfolder, order_id
-        )
 
         if ift.lower() == "pan":
             suffix = "PAN"
@@ -88,34 +120,37 @@ def process_clean_data_item_general(item, dataset_dir, out_dir, tmp_dir, ift):
         else:
             assert False
 
-        rpc_file = os.path.join(
-            des_folder,
-            "{}_{}".format(prod_id, suffix),
-            "{}.XML".format(img_name),
-        )
-        jpg_file = os.path.join(
-            des_folder,
-            "{}_{}".format(prod_id, suffix),
-            "{}-BROWSE.JPG".format(img_name),
-        )
-        img_files = [rpc_file, jpg_file]
-        for x in img_files:
-            shutil.copy(x, out_dir)
-
-        # remove control characters in the xml file
-        rpc_file = os.path.join(out_dir, "{}.XML".format(img_name))
-        with open(rpc_file, encoding="utf-8", errors="ignore") as fp:
-            content = fp.read()
-        content = "".join(
-            [ch for ch in content if unicodedata.category(ch)[0] != "C"]
-        )
-        with open(rpc_file, "w") as fp:
-            fp.write(content)
+        # Extract only the rpc file and the browse image (instead of the
+        # full archive)
+        tar_fp = os.path.join(dataset_dir, "{}.tar".format(item[:-4]))
+        with tarfile.open(tar_fp) as tar:
+            tar_members = sorted(tar.getmembers(), key=lambda x: x.name)
+            prod_id_with_suffix = "{}_{}".format(prod_id, suffix)
+            rpc_fn = "{}.XML".format(img_name)
+            jpg_fn = "{}-BROWSE.JPG".format(img_name)
+            rpc_member = find_tar_member(
+                tar_members, order_id, prod_id_with_suffix, rpc_fn
+            )
+            jpg_member = find_tar_member(
+                tar_members, order_id, prod_id_with_suffix, jpg_fn
+            )
+            assert rpc_member is not None, "{} not in {}".format(
+                rpc_fn, tar_fp
+            )
+            assert jpg_member is not None, "{} not in {}".format(
+                jpg_fn, tar_fp
+            )
+            copy_tar_member_without_control_characters(
+                tar, rpc_member, os.path.join(out_dir, rpc_fn)
+            )
+            copy_tar_member(tar, jpg_member, os.path.join(out_dir, jpg_fn))
         return True
     return False
 
 
-def clean_data_general(dataset_dirs, out_dir, pairing=None, ift="PAN"):
+def clean_data_general(
+    dataset_dirs, out_dir, pairing=None, ift="PAN", max_processes=None
+):
     # out_dir must exist and be empty
     if not os.path.exists(out_dir):
         os.mkdir(out_dir)
@@ -129,36 +164,33 @@ def clean_data_general(dataset_dirs, out_dir, pairing=None, ift="PAN"):
         "the standard format is: <7 char date><6 char time>-P1BS-<20 char product id>.NTF\n\n"
     )
 
-    tmp_dir = os.path.join(out_dir, "tmp")
-    if os.path.exists(tmp_dir):
-        shutil.rmtree(tmp_dir)
-    os.mkdir(tmp_dir)
-
-    cnt = 0
+    items = []
     if pairing is not None:
         logging.info("pairing: " + str(pairing))
         for p in pairing:
             pan_ntf = p[0]
             item = os.path.basename(pan_ntf)
             dataset_dir = os.path.dirname(pan_ntf)
-            if process_clean_data_item_general(
-                item, dataset_dir, out_dir, tmp_dir, ift
-            ):
-                cnt += 1
+            items.append((item, dataset_dir, out_dir, ift))
     else:
         logging.info("pairing: " + str(pairing))
         for dataset_dir in sorted(dataset_dirs):
             for item in sorted(os.listdir(dataset_dir)):
                 # if 'WV03' not in item:  # only select 'WV03' satellite images
                 #     continue
-                if process_clean_data_item_general(
-                    item, dataset_dir, out_dir, tmp_dir, ift
-                ):
-                    cnt += 1
+                items.append((item, dataset_dir, out_dir, ift))
+
+    if max_processes is None:
+        max_processes = multiprocessing.cpu_count()
+    num_processes = max(1, min(max_processes, len(items)))
+    if num_processes == 1:
+        results = [process_clean_data_item_general(*item) for item in items]
+    else:
+        with multiprocessing.Pool(num_processes) as pool:
+            results = pool.starmap(process_clean_data_item_general, items)
+    cnt = sum(results)
 
     logging.info("processed {} items in total".format(cnt))
-    # remove tmp_dir
-    shutil.rmtree(tmp_dir)
 
 
 if __name__ == "__main__":
@@ -68,7 +68,8 @@ class ExtractionPipeline(object):
         remove_aux_file,
         apply_tone_mapping,
         joint_tone_mapping,
-        geo_crop_coordinates_list=None
+        geo_crop_coordinates_list=None,
+        max_processes=None,
     ):
         used_geo_coordinates = []
         self.write_aoi()
@@ -77,7 +78,7 @@ class ExtractionPipeline(object):
 
         if self.config["steps_to_run"]["clean_data"]:
             start_time = datetime.now()
-            self.clean_data_general(ift)
+            self.clean_data_general(ift, max_processes=max_processes)
             duration = (
                 datetime.now() - start_time
             ).total_seconds() / 60.0  # minutes
@@ -96,7 +97,8 @@ class ExtractionPipeline(object):
                 remove_aux_file,
                 apply_tone_mapping,
                 joint_tone_mapping,
-                geo_crop_coordinates_list=geo_crop_coordinates_list
+                geo_crop_coordinates_list=geo_crop_coordinates_list,
+                max_processes=max_processes,
             )
             duration = (
                 datetime.now() - start_time
@@ -175,7 +177,7 @@ class ExtractionPipeline(object):
         ) as fp:
             json.dump(aoi_dict, fp, indent=2)
 
-    def clean_data_general(self, ift):
+    def clean_data_general(self, ift, max_processes=None):
         dataset_dir = self.config["dataset_dir"]
         work_dir = self.config["work_dir"]
 
@@ -199,7 +201,12 @@ class ExtractionPipeline(object):
             dataset_dir = [
                 dataset_dir,
             ]
-        clean_data_general(dataset_dir, cleaned_data_dir, ift=ift)
+        clean_data_general(
+            dataset_dir,
+            cleaned_data_dir,
+            ift=ift,
+            max_processes=max_processes,
+        )
 
         # stop local timer
         local_timer.mark("Data cleaning done")
@@ -213,7 +220,8 @@ class ExtractionPipeline(object):
         remove_aux_file,
         apply_tone_mapping,
         joint_tone_mapping,
-        geo_crop_coordinates_list=None
+        geo_crop_coordinates_list=None,
+        max_processes=None,
     ):
         work_dir = self.config["work_dir"]
 
@@ -234,7 +242,8 @@ class ExtractionPipeline(object):
             remove_aux_file,
             apply_tone_mapping,
             joint_tone_mapping,
-            geo_crop_coordinates_list=geo_crop_coordinates_list
+            geo_crop_coordinates_list=geo_crop_coordinates_list,
+            max_processes=max_processes,
         )
 
         # stop local timer
@@ -36,9 +36,15 @@ from lib.rpc_model import RPCModel
 from lib.gen_grid import gen_grid
 from lib.check_bbx import check_bbx
 
-from ssr.gdal_utility.translation import perform_translation
+from ssr.gdal_utility.translation import (
+    perform_translation,
+    read_translated_dataset,
+    get_dataset_array,
+    write_array_as_image,
+)
 from ssr.surface_rec.preparation.data_extraction.tone_map_general import (
     tone_map_hdr_to_ldr_general,
+    tone_map_hdr_array_to_ldr_array,
 )
 from ssr.surface_rec.preparation.data_extraction.parse_meta_msi import (
     parse_meta_msi,
@@ -86,12 +92,51 @@ def crop_ntf_general(
         bands,
         ot,
         scale_params,
-        remove_aux_file,
+        remove_aux_file=remove_aux_file,
     )
 
     logging.info("png image to save: {}".format(hdr_img_ofp))
 
 
+def compute_blank_ratio(img):
+    # Same as lib.blank_ratio.blank_ratio(), but for an image in memory
+    if img.ndim == 3:
+        img = np.sum(img, axis=2, dtype=np.float64)
+    cnt = np.sum(img < 1e-6)
+    return float(cnt) / img.size
+
+
+def crop_and_tone_map_ntf_general(
+    in_ntf,
+    ldr_img_ofp,
+    ntf_size=None,
+    bbx_size=None,
+    bands=None,
+    joint_tone_mapping=True,
+    max_blank_ratio=None,
+    remove_aux_file=False,
+):
+    # Works for PAN and MSI images
+
+    # Crop, tone map and check the image in memory, i.e. without writing and
+    # reading an intermediate 16 bit image. The 8 bit image is only encoded,
+    # if the blank ratio of the tone mapped image is acceptable.
+    hdr_ds = read_translated_dataset(
+        in_ntf, ntf_size=ntf_size, bbx_size=bbx_size, bands=bands
+    )
+    hdr_img = get_dataset_array(hdr_ds).astype(np.float32)
+    ldr_img = tone_map_hdr_array_to_ldr_array(hdr_img, joint_tone_mapping)
+    ratio = compute_blank_ratio(ldr_img)
+    if max_blank_ratio is not None and ratio > max_blank_ratio:
+        return ratio
+
+    write_array_as_image(ldr_img, ldr_img_ofp, hdr_ds)
+    if remove_aux_file:
+        os.remove("{}.aux.xml".format(ldr_img_ofp))
+    logging.info("png image to save: {}".format(ldr_img_ofp))
+    return ratio
+
+
 def image_crop_worker_general(
     ntf_file,
     xml_file,
@@ -256,36 +301,44 @@ def image_crop_worker_general(
         # Use QGIS to examine the PNG result
         # (i.e. color range of the created file)
         # ======================================
-        crop_ntf_general(
-            in_ntf=ntf_file,
-            hdr_img_ofp=out_png,
-            ntf_size=(ntf_width, ntf_height),
-            bbx_size=(ul_col, ul_row, width, height),
-            bands=bands,
-            remove_aux_file=remove_aux_file,
-        )
-
-        if apply_tone_mapping:
-            if oft.lower() == "png":
-                tone_map_hdr_to_ldr_general(
-                    out_png, out_png, joint_tone_mapping
-                )
-            else:
+        blank_ratio_thres = 0.2
+        if apply_tone_mapping and oft.lower() == "png":
+            ratio = crop_and_tone_map_ntf_general(
+                in_ntf=ntf_file,
+                ldr_img_ofp=out_png,
+                ntf_size=(ntf_width, ntf_height),
+                bbx_size=(ul_col, ul_row, width, height),
+                bands=bands,
+                joint_tone_mapping=joint_tone_mapping,
+                max_blank_ratio=blank_ratio_thres,
+                remove_aux_file=remove_aux_file,
+            )
+        else:
+            crop_ntf_general(
+                in_ntf=ntf_file,
+                hdr_img_ofp=out_png,
+                ntf_size=(ntf_width, ntf_height),
+                bbx_size=(ul_col, ul_row, width, height),
+                bands=bands,
+                remove_aux_file=remove_aux_file,
+            )
+            if apply_tone_mapping:
                 # If we do not perform tone mapping here, the ratio test below
                 # would remove many images!
                 logging.error("Tone mapping not implemented for GTiff format")
                 assert False
-        else:
-            logging.warning("No tone mapping applied !!!")
+            else:
+                logging.warning("No tone mapping applied !!!")
+            ratio = blank_ratio(out_png)
 
-        ratio = blank_ratio(out_png)
-        if ratio > 0.2:
+        if ratio > blank_ratio_thres:
             logging.warning(
                 "discarding this image due to large portion of black pixels, ratio: {}, ntf: {}".format(
                     ratio, ntf_file
                 )
             )
-            os.remove(out_png)
+            if os.path.exists(out_png):
+                os.remove(out_png)
             return
 
         # save meta_dict
@@ -325,7 +378,8 @@ def image_crop_general(
     remove_aux_file,
     apply_tone_mapping,
     joint_tone_mapping,
-    geo_crop_coordinates_list=None
+    geo_crop_coordinates_list=None,
+    max_processes=None,
 ):
     cleaned_data_dir = os.path.join(work_dir, "cleaned_data")
     ntf_list = glob.glob("{}/*.NTF".format(cleaned_data_dir))
@@ -337,13 +391,46 @@ def image_crop_general(
     if not os.path.exists(tmp_dir):
         os.mkdir(tmp_dir)
 
-    pool = multiprocessing.Pool(multiprocessing.cpu_count())
-    result_file_list = []
-
     cnt = len(ntf_list)
+    if max_processes is None:
+        max_processes = multiprocessing.cpu_count()
+    num_processes = max(1, min(max_processes, cnt))
+
+    result_file_list = []
     if geo_crop_coordinates_list is None:
         geo_crop_coordinates_list = [None] * cnt
+    # The results are stored w.r.t. the order of ntf_list (and not w.r.t. the
+    # order of completion), since the PAN extraction depends on the MSI crop
+    # coordinates
     discretized_geo_coordinates_list = [None] * cnt
+    failed_crops = []
+    finished_cnt = 0
+
+    def report_progress(idx, status):
+        nonlocal finished_cnt
+        finished_cnt += 1
+        logging.info(
+            "finished cropping {}/{} ({}), ntf: {}".format(
+                finished_cnt, cnt, status, ntf_list[idx]
+            )
+        )
+
+    def get_callbacks(idx):
+        def callback(discretized_geo_coords):
+            discretized_geo_coordinates_list[idx] = discretized_geo_coords
+            report_progress(idx, "done")
+
+        def error_callback(exception):
+            failed_crops.append((ntf_list[idx], exception))
+            report_progress(idx, "failed: {}".format(exception))
+
+        return callback, error_callback
+
+    pool = None
+    if execute_parallel:
+        logging.info("cropping images with {} processes".format(num_processes))
+        pool = multiprocessing.Pool(num_processes)
+
     for i in range(cnt):
         ntf_file = ntf_list[i]
         xml_file = xml_list[i]
@@ -356,7 +443,10 @@ def image_crop_general(
         result_file_list.append(result_file)
 
         if execute_parallel:
-            discretized_geo_coords = pool.apply_async(
+            # Submit all crops first, the results are collected by the
+            # callbacks as soon as the corresponding crop is finished
+            callback, error_callback = get_callbacks(i)
+            pool.apply_async(
                 image_crop_worker_general,
                 (
                     ntf_file,
@@ -373,8 +463,9 @@ def image_crop_general(
                     joint_tone_mapping,
                     geo_crop_coordinates_list[i]
                 ),
+                callback=callback,
+                error_callback=error_callback,
             )
-            discretized_geo_coordinates_list[i] = discretized_geo_coords.get()
         else:
             discretized_geo_coordinates_list[i] = image_crop_worker_general(
                 ntf_file,
@@ -391,9 +482,20 @@ def image_crop_general(
                 joint_tone_mapping,
                 geo_crop_coordinates=geo_crop_coordinates_list[i]
             )
+            report_progress(i, "done")
+
+    if pool is not None:
+        pool.close()
+        pool.join()
 
-    pool.close()
-    pool.join()
+    if failed_crops:
+        for ntf_file, exception in failed_crops:
+            logging.error(
+                "cropping failed: {}, ntf: {}".format(exception, ntf_file)
+            )
+        assert False, "cropping of {}/{} images failed".format(
+            len(failed_crops), cnt
+        )
 
     # now try to merge the cropping result
     all_files = []
@@ -43,7 +43,11 @@ def read_hdr_image(in_hdr_png):
     # pngs correctly!!!!
     hdr_img = imageio.imread(in_hdr_png, "PNG-FI").astype(dtype=np.float64)
     # =========================================================================
+    check_hdr_image(hdr_img)
+    return hdr_img
+
 
+def check_hdr_image(hdr_img):
     if hdr_img.ndim == 3:
         red_channel = hdr_img[:, :, 0]
         green_channel = hdr_img[:, :, 1]
@@ -52,8 +56,6 @@ def read_hdr_image(in_hdr_png):
         assert np.amax(green_channel) > 7
         assert np.amax(blue_channel) > 7
 
-    return hdr_img
-
 
 def write_as_ldr_image(hdr_img, ofp):
     if os.path.exists(ofp):
@@ -271,28 +273,41 @@ def log_value(im, chan_idx, print_min):
     logger.info("------------------")
 
 
-# hdr_img is 16-bit, while ldr_img is 8 bit
-def tone_map_hdr_to_ldr_general(
-    hdr_img_ifp,
-    ldr_img_ofp,
-    joint_tone_mapping=True,
-    percentile=0.5,
-    exp=1.0 / 2.2,
+def tone_map_hdr_array_to_ldr_array(
+    hdr_img, joint_tone_mapping=True, percentile=0.5, exp=1.0 / 2.2
 ):
-
-    im = read_hdr_image(hdr_img_ifp)
+    # The tone mapping modifies the (floating point) input array
+    check_hdr_image(hdr_img)
 
     # A single (PAN chromatic / grey) channel has 2 spatial dimension
-    if im.ndim == 2:
-        hdr_result_tone_mapped = tone_map_channel(im, percentile, exp)
+    if hdr_img.ndim == 2:
+        hdr_result_tone_mapped = tone_map_channel(hdr_img, percentile, exp)
 
     # A MSI / color image has 3 channels
-    elif im.ndim == 3:
+    elif hdr_img.ndim == 3:
         if joint_tone_mapping:
-            hdr_result_tone_mapped = tone_map_joint(im, percentile, exp)
+            hdr_result_tone_mapped = tone_map_joint(hdr_img, percentile, exp)
         else:
-            hdr_result_tone_mapped = tone_map_separate(im, percentile, exp)
+            hdr_result_tone_mapped = tone_map_separate(
+                hdr_img, percentile, exp
+            )
     else:
         assert False
 
-    write_as_ldr_image(hdr_result_tone_mapped, ldr_img_ofp)
+    return hdr_result_tone_mapped.astype(dtype=np.uint8)
+
+
+# hdr_img is 16-bit, while ldr_img is 8 bit
+def tone_map_hdr_to_ldr_general(
+    hdr_img_ifp,
+    ldr_img_ofp,
+    joint_tone_mapping=True,
+    percentile=0.5,
+    exp=1.0 / 2.2,
+):
+
+    im = read_hdr_image(hdr_img_ifp)
+    ldr_img = tone_map_hdr_array_to_ldr_array(
+        im, joint_tone_mapping, percentile, exp
+    )
+    write_as_ldr_image(ldr_img, ldr_img_ofp)
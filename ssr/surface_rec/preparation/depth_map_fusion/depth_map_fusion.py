@@ -0,0 +1,490 @@
+import os
+import time
+import multiprocessing
+import numpy as np
+import imageio
+
+from ssr.file_handler.colmap_file_handler import ColmapFileHandler
+from ssr.file_handler.ply_file_handler import PLYFileHandler
+from ssr.ssr_types.camera import Camera
+from ssr.surface_rec.preparation.depth_map_recovery.depth_map_recovery import (
+    parse_depth_map,
+)
+from ssr.surface_rec.preparation.skew_correction.skew_correction import (
+    get_corresponding_depth_map_fn,
+)
+from ssr.utility.logging_extension import logger
+
+# Number of rows processed at once while fusing a depth map
+ROW_BLOCK_HEIGHT = 256
+
+
+def _unique_sorted(values):
+    # Faster than np.unique() for (large) integer arrays
+    values = np.sort(values)
+    is_first = np.ones(len(values), dtype=bool)
+    np.not_equal(values[1:], values[:-1], out=is_first[1:])
+    return values[is_first]
+
+
+def _unique_keys(keys):
+    """Return the unique rows of keys (N, 3) and the inverse indices."""
+    min_key = np.amin(keys, axis=0) if len(keys) > 0 else np.zeros(3)
+    shifted_keys = keys - min_key
+    extents = np.amax(shifted_keys, axis=0) + 1 if len(keys) > 0 else [1] * 3
+    if np.prod(np.asarray(extents, dtype=float)) < 2**62:
+        # Encode the voxel keys as single integers, which is considerably
+        # faster than np.unique(keys, axis=0)
+        encoded_keys = (
+            shifted_keys[:, 0] * extents[1] + shifted_keys[:, 1]
+        ) * extents[2] + shifted_keys[:, 2]
+        order = np.argsort(encoded_keys, kind="stable")
+        sorted_keys = encoded_keys[order]
+        is_first = np.ones(len(keys), dtype=bool)
+        np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=is_first[1:])
+        inverse = np.empty(len(keys), dtype=np.int64)
+        inverse[order] = np.cumsum(is_first) - 1
+        return keys[order[is_first]], inverse
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    return unique_keys, inverse.reshape(-1)
+
+
+class VoxelGrid:
+    """Merges points falling into the same voxel of a (sparse) voxel grid.
+
+    The grid stores for each occupied voxel the sum of the coordinates,
+    colors and normals of the contained points as well as the set of images
+    observing the voxel. Grids of different chunks (e.g. depth maps) are
+    combined with merge().
+    """
+
+    def __init__(self, voxel_size, num_images):
+        self.voxel_size = voxel_size
+        self.num_images = num_images
+        self.keys = np.zeros((0, 3), dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.coord_sums = np.zeros((0, 3), dtype=np.float64)
+        self.color_sums = np.zeros((0, 3), dtype=np.float64)
+        self.normal_sums = np.zeros((0, 3), dtype=np.float64)
+        # Encoded (sorted and unique) pairs voxel_idx * num_images + image_idx
+        self.vis_pairs = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_points(
+        cls,
+        voxel_size,
+        num_images,
+        coords,
+        colors,
+        normals,
+        vis_point_idxs,
+        vis_image_idxs,
+    ):
+        grid = cls(voxel_size, num_images)
+        grid.keys = np.floor(coords / voxel_size).astype(np.int64)
+        grid.counts = np.ones(len(coords), dtype=np.int64)
+        grid.coord_sums = np.asarray(coords, dtype=np.float64)
+        grid.color_sums = np.asarray(colors, dtype=np.float64)
+        grid.normal_sums = np.asarray(normals, dtype=np.float64)
+        grid.vis_pairs = np.asarray(vis_point_idxs, dtype=np.int64) * (
+            num_images
+        ) + np.asarray(vis_image_idxs, dtype=np.int64)
+        # Points of the same voxel are combined by merging an empty grid
+        return cls(voxel_size, num_images).merge(grid)
+
+    def merge(self, other):
+        assert self.voxel_size == other.voxel_size
+        assert self.num_images == other.num_images
+        keys, inverse = _unique_keys(np.concatenate((self.keys, other.keys)))
+        num_voxels = len(keys)
+
+        def _sum_rows(self_values, other_values):
+            values = np.concatenate((self_values, other_values))
+            if values.ndim == 1:
+                return np.bincount(inverse, values, minlength=num_voxels)
+            return np.stack(
+                [
+                    np.bincount(inverse, column, minlength=num_voxels)
+                    for column in values.T
+                ],
+                axis=1,
+            )
+
+        counts = _sum_rows(self.counts, other.counts).astype(np.int64)
+        coord_sums = _sum_rows(self.coord_sums, other.coord_sums)
+        color_sums = _sum_rows(self.color_sums, other.color_sums)
+        normal_sums = _sum_rows(self.normal_sums, other.normal_sums)
+
+        vis_pairs = np.concatenate(
+            (
+                self._remap_vis_pairs(self.vis_pairs, inverse[: len(self)]),
+                self._remap_vis_pairs(other.vis_pairs, inverse[len(self) :]),
+            )
+        )
+
+        self.keys = keys
+        self.counts = counts
+        self.coord_sums = coord_sums
+        self.color_sums = color_sums
+        self.normal_sums = normal_sums
+        self.vis_pairs = _unique_sorted(vis_pairs)
+        return self
+
+    def _remap_vis_pairs(self, vis_pairs, voxel_idx_mapping):
+        voxel_idxs, image_idxs = np.divmod(vis_pairs, self.num_images)
+        return voxel_idx_mapping[voxel_idxs] * self.num_images + image_idxs
+
+    def get_coords(self):
+        return self.coord_sums / self.counts[:, np.newaxis]
+
+    def get_colors(self):
+        colors = np.round(self.color_sums / self.counts[:, np.newaxis])
+        return np.clip(colors, 0, 255).astype(np.uint8)
+
+    def get_normals(self):
+        norms = np.linalg.norm(self.normal_sums, axis=1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            normals = np.where(norms > 0, self.normal_sums / norms, 0)
+        return normals
+
+    def get_visibility(self):
+        """Return vis_offsets and vis_image_idxs of the voxels."""
+        voxel_idxs, image_idxs = np.divmod(self.vis_pairs, self.num_images)
+        vis_offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(voxel_idxs, minlength=len(self)), out=vis_offsets[1:]
+        )
+        return vis_offsets, image_idxs
+
+
+def compute_neighbor_view_indices(camera_batch, max_num_neighbors):
+    # Use the views with the most similar viewing directions
+    viewing_directions = camera_batch.rotation_mats[:, 2, :]
+    cos_angles = viewing_directions @ viewing_directions.T
+    np.fill_diagonal(cos_angles, -np.inf)
+    num_neighbors = min(max_num_neighbors, len(camera_batch) - 1)
+    neighbor_view_indices = np.argsort(-cos_angles, axis=1)[:, :num_neighbors]
+    return neighbor_view_indices
+
+
+def read_color_image(image_ifp):
+    image = imageio.imread(image_ifp)
+    if image.ndim == 2:
+        image = np.dstack((image, image, image))
+    # Ignore the alpha channel
+    return np.asarray(image[:, :, 0:3])
+
+
+def sample_depth_map(depth_map, cols, rows):
+    """Return the depth values at the given (rounded) pixel positions.
+
+    Positions outside of the depth map and invalid depth values are nan.
+    """
+    height, width = depth_map.shape
+    inside = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+    depth_values = np.full(cols.shape, np.nan, dtype=np.float64)
+    depth_values[inside] = depth_map[rows[inside], cols[inside]]
+    return depth_values
+
+
+def compute_normals(world_coords_grid, camera_center):
+    # Normals of the surface defined by the back-projected depth map. Normals
+    # are oriented towards the camera. Normals that can not be computed (e.g.
+    # at depth discontinuities) are replaced by the viewing direction.
+    d_rows, d_cols = np.gradient(world_coords_grid, axis=(0, 1))
+    normals = np.cross(d_cols, d_rows)
+    to_camera = camera_center - world_coords_grid
+    with np.errstate(invalid="ignore"):
+        flip = np.sum(normals * to_camera, axis=-1) < 0
+    normals[flip] *= -1
+    invalid = ~np.all(np.isfinite(normals), axis=-1)
+    normals[invalid] = to_camera[invalid]
+    norms = np.linalg.norm(normals, axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normals = normals / norms
+    return normals
+
+
+def fuse_depth_map(
+    ref_view_idx,
+    camera_batch,
+    depth_map_ifp_list,
+    image_ifp,
+    neighbor_view_indices,
+    voxel_size,
+    min_num_consistent_views,
+    max_reproj_error,
+    max_depth_error,
+    pixel_step=1,
+):
+    """Fuse the depth map of the reference view with its neighbors.
+
+    Each valid pixel of the reference depth map is back-projected and checked
+    for geometric consistency with the neighbor depth maps (following the
+    Colmap fusion): the point is projected into the neighbor view, the
+    neighbor depth at this position is back-projected and projected into the
+    reference view. The point is consistent with the neighbor, if the
+    reprojection error (in pixels) and the relative depth error are small.
+    Points consistent with at least min_num_consistent_views neighbors are
+    returned as (voxel) grid.
+    """
+    start_time = time.time()
+    num_images = len(camera_batch)
+    ref_batch = camera_batch.select([ref_view_idx])
+    neighbor_batch = camera_batch.select(neighbor_view_indices)
+
+    depth_maps = [parse_depth_map(depth_map_ifp_list[ref_view_idx])]
+    depth_maps += [
+        parse_depth_map(depth_map_ifp_list[neighbor_view_idx])
+        for neighbor_view_idx in neighbor_view_indices
+    ]
+    # Scale factors from depth map pixels to image coordinates
+    scales = np.array(
+        [
+            [
+                camera_batch.widths[view_idx] / depth_map.shape[1],
+                camera_batch.heights[view_idx] / depth_map.shape[0],
+            ]
+            for view_idx, depth_map in zip(
+                [ref_view_idx] + list(neighbor_view_indices), depth_maps
+            )
+        ]
+    )
+    ref_depth_map = depth_maps[0][::pixel_step, ::pixel_step]
+    ref_scale = scales[0] * pixel_step
+    color_image = read_color_image(image_ifp)
+    camera_center = ref_batch.get_camera_centers()[0]
+
+    grid = VoxelGrid(voxel_size, num_images)
+    height, width = ref_depth_map.shape
+    for row_start in range(0, height, ROW_BLOCK_HEIGHT):
+        row_end = min(row_start + ROW_BLOCK_HEIGHT, height)
+        # Add one row above and below the block to compute the normals
+        halo_start = max(row_start - 1, 0)
+        halo_end = min(row_end + 1, height)
+        depth_block = ref_depth_map[halo_start:halo_end]
+
+        # Colmap uses the pixel indices (without a shift of 0.5)
+        rows, cols = np.indices(depth_block.shape)
+        rows += halo_start
+        ref_pixel_coords = np.stack((cols, rows), axis=-1) * ref_scale
+        world_coords_grid = ref_batch.back_project_image_coords(
+            ref_pixel_coords.reshape((-1, 2)),
+            depth_block.reshape((1, -1)),
+            Camera.DEPTH_MAP_WRT_CANONICAL_VECTORS,
+        )[0].reshape(depth_block.shape + (3,))
+        normals_grid = compute_normals(world_coords_grid, camera_center)
+
+        block_slice = slice(row_start - halo_start, row_end - halo_start)
+        valid = np.isfinite(depth_block[block_slice])
+        world_coords = world_coords_grid[block_slice][valid]
+        normals = normals_grid[block_slice][valid]
+        ref_pixel_coords = ref_pixel_coords[block_slice][valid]
+        if len(world_coords) == 0:
+            continue
+
+        # Check the consistency with the neighbor views
+        image_coords, proj_depths = neighbor_batch.project_world_coords(
+            world_coords
+        )
+        neighbor_pixel_idxs = np.round(
+            image_coords / scales[1:, np.newaxis, :]
+        )
+        # Points projected to infinity are outside of the neighbor views
+        neighbor_pixel_idxs = np.nan_to_num(
+            neighbor_pixel_idxs, nan=-1, posinf=-1, neginf=-1
+        )
+        neighbor_pixel_idxs = neighbor_pixel_idxs.astype(np.int64)
+        neighbor_depths = np.stack(
+            [
+                sample_depth_map(
+                    depth_map,
+                    neighbor_pixel_idxs[neighbor_idx, :, 0],
+                    neighbor_pixel_idxs[neighbor_idx, :, 1],
+                )
+                for neighbor_idx, depth_map in enumerate(depth_maps[1:])
+            ]
+        )
+        neighbor_world_coords = neighbor_batch.back_project_image_coords(
+            neighbor_pixel_idxs * scales[1:, np.newaxis, :],
+            neighbor_depths,
+            Camera.DEPTH_MAP_WRT_CANONICAL_VECTORS,
+        )
+        reproj_coords, _ = ref_batch.project_world_coords(
+            neighbor_world_coords.reshape((-1, 3))
+        )
+        reproj_coords = reproj_coords[0].reshape(
+            neighbor_world_coords.shape[:-1] + (2,)
+        )
+        with np.errstate(invalid="ignore"):
+            reproj_errors = np.linalg.norm(
+                (reproj_coords - ref_pixel_coords) / ref_scale, axis=-1
+            )
+            depth_errors = (
+                np.abs(proj_depths - neighbor_depths) / neighbor_depths
+            )
+            consistent = (reproj_errors <= max_reproj_error) & (
+                depth_errors <= max_depth_error
+            )
+        num_consistent_views = np.sum(consistent, axis=0)
+        is_fused = num_consistent_views >= min_num_consistent_views
+        if not np.any(is_fused):
+            continue
+
+        # Sample the colors of the reference image
+        color_pixel_idxs = np.round(
+            ref_pixel_coords[is_fused]
+            * [
+                color_image.shape[1] / camera_batch.widths[ref_view_idx],
+                color_image.shape[0] / camera_batch.heights[ref_view_idx],
+            ]
+        ).astype(np.int64)
+        color_pixel_idxs[:, 0] = np.clip(
+            color_pixel_idxs[:, 0], 0, color_image.shape[1] - 1
+        )
+        color_pixel_idxs[:, 1] = np.clip(
+            color_pixel_idxs[:, 1], 0, color_image.shape[0] - 1
+        )
+        colors = color_image[color_pixel_idxs[:, 1], color_pixel_idxs[:, 0]]
+
+        # The point is visible in the reference view and in the consistent
+        # neighbor views
+        num_fused = int(np.sum(is_fused))
+        neighbor_idxs, point_idxs = np.nonzero(consistent[:, is_fused])
+        vis_point_idxs = np.concatenate((np.arange(num_fused), point_idxs))
+        vis_image_idxs = np.concatenate(
+            (
+                np.full(num_fused, ref_view_idx, dtype=np.int64),
+                np.asarray(neighbor_view_indices)[neighbor_idxs],
+            )
+        )
+
+        grid.merge(
+            VoxelGrid.from_points(
+                voxel_size,
+                num_images,
+                world_coords[is_fused],
+                colors,
+                normals[is_fused],
+                vis_point_idxs,
+                vis_image_idxs,
+            )
+        )
+
+    runtime = time.time() - start_time
+    return grid, runtime
+
+
+def _fuse_depth_map_worker(worker_args):
+    # Pool.imap() passes a single argument
+    return fuse_depth_map(*worker_args)
+
+
+def estimate_voxel_size(camera_batch, depth_map_ifp, view_idx=0):
+    # Use the (median) footprint of a depth map pixel as voxel size
+    depth_map = parse_depth_map(depth_map_ifp)
+    median_depth = np.nanmedian(depth_map)
+    fx = camera_batch.calibration_mats[view_idx, 0, 0]
+    scale = camera_batch.widths[view_idx] / depth_map.shape[1]
+    return float(median_depth / fx * scale)
+
+
+def fuse_depth_maps(
+    model_idp,
+    image_idp,
+    depth_map_idp,
+    fused_ply_ofp,
+    fused_vis_ofp,
+    depth_map_type="geometric",
+    min_num_consistent_views=2,
+    max_reproj_error=2.0,
+    max_depth_error=0.01,
+    max_num_neighbors=8,
+    voxel_size=None,
+    pixel_step=1,
+    max_processes=None,
+):
+    """Fuse the depth maps of a Colmap workspace into a single point cloud.
+
+    In contrast to the external Colmap fusion, this allows to fuse the
+    (skew-free) depth maps with different thresholds without re-running the
+    MVS step. The results (fused.ply and fused.ply.vis) are compatible with
+    the Colmap, OpenMVS and MVE backends. Returns the number of fused points.
+    """
+    logger.info("fuse_depth_maps: ...")
+    camera_batch = ColmapFileHandler.parse_colmap_camera_batch(model_idp)
+    num_images = len(camera_batch)
+    assert num_images > 1
+
+    depth_map_ifp_list = [
+        os.path.join(
+            depth_map_idp,
+            get_corresponding_depth_map_fn(file_name, depth_map_type),
+        )
+        for file_name in camera_batch.file_names
+    ]
+    image_ifp_list = [
+        os.path.join(image_idp, file_name)
+        for file_name in camera_batch.file_names
+    ]
+
+    if voxel_size is None:
+        voxel_size = estimate_voxel_size(camera_batch, depth_map_ifp_list[0])
+    logger.vinfo("voxel_size", voxel_size)
+
+    neighbor_view_indices = compute_neighbor_view_indices(
+        camera_batch, max_num_neighbors
+    )
+    worker_args_list = [
+        (
+            ref_view_idx,
+            camera_batch,
+            depth_map_ifp_list,
+            image_ifp_list[ref_view_idx],
+            neighbor_view_indices[ref_view_idx],
+            voxel_size,
+            min_num_consistent_views,
+            max_reproj_error,
+            max_depth_error,
+            pixel_step,
+        )
+        for ref_view_idx in range(num_images)
+    ]
+
+    if max_processes is None:
+        max_processes = multiprocessing.cpu_count()
+    num_processes = max(1, min(max_processes, num_images))
+    logger.vinfo("num_processes", num_processes)
+
+    # The grids of the depth maps are merged as soon as they are available,
+    # i.e. the points of all depth maps are never kept in memory at once
+    grid = VoxelGrid(voxel_size, num_images)
+    if num_processes == 1:
+        for worker_args in worker_args_list:
+            view_grid, runtime = fuse_depth_map(*worker_args)
+            logger.vinfo("runtime (seconds)", runtime)
+            grid.merge(view_grid)
+    else:
+        with multiprocessing.Pool(num_processes) as pool:
+            for view_grid, runtime in pool.imap(
+                _fuse_depth_map_worker, worker_args_list
+            ):
+                logger.vinfo("runtime (seconds)", runtime)
+                grid.merge(view_grid)
+
+    logger.vinfo("num_fused_points", len(grid))
+    PLYFileHandler.write_ply_arrays(
+        fused_ply_ofp,
+        grid.get_coords(),
+        colors=grid.get_colors(),
+        normals=grid.get_normals(),
+    )
+    vis_offsets, vis_image_idxs = grid.get_visibility()
+    ColmapFileHandler.write_fused_vis_file(
+        fused_vis_ofp, vis_offsets, vis_image_idxs
+    )
+    logger.info("fuse_depth_maps: Done")
+    return len(grid)
@@ -1,4 +1,6 @@
 import os
+import time
+import multiprocessing
 import numpy as np
 from ssr.utility.os_extension import get_file_paths_in_dir
 from ssr.ext.read_dense import read_array
@@ -8,9 +10,13 @@ from ssr.file_handler.colmap_file_handler import ColmapFileHandler
 from ssr.ssr_types.point import Point
 from ssr.utility.os_extension import mkdir_safely
 
-# from ssr.ssr_types.python_cache import PythonCache
 from ssr.utility.logging_extension import logger
 from ssr.ssr_types.camera import Camera
+from ssr.ssr_types.camera_batch import CameraBatch
+
+
+# Number of rows processed at once while converting depth maps
+ROW_BLOCK_HEIGHT = 256
 
 
 def contains_nan(array):
@@ -57,33 +63,10 @@ def compute_extended_proj_and_inv_proj_mat(camera, last_row, value_range=10):
 
     # Follow the projection matrix computation here:
     #   https://github.com/Kai-46/ColmapForVisSat/blob/master/src/mvs/image.cc#L75
-
-    proj_mat_3_x_4 = camera.get_4x4_world_to_cam_mat()[0:3, 0:4]
-
-    proj_mat_3_x_4 = np.dot(camera.get_calibration_mat(), proj_mat_3_x_4)
-    proj_mat_4_x_4 = np.vstack((proj_mat_3_x_4, last_row))
-
-    proj_scaling_factor = 1.0
-    overall_inv_proj_scaling_factor = 1.0
-
-    if value_range is not None:
-        proj_scaling_factor = value_range / np.amax(proj_mat_4_x_4)
-        proj_mat_4_x_4 = proj_mat_4_x_4 * proj_scaling_factor
-
-    inv_proj_mat_4_x_4 = np.linalg.inv(proj_mat_4_x_4)
-    if value_range is not None:
-        inv_proj_scaling_factor = value_range / np.amax(inv_proj_mat_4_x_4)
-        inv_proj_mat_4_x_4 = inv_proj_mat_4_x_4 * inv_proj_scaling_factor
-        overall_inv_proj_scaling_factor = (
-            inv_proj_scaling_factor / proj_scaling_factor
-        )
-
-    return (
-        proj_mat_4_x_4,
-        inv_proj_mat_4_x_4,
-        proj_scaling_factor,
-        overall_inv_proj_scaling_factor,
-    )
+    results = CameraBatch.from_cameras(
+        [camera]
+    ).compute_extended_proj_and_inv_proj_mats([last_row], value_range)
+    return tuple(result[0] for result in results)
 
 
 def parse_depth_map(depth_map_fp):
@@ -95,65 +78,180 @@ def parse_depth_map(depth_map_fp):
 
 
 def write_depth_map(depth_map, depth_map_ofp):
-    depth_map_copy = depth_map.copy()
-    depth_map_copy = np.nan_to_num(depth_map_copy, nan=-1e20)
+    # np.nan_to_num() returns a copy, i.e. depth_map remains unchanged
+    depth_map_copy = np.nan_to_num(depth_map, nan=-1e20)
     write_array(depth_map_copy, depth_map_ofp)
 
 
+def compute_inv_proj_mat_row_block(
+    depth_map_reparam_block, inv_proj_mat_row, row_start
+):
+    """Compute a single row of P^{-1} [u, v, 1, m]^T for a block of rows.
+
+    The values are computed as a*u + b*v + c + d*m by broadcasting the column
+    (u) and row (v) vectors, i.e. without creating meshgrids and without the
+    full 4 x N matrix product.
+    """
+    # Follow the c++ fusion code
+    #   https://github.com/Kai-46/ColmapForVisSat/blob/master/src/mvs/fusion.cc#L429
+    # [u, v, 1, m] is consistent with the left vector in eq. (8) on page 5
+    block_height, width = depth_map_reparam_block.shape
+    a, b, c, d = inv_proj_mat_row
+    u = np.arange(width, dtype=np.float64)[np.newaxis, :]
+    v = np.arange(row_start, row_start + block_height, dtype=np.float64)[
+        :, np.newaxis
+    ]
+    # The (block sized) result is computed with double precision to avoid
+    # cancellation errors
+    values = np.multiply(d, depth_map_reparam_block, dtype=np.float64)
+    values += a * u
+    values += b * v + c
+    return values
+
+
 def convert_reparameterized_depth_map_to_world_points(
-    depth_map_reparameterized, inv_proj_mat
+    depth_map_reparameterized, inv_proj_mat, block_height=ROW_BLOCK_HEIGHT
 ):
     # https://github.com/Kai-46/VisSatSatelliteStereo/blob/master/aggregate_2p5d_util.py
 
     height, width = depth_map_reparameterized.shape
-    row, col = np.meshgrid(range(height), range(width), indexing="ij")
-    # reshape((1, -1)) converts the two dimensional array (height, width) into
-    # an array (1, height * width)
-    col = col.reshape((1, -1))
-    row = row.reshape((1, -1))
-    depth = depth_map_reparameterized.reshape((1, -1))
-
-    # Project from depth values to scene space, following the c++ fusion code
-    #   https://github.com/Kai-46/ColmapForVisSat/blob/master/src/mvs/fusion.cc#L429
-    # The next line is consistent with the left vector in eq. (8) on page 5
-    uv1m = np.vstack((col, row, np.ones((1, width * height)), depth))
-    # P^{-1} [u, v, 1, m]^T = [x/Z, y/Z, z/Z, 1/Z]^T
-    hom_world_points = np.dot(inv_proj_mat, uv1m)
-    hom_world_points[0, :] /= hom_world_points[3, :]
-    hom_world_points[1, :] /= hom_world_points[3, :]
-    hom_world_points[2, :] /= hom_world_points[3, :]
-    valid_mask = np.logical_not(np.isnan(hom_world_points[2, :]))
-    coords = hom_world_points[:, valid_mask].T
+    coords_list = []
+    for row_start in range(0, height, block_height):
+        row_end = min(row_start + block_height, height)
+        depth_map_reparam_block = depth_map_reparameterized[row_start:row_end]
+        # P^{-1} [u, v, 1, m]^T = [x/Z, y/Z, z/Z, 1/Z]^T
+        hom_world_points = np.stack(
+            [
+                compute_inv_proj_mat_row_block(
+                    depth_map_reparam_block, inv_proj_mat[row_idx], row_start
+                ).reshape(-1)
+                for row_idx in range(4)
+            ]
+        )
+        hom_world_points[0:3, :] /= hom_world_points[3, :]
+        valid_mask = np.logical_not(np.isnan(hom_world_points[2, :]))
+        coords_list.append(hom_world_points[:, valid_mask].T)
+    coords = np.concatenate(coords_list, axis=0)
     return coords
 
 
 def convert_reparameterized_depth_map_to_real_depth_map(
-    depth_map_reparam, inv_proj_mat, inv_scaling_factor
+    depth_map_reparam,
+    inv_proj_mat,
+    inv_scaling_factor,
+    in_place=False,
+    block_height=ROW_BLOCK_HEIGHT,
 ):
     # depth_map_reparameterized contains nan for invalid depth values
+
+    # Only the last row of P^{-1} [u, v, 1, m]^T = [x/Z, y/Z, z/Z, 1/Z]^T is
+    # required to compute the depth values. The depth map is processed in
+    # blocks of rows to limit the memory of intermediate results.
+    if (
+        in_place
+        and depth_map_reparam.dtype == np.float32
+        and depth_map_reparam.flags.writeable
+    ):
+        depth_map_real = depth_map_reparam
+    else:
+        depth_map_real = np.empty(depth_map_reparam.shape, dtype=np.float32)
+
     height, width = depth_map_reparam.shape
-    row, col = np.meshgrid(range(height), range(width), indexing="ij")
-    # reshape((1, -1)) converts the two dimensional array (height, width) into
-    # an array (1, height * width)
-    col = col.reshape((1, -1))
-    row = row.reshape((1, -1))
-    depth_map_reparam_1d = depth_map_reparam.reshape((1, -1))
-
-    # Project from depth values to scene space, following the c++ fusion code
-    #   https://github.com/Kai-46/ColmapForVisSat/blob/master/src/mvs/fusion.cc#L429
-    # The next line is consistent with the left vector in eq. (8) on page 5
-    uv1m = np.vstack(
-        (col, row, np.ones((1, width * height)), depth_map_reparam_1d)
+    for row_start in range(0, height, block_height):
+        row_end = min(row_start + block_height, height)
+        inverse_z_values = compute_inv_proj_mat_row_block(
+            depth_map_reparam[row_start:row_end], inv_proj_mat[3], row_start
+        )
+        np.divide(
+            inv_scaling_factor,
+            inverse_z_values,
+            out=depth_map_real[row_start:row_end],
+            casting="unsafe",
+        )
+    return depth_map_real
+
+
+def recover_depth_map(
+    img_name,
+    depth_map_reparam_with_skew_ifp,
+    depth_map_real_with_skew_ofp,
+    extended_inv_proj_mat_4_x_4,
+    inv_proj_scaling_factor,
+    check_depth_mat_storing=False,
+    camera=None,
+    depth_map_point_cloud_ofp=None,
+    depth_map_point_cloud_reference_ofp=None,
+):
+    # This function is executed in a separate process, i.e. it receives only
+    # the camera matrices and the file paths (the camera is only required to
+    # create the (optional) depth map point cloud).
+    start_time = time.time()
+
+    # Positions with invalid depth values contain nan
+    depth_map_reparam_with_skew = parse_depth_map(
+        depth_map_reparam_with_skew_ifp
     )
-    # P^{-1} [u, v, 1, m]^T = [x/Z, y/Z, z/Z, 1/Z]^T
-    hom_world_points = np.dot(inv_proj_mat, uv1m)
 
-    inverse_z_values = hom_world_points[3, :]
-    z_values = inv_scaling_factor / inverse_z_values
-    z_values = z_values.astype(np.float32)
-    depth_map_real = z_values.reshape(height, width)
+    depth_map_real_with_skew = convert_reparameterized_depth_map_to_real_depth_map(
+        depth_map_reparam_with_skew,
+        extended_inv_proj_mat_4_x_4,
+        inv_proj_scaling_factor,
+        # The reparameterized depth map is only required to create the
+        # reference point cloud
+        in_place=depth_map_point_cloud_reference_ofp is None,
+    )
 
-    return depth_map_real
+    write_depth_map(depth_map_real_with_skew, depth_map_real_with_skew_ofp)
+
+    if check_depth_mat_storing:
+        depth_map_real_with_skew_loaded = parse_depth_map(
+            depth_map_real_with_skew_ofp
+        )
+        np.testing.assert_allclose(
+            depth_map_real_with_skew, depth_map_real_with_skew_loaded
+        )
+
+    # Consider the same values as parse_depth_map() (i.e. values <= 0 and
+    # nan values are invalid)
+    valid_depth_values = depth_map_real_with_skew[depth_map_real_with_skew > 0]
+    depth_mean_val = np.nan
+    if valid_depth_values.size > 0:
+        depth_mean_val = float(np.mean(valid_depth_values))
+
+    if depth_map_point_cloud_ofp is not None:
+        depth_map_semantic = Camera.DEPTH_MAP_WRT_CANONICAL_VECTORS
+        cam_coords = camera.convert_depth_map_to_cam_coords(
+            depth_map_real_with_skew,
+            depth_map_semantic,
+            shift_to_pixel_center=False,  # Must be false
+            depth_map_display_sparsity=100,
+        )
+        logger.vinfo("cam_to_world_mat: ", camera.get_4x4_cam_to_world_mat())
+        world_coords = camera.cam_to_world_coord_multiple_coords(cam_coords)
+        points = Point.get_points_from_coords(world_coords)
+        PLYFileHandler.write_ply_file(depth_map_point_cloud_ofp, points)
+
+    if depth_map_point_cloud_reference_ofp is not None:
+        coords_reference = convert_reparameterized_depth_map_to_world_points(
+            depth_map_reparam_with_skew, extended_inv_proj_mat_4_x_4
+        )
+        points_reference = Point.get_points_from_coords(coords_reference)
+        PLYFileHandler.write_ply_file(
+            depth_map_point_cloud_reference_ofp, points_reference
+        )
+
+    runtime = time.time() - start_time
+    return img_name, depth_mean_val, runtime
+
+
+def write_depth_map_recovery_runtimes(runtime_ofp, recovery_results):
+    with open(runtime_ofp, "w") as fp:
+        fp.write("img_name, depth_mean_val, duration (seconds)\n")
+        total = 0.0
+        for img_name, depth_mean_val, runtime in recovery_results:
+            fp.write("{}, {}, {}\n".format(img_name, depth_mean_val, runtime))
+            total += runtime
+        fp.write("\ntotal: {} seconds\n".format(total))
 
 
 def recover_depth_maps(
@@ -163,6 +261,7 @@ def recover_depth_maps(
     depth_map_reparam_with_skew_idp,
     depth_map_real_with_skew_odp,
     depth_map_type="geometric",
+    max_processes=None,
     # Optional parameters
     check_inv_proj_mat=False,
     inv_proj_mat_ifp=None,
@@ -171,6 +270,7 @@ def recover_depth_maps(
     depth_map_point_cloud_odp=None,
     create_depth_map_point_cloud_reference=False,
     depth_map_point_cloud_reference_odp=None,
+    runtime_ofp=None,
 ):
 
     mkdir_safely(depth_map_real_with_skew_odp)
@@ -198,21 +298,25 @@ def recover_depth_maps(
     cameras, points3D = ColmapFileHandler.parse_colmap_model_folder(
         model_with_skew_idp, image_with_skew_idp
     )
-    # cache = PythonCache()
-    # cameras, points3D = cache.get_cached_result(
-    #     callback=ColmapFileHandler.parse_colmap_model_folder,
-    #     params=[model_with_skew_idp, image_with_skew_idp],
-    #     unique_id_or_path=1,
-    # )
-
-    depth_map_semantic = Camera.DEPTH_MAP_WRT_CANONICAL_VECTORS
 
     logger.vinfo("depth_map_real_with_skew_odp", depth_map_real_with_skew_odp)
 
-    for camera in cameras[::-1]:
-        img_name = camera.file_name
+    cameras = cameras[::-1]
+    # Compute the matrices of all cameras at once
+    (
+        _,
+        extended_inv_proj_mats_4_x_4,
+        _,
+        inv_proj_scaling_factors,
+    ) = CameraBatch.from_cameras(
+        cameras
+    ).compute_extended_proj_and_inv_proj_mats(
+        [last_rows[camera.file_name] for camera in cameras]
+    )
 
-        logger.vinfo("img_name", img_name)
+    worker_args_list = []
+    for camera_idx, camera in enumerate(cameras):
+        img_name = camera.file_name
 
         depth_map_name = img_name + "." + depth_map_type + ".bin"
         depth_map_reparam_with_skew_ifp = os.path.join(
@@ -241,13 +345,8 @@ def recover_depth_maps(
             )
             assert False
 
-        last_row = last_rows[img_name]
-        (
-            _,
-            extended_inv_proj_mat_4_x_4,
-            _,
-            inv_proj_scaling_factor,
-        ) = compute_extended_proj_and_inv_proj_mat(camera, last_row)
+        extended_inv_proj_mat_4_x_4 = extended_inv_proj_mats_4_x_4[camera_idx]
+        inv_proj_scaling_factor = inv_proj_scaling_factors[camera_idx]
 
         if check_inv_proj_mat:
             extended_inv_proj_mat_4_x_4_reference = inv_proj_mats[img_name]
@@ -256,55 +355,45 @@ def recover_depth_maps(
                 extended_inv_proj_mat_4_x_4_reference,
             )
 
-        # Positions with invalid depth values contain nan
-        depth_map_reparam_with_skew = parse_depth_map(
-            depth_map_reparam_with_skew_ifp
-        )
-
-        depth_map_real_with_skew = (
-            convert_reparameterized_depth_map_to_real_depth_map(
-                depth_map_reparam_with_skew,
+        worker_args_list.append(
+            (
+                img_name,
+                depth_map_reparam_with_skew_ifp,
+                depth_map_real_with_skew_ofp,
                 extended_inv_proj_mat_4_x_4,
                 inv_proj_scaling_factor,
+                check_depth_mat_storing,
+                camera if create_depth_map_point_cloud else None,
+                depth_map_point_cloud_ofp,
+                depth_map_point_cloud_reference_ofp,
             )
         )
 
-        write_depth_map(depth_map_real_with_skew, depth_map_real_with_skew_ofp)
-
-        depth_map_real_with_skew_loaded = parse_depth_map(
-            depth_map_real_with_skew_ofp
-        )
-        if check_depth_mat_storing:
-            np.testing.assert_allclose(
-                depth_map_real_with_skew, depth_map_real_with_skew_loaded
-            )
-
-        depth_mean_val = np.nanmean(depth_map_real_with_skew_loaded)
+    if max_processes is None:
+        max_processes = multiprocessing.cpu_count()
+    num_processes = max(1, min(max_processes, len(worker_args_list)))
+    logger.vinfo("num_processes", num_processes)
+
+    if num_processes == 1:
+        recovery_results = [
+            recover_depth_map(*worker_args) for worker_args in worker_args_list
+        ]
+    else:
+        with multiprocessing.Pool(num_processes) as pool:
+            async_results = [
+                pool.apply_async(recover_depth_map, worker_args)
+                for worker_args in worker_args_list
+            ]
+            recovery_results = [
+                async_result.get() for async_result in async_results
+            ]
+
+    for img_name, depth_mean_val, runtime in recovery_results:
+        logger.vinfo("img_name", img_name)
         logger.vinfo("depth_mean_val", depth_mean_val)
+        logger.vinfo("runtime (seconds)", runtime)
 
-        if create_depth_map_point_cloud:
-            cam_coords = camera.convert_depth_map_to_cam_coords(
-                depth_map_real_with_skew,
-                depth_map_semantic,
-                shift_to_pixel_center=False,  # Must be false
-                depth_map_display_sparsity=100,
-            )
-            logger.vinfo(
-                "cam_to_world_mat: ", camera.get_4x4_cam_to_world_mat()
-            )
-            world_coords = camera.cam_to_world_coord_multiple_coords(
-                cam_coords
-            )
-            points = Point.get_points_from_coords(world_coords)
-            PLYFileHandler.write_ply_file(depth_map_point_cloud_ofp, points)
+    if runtime_ofp is not None:
+        write_depth_map_recovery_runtimes(runtime_ofp, recovery_results)
 
-        if create_depth_map_point_cloud_reference:
-            coords_reference = (
-                convert_reparameterized_depth_map_to_world_points(
-                    depth_map_reparam_with_skew, extended_inv_proj_mat_4_x_4
-                )
-            )
-            points_reference = Point.get_points_from_coords(coords_reference)
-            PLYFileHandler.write_ply_file(
-                depth_map_point_cloud_reference_ofp, points_reference
-            )
+    return recovery_results
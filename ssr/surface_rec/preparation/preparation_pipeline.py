@@ -2,6 +2,8 @@ from distutils.dir_util import copy_tree
 from distutils.file_util import copy_file
 from ssr.utility.os_extension import mkdir_safely
 from ssr.utility.os_extension import makedirs_safely
+from ssr.utility.os_extension import get_file_paths_in_dir
+from ssr.utility.telemetry import trace_span
 
 
 from ssr.surface_rec.preparation.data_extraction.extraction_pipeline import (
@@ -14,6 +16,9 @@ from ssr.surface_rec.preparation.depth_map_recovery.depth_map_recovery import (
 from ssr.surface_rec.preparation.skew_correction.skew_correction import (
     compute_skew_free_camera_models,
 )
+from ssr.surface_rec.preparation.depth_map_fusion.depth_map_fusion import (
+    fuse_depth_maps,
+)
 
 
 class PreparationPipeline:
@@ -31,6 +36,7 @@ class PreparationPipeline:
         apply_tone_mapping,
         joint_tone_mapping,
         geo_crop_coordinates_list=None,
+        max_processes=None,
     ):
 
         pipeline = ExtractionPipeline(pan_or_msi_config_fp)
@@ -42,6 +48,7 @@ class PreparationPipeline:
             apply_tone_mapping,
             joint_tone_mapping,
             geo_crop_coordinates_list=geo_crop_coordinates_list,
+            max_processes=max_processes,
         )
         return extracted_crops
 
@@ -49,29 +56,30 @@ class PreparationPipeline:
         self,
         depth_map_recovery=True,
         skew_correction=True,
+        depth_map_fusion=False,
     ):
+        mkdir_safely(self.pm.ssr_workspace_dp)
+        if depth_map_recovery:
+            self.run_depth_map_recovery()
+        if skew_correction:
+            self.run_skew_correction(
+                copy_fused_point_cloud=not depth_map_fusion
+            )
+        if depth_map_fusion:
+            self.run_depth_map_fusion()
 
-        # === Additional options for extract_pan and extract_msi === #
-        oft = "png"
-        remove_aux_file = False
-        apply_tone_mapping = True
-        joint_tone_mapping = (
-            False  # Separate tone mapping yields much better results
-        )
-        execute_parallel = True
-
+    def run_depth_map_recovery(self):
         pm = self.pm
-        mkdir_safely(pm.ssr_workspace_dp)
-
-        if depth_map_recovery:
-            makedirs_safely(pm.depth_map_real_with_skew_dp)
-            recover_depth_maps(
+        makedirs_safely(pm.depth_map_real_with_skew_dp)
+        with trace_span("recover_depth_maps") as span:
+            recovery_results = recover_depth_maps(
                 model_with_skew_idp=pm.sparse_model_with_skew_idp,
                 last_rows_ifp=pm.last_rows_ifp,
                 image_with_skew_idp=pm.sharpened_with_skew_png_dp,
                 depth_map_reparam_with_skew_idp=pm.depth_map_reparam_with_skew_idp,
                 depth_map_real_with_skew_odp=pm.depth_map_real_with_skew_dp,
                 depth_map_type="geometric",
+                max_processes=self.ssr_config.depth_map_recovery_max_processes,
                 # Optional parameters
                 check_inv_proj_mat=False,
                 inv_proj_mat_ifp=None,
@@ -80,17 +88,19 @@ class PreparationPipeline:
                 depth_map_point_cloud_odp=None,
                 create_depth_map_point_cloud_reference=False,
                 depth_map_point_cloud_reference_odp=None,
+                runtime_ofp=pm.depth_map_recovery_runtime_ofp,
             )
+            span.set_count("num_depth_maps", len(recovery_results))
 
-        if skew_correction:
-            mkdir_safely(pm.sparse_model_no_skew_dp)
+    def run_skew_correction(self, copy_fused_point_cloud=True):
+        pm = self.pm
+        mkdir_safely(pm.sparse_model_no_skew_dp)
 
-            # Copy the original sparse model and overwrite it with the values
-            # from the next step
-            copy_tree(
-                pm.sparse_model_with_skew_idp, pm.sparse_model_no_skew_dp
-            )
+        # Copy the original sparse model and overwrite it with the values
+        # from the next step
+        copy_tree(pm.sparse_model_with_skew_idp, pm.sparse_model_no_skew_dp)
 
+        with trace_span("compute_skew_free_camera_models") as span:
             compute_skew_free_camera_models(
                 colmap_model_with_skew_idp=pm.sparse_model_with_skew_idp,
                 gray_image_with_skew_idp=pm.rec_pan_png_idp,
@@ -101,8 +111,33 @@ class PreparationPipeline:
                 color_image_no_skew_odp=pm.sharpened_no_skew_png_dp,
                 depth_map_no_skew_odp=pm.depth_map_real_no_skew_dp,
                 perform_warping_evaluation=False,
+                max_processes=self.ssr_config.skew_correction_max_processes,
+                cv2_num_threads=self.ssr_config.skew_correction_cv2_num_threads,
+            )
+            span.set_count(
+                "num_images",
+                len(get_file_paths_in_dir(pm.sharpened_no_skew_png_dp)),
             )
 
+        if copy_fused_point_cloud:
             # Copy corresponding fused result
             copy_file(pm.fused_ifp, pm.fused_ofp)
             copy_file(pm.fused_vis_ifp, pm.fused_vis_no_skew_ofp)
+
+    def run_depth_map_fusion(self):
+        pm = self.pm
+        with trace_span("fuse_depth_maps") as span:
+            num_fused_points = fuse_depth_maps(
+                model_idp=pm.sparse_model_no_skew_dp,
+                image_idp=pm.sharpened_no_skew_png_dp,
+                depth_map_idp=pm.depth_map_real_no_skew_dp,
+                fused_ply_ofp=pm.fused_ofp,
+                fused_vis_ofp=pm.fused_vis_no_skew_ofp,
+                depth_map_type="geometric",
+                min_num_consistent_views=self.ssr_config.depth_map_fusion_min_num_consistent_views,
+                max_reproj_error=self.ssr_config.depth_map_fusion_max_reproj_error,
+                max_depth_error=self.ssr_config.depth_map_fusion_max_depth_error,
+                voxel_size=self.ssr_config.depth_map_fusion_voxel_size,
+                max_processes=self.ssr_config.depth_map_fusion_max_processes,
+            )
+            span.set_count("num_fused_points", num_fused_points)
@@ -1,6 +1,7 @@
 import os
 import numpy as np
 import copy
+import multiprocessing
 import imageio
 import cv2
 
@@ -34,11 +35,83 @@ def fix_affine_matrix(original_mat):
     return fixed_mat
 
 
+def is_horizontal_shear_mat(affine_mat):
+    # Checks if the 2x3 matrix has the form [1, s, t; 0, 1, 0]
+    return (
+        affine_mat[0, 0] == 1
+        and affine_mat[1, 0] == 0
+        and affine_mat[1, 1] == 1
+        and affine_mat[1, 2] == 0
+    )
+
+
+def compute_cubic_kernel_weights(fractional_offsets, a=-0.75):
+    # Weights of the four taps at (-1, 0, 1, 2) relative to floor(x) using
+    # the cubic convolution kernel of cv2.INTER_CUBIC (i.e. a=-0.75)
+    #   https://en.wikipedia.org/wiki/Bicubic_interpolation
+    t = fractional_offsets
+    distances = np.abs(np.stack([t + 1, t, t - 1, t - 2], axis=1))
+    near_weights = ((a + 2) * distances - (a + 3)) * distances**2 + 1
+    far_weights = ((a * distances - 5 * a) * distances + 8 * a) * distances
+    far_weights -= 4 * a
+    return np.where(distances <= 1, near_weights, far_weights)
+
+
+def shear_rows(data_mat, dst_to_src_mat):
+    """Warp data_mat with a horizontal shear using cubic interpolation.
+
+    dst_to_src_mat must be a 2x3 matrix of the form [1, a, b; 0, 1, 0], i.e.
+    each output row y is the input row shifted by a * y + b. Thus, each row
+    can be computed with a 1D interpolation using the same kernel weights
+    for all pixels of the row. Pixels outside of the input are treated like
+    cv2.BORDER_CONSTANT with value 0.
+    """
+    assert is_horizontal_shear_mat(dst_to_src_mat)
+
+    height, width = data_mat.shape[0:2]
+    row_offsets = (
+        dst_to_src_mat[0, 1] * np.arange(height, dtype=np.float64)
+        + dst_to_src_mat[0, 2]
+    )
+    integer_offsets = np.floor(row_offsets).astype(int)
+    weights = compute_cubic_kernel_weights(
+        row_offsets - integer_offsets
+    ).astype(np.float32)
+    tap_offsets = [-1, 0, 1, 2]
+
+    data_mat_sheared = np.zeros(data_mat.shape, dtype=np.float32)
+    for y in range(height):
+        input_row = data_mat[y].astype(np.float32)
+        output_row = data_mat_sheared[y]
+        for tap_offset, weight in zip(tap_offsets, weights[y]):
+            offset = integer_offsets[y] + tap_offset
+            # Output range [begin, end) reading input values in the range
+            # [begin + offset, end + offset)
+            begin = max(0, -offset)
+            end = min(width, width - offset)
+            if begin < end:
+                output_row[begin:end] += (
+                    weight * input_row[begin + offset : end + offset]
+                )
+
+    if np.issubdtype(data_mat.dtype, np.integer):
+        dtype_info = np.iinfo(data_mat.dtype)
+        np.rint(data_mat_sheared, out=data_mat_sheared)
+        np.clip(
+            data_mat_sheared,
+            dtype_info.min,
+            dtype_info.max,
+            out=data_mat_sheared,
+        )
+    return data_mat_sheared.astype(data_mat.dtype, copy=False)
+
+
 def remove_skew_from_matrix(
     data_mat,
     remove_skew_mat,
     use_inverse_warping=False,
     interpolation_type=cv2.INTER_CUBIC,
+    use_shear_resampling=True,
 ):
     # https://github.com/SBCV/open3d_colormap_opt_z_buffering/blob/update_to_open3d_0_10/demo.py
     assert interpolation_type in [cv2.INTER_NEAREST, cv2.INTER_CUBIC]
@@ -67,6 +140,25 @@ def remove_skew_from_matrix(
     # Fix cv2 affine warping matrix offset
     remove_skew_mat_top_rows = fix_affine_matrix(remove_skew_mat_top_rows)
 
+    # The skew removal is a pure horizontal shear, i.e. each output row can be
+    # computed with a 1D interpolation of the input row. For (integer) images
+    # this is faster than the 2D interpolation of cv2.warpAffine(). Depth maps
+    # are still warped with cv2.warpAffine(), since the 2D kernel marks also
+    # the vertical neighbors of invalid (i.e. nan) depth values as invalid.
+    if (
+        use_shear_resampling
+        and interpolation_type == cv2.INTER_CUBIC
+        and np.issubdtype(data_mat.dtype, np.integer)
+    ):
+        if use_inverse_warping:
+            dst_to_src_mat = remove_skew_mat_top_rows
+        else:
+            dst_to_src_mat = cv2.invertAffineTransform(
+                remove_skew_mat_top_rows
+            )
+        if is_horizontal_shear_mat(dst_to_src_mat):
+            return shear_rows(data_mat, dst_to_src_mat)
+
     data_mat_skew_free = cv2.warpAffine(
         data_mat,
         remove_skew_mat_top_rows,
@@ -87,102 +179,74 @@ def get_corresponding_depth_map_fn(image_ifn, depth_map_type="geometric"):
     return image_ifn + "." + depth_map_type + ".bin"
 
 
-def compute_skew_free_camera_models(
-    colmap_model_with_skew_idp,
+def _init_skew_correction_worker(cv2_num_threads):
+    # Limit the number of threads used by OpenCV in each process, i.e. the
+    # processes and the OpenCV threads do not oversubscribe the cpu cores
+    if cv2_num_threads is not None:
+        cv2.setNumThreads(cv2_num_threads)
+
+
+def compute_skew_free_camera_model(
+    camera,
+    num_cameras,
     gray_image_with_skew_idp,
     color_image_with_skew_idp,
     depth_map_with_skew_idp,
-    colmap_model_no_skew_odp,
     gray_image_no_skew_odp,
     color_image_no_skew_odp,
     depth_map_no_skew_odp,
-    perform_warping_evaluation=False,
     interpolation_type=cv2.INTER_CUBIC,
 ):
-    assert colmap_model_with_skew_idp != colmap_model_no_skew_odp
-    assert gray_image_with_skew_idp != gray_image_no_skew_odp
-    assert depth_map_with_skew_idp != depth_map_no_skew_odp
+    logger.vinfo("camera.id", str(camera.id) + " of " + str(num_cameras))
+    logger.vinfo("camera.file_name", camera.file_name)
 
-    if gray_image_no_skew_odp is not None:
-        mkdir_safely(gray_image_no_skew_odp)
+    intrinsic_mat = camera.get_calibration_mat()
+    (
+        skew_mat,
+        intrinsic_mat_wo_skew,
+    ) = Camera.compute_intrinsic_skew_decomposition(intrinsic_mat)
+    image_invert_skew_mat = np.linalg.inv(skew_mat)
 
-    if color_image_no_skew_odp is not None:
-        mkdir_safely(color_image_no_skew_odp)
+    image_ifn = camera.file_name
+    image_stem, ext = os.path.splitext(image_ifn)
 
-    if depth_map_no_skew_odp is not None:
-        mkdir_safely(depth_map_no_skew_odp)
+    if gray_image_with_skew_idp is not None:
 
-    logger.vinfo("image_without_skew_odp", gray_image_no_skew_odp)
-    logger.vinfo("interpolation_type", interpolation_type)
-
-    cameras = ColmapFileHandler.parse_colmap_cams(
-        colmap_model_with_skew_idp, gray_image_with_skew_idp
-    )
-    # cameras, _ = ColmapFileHandler.parse_colmap_model_folder(
-    #   colmap_model_idp, image_idp
-    # )
-
-    num_cameras = len(cameras)
-    skew_free_camera_list = []
-
-    pil_better_count = 0
-    mat_better_count = 0
-    patt_count = 0
-    for camera in cameras:
-        logger.vinfo("camera.id", str(camera.id) + " of " + str(num_cameras))
-        logger.vinfo("camera.file_name", camera.file_name)
+        image_ifp = os.path.join(gray_image_with_skew_idp, image_ifn)
+        mat_image_ofp = os.path.join(gray_image_no_skew_odp, image_stem + ext)
 
-        intrinsic_mat = camera.get_calibration_mat()
-        (
-            skew_mat,
-            intrinsic_mat_wo_skew,
-        ) = Camera.compute_intrinsic_skew_decomposition(intrinsic_mat)
-        image_invert_skew_mat = np.linalg.inv(skew_mat)
-
-        image_ifn = camera.file_name
-        image_stem, ext = os.path.splitext(image_ifn)
-
-        if gray_image_with_skew_idp is not None:
-
-            image_ifp = os.path.join(gray_image_with_skew_idp, image_ifn)
-            mat_image_ofp = os.path.join(
-                gray_image_no_skew_odp, image_stem + ext
-            )
-
-            mat_image = imageio.imread(image_ifp)
-            mat_image_skew_free = remove_skew_from_matrix(
-                mat_image,
-                image_invert_skew_mat,
-                interpolation_type=interpolation_type,
-            )
-            imageio.imwrite(mat_image_ofp, mat_image_skew_free)
+        mat_image = imageio.imread(image_ifp)
+        mat_image_skew_free = remove_skew_from_matrix(
+            mat_image,
+            image_invert_skew_mat,
+            interpolation_type=interpolation_type,
+        )
+        imageio.imwrite(mat_image_ofp, mat_image_skew_free)
 
-        if color_image_with_skew_idp is not None:
-            image_ifp = os.path.join(color_image_with_skew_idp, image_ifn)
-            mat_image_ofp = os.path.join(
-                color_image_no_skew_odp, image_stem + ext
-            )
+    if color_image_with_skew_idp is not None:
+        image_ifp = os.path.join(color_image_with_skew_idp, image_ifn)
+        mat_image_ofp = os.path.join(color_image_no_skew_odp, image_stem + ext)
 
-            mat_image = imageio.imread(image_ifp)
-            mat_image_skew_free = remove_skew_from_matrix(
-                mat_image,
-                image_invert_skew_mat,
-                interpolation_type=interpolation_type,
-            )
-            imageio.imwrite(mat_image_ofp, mat_image_skew_free)
-
-        if depth_map_with_skew_idp is not None:
-            depth_map_fn = get_corresponding_depth_map_fn(image_ifn)
-            depth_ifp = os.path.join(depth_map_with_skew_idp, depth_map_fn)
-            depth_ofp = os.path.join(depth_map_no_skew_odp, depth_map_fn)
-
-            depth_mat = parse_depth_map(depth_ifp)
-            depth_mat_transformed = remove_skew_from_matrix(
-                depth_mat,
-                image_invert_skew_mat,
-                interpolation_type=interpolation_type,
-            )
-            write_depth_map(depth_mat_transformed, depth_ofp)
+        mat_image = imageio.imread(image_ifp)
+        mat_image_skew_free = remove_skew_from_matrix(
+            mat_image,
+            image_invert_skew_mat,
+            interpolation_type=interpolation_type,
+        )
+        imageio.imwrite(mat_image_ofp, mat_image_skew_free)
+
+    if depth_map_with_skew_idp is not None:
+        depth_map_fn = get_corresponding_depth_map_fn(image_ifn)
+        depth_ifp = os.path.join(depth_map_with_skew_idp, depth_map_fn)
+        depth_ofp = os.path.join(depth_map_no_skew_odp, depth_map_fn)
+
+        depth_mat = parse_depth_map(depth_ifp)
+        depth_mat_transformed = remove_skew_from_matrix(
+            depth_mat,
+            image_invert_skew_mat,
+            interpolation_type=interpolation_type,
+        )
+        write_depth_map(depth_mat_transformed, depth_ofp)
 
         # if perform_warping_evaluation:
         #
@@ -228,16 +292,92 @@ def compute_skew_free_camera_models(
         #     # else:
         #     #     patt_count += 1
 
-        skew_free_camera = copy.copy(camera)
-        skew_free_camera.set_calibration(
-            intrinsic_mat_wo_skew, radial_distortion=False
-        )
-        skew_free_camera_list.append(skew_free_camera)
+    skew_free_camera = copy.copy(camera)
+    skew_free_camera.set_calibration(
+        intrinsic_mat_wo_skew, radial_distortion=False
+    )
+    return skew_free_camera
+
+
+def compute_skew_free_camera_models(
+    colmap_model_with_skew_idp,
+    gray_image_with_skew_idp,
+    color_image_with_skew_idp,
+    depth_map_with_skew_idp,
+    colmap_model_no_skew_odp,
+    gray_image_no_skew_odp,
+    color_image_no_skew_odp,
+    depth_map_no_skew_odp,
+    perform_warping_evaluation=False,
+    interpolation_type=cv2.INTER_CUBIC,
+    max_processes=None,
+    cv2_num_threads=None,
+):
+    assert colmap_model_with_skew_idp != colmap_model_no_skew_odp
+    assert gray_image_with_skew_idp != gray_image_no_skew_odp
+    assert depth_map_with_skew_idp != depth_map_no_skew_odp
+
+    if gray_image_no_skew_odp is not None:
+        mkdir_safely(gray_image_no_skew_odp)
+
+    if color_image_no_skew_odp is not None:
+        mkdir_safely(color_image_no_skew_odp)
+
+    if depth_map_no_skew_odp is not None:
+        mkdir_safely(depth_map_no_skew_odp)
+
+    logger.vinfo("image_without_skew_odp", gray_image_no_skew_odp)
+    logger.vinfo("interpolation_type", interpolation_type)
 
-    if perform_warping_evaluation:
-        logger.vinfo("pil_better_count", pil_better_count)
-        logger.vinfo("mat_better_count", mat_better_count)
-        logger.vinfo("patt_count", patt_count)
+    cameras = ColmapFileHandler.parse_colmap_cams(
+        colmap_model_with_skew_idp, gray_image_with_skew_idp
+    )
+    # cameras, _ = ColmapFileHandler.parse_colmap_model_folder(
+    #   colmap_model_idp, image_idp
+    # )
+
+    num_cameras = len(cameras)
+
+    worker_args_list = [
+        (
+            camera,
+            num_cameras,
+            gray_image_with_skew_idp,
+            color_image_with_skew_idp,
+            depth_map_with_skew_idp,
+            gray_image_no_skew_odp,
+            color_image_no_skew_odp,
+            depth_map_no_skew_odp,
+            interpolation_type,
+        )
+        for camera in cameras
+    ]
+
+    cpu_count = multiprocessing.cpu_count()
+    if max_processes is None:
+        max_processes = cpu_count
+    num_processes = max(1, min(max_processes, num_cameras))
+    if cv2_num_threads is None and num_processes > 1:
+        cv2_num_threads = max(1, cpu_count // num_processes)
+    logger.vinfo("num_processes", num_processes)
+    logger.vinfo("cv2_num_threads", cv2_num_threads)
+
+    if num_processes == 1:
+        _init_skew_correction_worker(cv2_num_threads)
+        skew_free_camera_list = [
+            compute_skew_free_camera_model(*worker_args)
+            for worker_args in worker_args_list
+        ]
+    else:
+        with multiprocessing.Pool(
+            num_processes,
+            initializer=_init_skew_correction_worker,
+            initargs=(cv2_num_threads,),
+        ) as pool:
+            # starmap() preserves the order of the cameras
+            skew_free_camera_list = pool.starmap(
+                compute_skew_free_camera_model, worker_args_list
+            )
 
     if colmap_model_no_skew_odp is not None:
         mkdir_safely(colmap_model_no_skew_odp)
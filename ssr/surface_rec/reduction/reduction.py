@@ -0,0 +1,81 @@
+import os
+from ssr.meshlab_utility.meshlab import Meshlab
+from ssr.mvs_utility.openmvs.openmvs_mvs import (
+    OpenMVSReconstructor,
+)
+from ssr.utility.logging_extension import logger
+from ssr.utility.os_extension import file_lock, makedirs_safely
+
+
+class ReductionStep:
+    @staticmethod
+    def _link_full_resolution_mesh(mesh_ifp, lod_mesh_ofp):
+        # A level of detail with all faces corresponds to the input mesh
+        if os.path.lexists(lod_mesh_ofp):
+            os.remove(lod_mesh_ofp)
+        os.symlink(
+            os.path.relpath(mesh_ifp, start=os.path.dirname(lod_mesh_ofp)),
+            lod_mesh_ofp,
+        )
+
+    @staticmethod
+    def compute_lod_mesh_with_meshlab(
+        mesh_ifp, lod_mesh_odp, lod_mesh_ply_ofn, face_ratio, temp_dp, lazy
+    ):
+        logger.info("compute_lod_mesh_with_meshlab: ...")
+        makedirs_safely(lod_mesh_odp)
+        lod_mesh_ofp = os.path.join(lod_mesh_odp, lod_mesh_ply_ofn)
+        logger.vinfo("ofp", lod_mesh_ofp)
+        if face_ratio >= 1:
+            ReductionStep._link_full_resolution_mesh(mesh_ifp, lod_mesh_ofp)
+        elif not os.path.isfile(lod_mesh_ofp) or not lazy:
+            meshlab = Meshlab(meshlab_temp_dp=temp_dp)
+            meshlab.decimate_mesh(mesh_ifp, lod_mesh_ofp, face_ratio)
+        logger.info("compute_lod_mesh_with_meshlab: Done")
+
+    @staticmethod
+    def compute_lod_mesh_with_openmvs(
+        colmap_idp,
+        images_idp,
+        mesh_ifp,
+        lod_mesh_odp,
+        lod_mesh_ply_ofn,
+        face_ratio,
+        lazy,
+    ):
+        logger.info("compute_lod_mesh_with_openmvs: ...")
+        makedirs_safely(lod_mesh_odp)
+        lod_mesh_ofp = os.path.join(lod_mesh_odp, lod_mesh_ply_ofn)
+        logger.vinfo("ofp", lod_mesh_ofp)
+        if face_ratio >= 1:
+            ReductionStep._link_full_resolution_mesh(mesh_ifp, lod_mesh_ofp)
+            logger.info("compute_lod_mesh_with_openmvs: Done")
+            return
+
+        interface_mvs_fn = "interface_colmap.mvs"
+        # This will create the lod_mesh_ply_ofn file
+        lod_mesh_mvs_fn = os.path.splitext(lod_mesh_ply_ofn)[0] + ".mvs"
+
+        openmvs_mvs_reconstructor = OpenMVSReconstructor()
+        # The scene is shared by all levels of detail, i.e. ensure that
+        # parallel tasks do not create it concurrently
+        with file_lock(os.path.join(lod_mesh_odp, interface_mvs_fn + ".lock")):
+            openmvs_mvs_reconstructor.convert_colmap_to_openMVS(
+                colmap_dense_idp=colmap_idp,
+                openmvs_workspace_dp=lod_mesh_odp,
+                openmvs_ofn=interface_mvs_fn,
+                image_folder=images_idp,
+                lazy=True,
+            )
+        # Providing a mesh file skips the reconstruction, i.e. only the
+        # clean options (decimation) are applied
+        openmvs_mvs_reconstructor.reconstruct_mesh(
+            lod_mesh_odp,
+            interface_mvs_fn,
+            lod_mesh_mvs_fn,
+            decimate_value=face_ratio,
+            smoothing_iterations=0,
+            mesh_ifp=mesh_ifp,
+            lazy=lazy,
+        )
+        logger.info("compute_lod_mesh_with_openmvs: Done")
@@ -7,11 +7,18 @@ from ssr.surface_rec.backends.mesh_backend import (
 from ssr.surface_rec.backends.texturing_backend import (
     TexturingBackends,
 )
+from ssr.surface_rec.backends.decimation_backend import (
+    DecimationBackends,
+)
 from ssr.surface_rec.tasks.task_manager import (
     TaskManager,
 )
+from ssr.surface_rec.tasks.task_scheduler import (
+    TaskScheduler,
+)
 
 from ssr.utility.logging_extension import logger
+from ssr.utility.telemetry import trace_span
 from ssr.utility.os_extension import mkdir_safely
 
 
@@ -26,18 +33,82 @@ class SurfaceReconstructionPipeline:
 
         self.ssr_config = SSRConfig.get_instance()
 
-    def run(self, reconstruct_mesh, texture_mesh, lazy=True):
+    def run(
+        self, reconstruct_mesh, texture_mesh, reduce_mesh=False, lazy=True
+    ):
+        # The meshing, texturing and reduction tasks of different backends
+        # are independent, i.e. they can be executed in parallel. Each
+        # texturing / reduction task depends only on the meshing task
+        # creating its input mesh.
+        ssr_config = self.ssr_config
+        scheduler = TaskScheduler(
+            num_cpus=ssr_config.surface_reconstruction_num_cpus,
+            memory_in_gb=ssr_config.surface_reconstruction_memory_in_gb,
+        )
+        task_num_cpus = ssr_config.surface_reconstruction_task_num_cpus
+        if task_num_cpus is None:
+            task_num_cpus = scheduler.num_cpus
+        task_memory_in_gb = ssr_config.surface_reconstruction_task_memory_in_gb
 
         meshing_tasks = self.tm.detect_meshing_tasks(reconstruct_mesh)
         if meshing_tasks:
             mkdir_safely(self.pm.surface_workspace_dp)
             mkdir_safely(self.pm.mesh_workspace_dp)
+        mesh_ofp_to_task_id = {}
         for meshing_task in meshing_tasks:
-            self.process_meshing_task(meshing_task, lazy)
+            mesh_ofp = os.path.join(
+                meshing_task.mesh_odp, meshing_task.plain_mesh_ply_ofn
+            )
+            mesh_ofp_to_task_id[os.path.normpath(mesh_ofp)] = (
+                scheduler.add_task(
+                    f"meshing ({meshing_task.meshing_backend})",
+                    self.process_meshing_task,
+                    args=(meshing_task, lazy),
+                    num_cpus=task_num_cpus,
+                    memory_in_gb=task_memory_in_gb,
+                )
+            )
 
         texturing_tasks = self.tm.detect_texturing_tasks(texture_mesh)
-        for texturingn_task in texturing_tasks:
-            self.process_texturing_task(texturingn_task, lazy)
+        for texturing_task in texturing_tasks:
+            mesh_ifp = os.path.normpath(texturing_task.mesh_ifp)
+            dependencies = []
+            if mesh_ifp in mesh_ofp_to_task_id:
+                dependencies.append(mesh_ofp_to_task_id[mesh_ifp])
+            scheduler.add_task(
+                f"texturing ({texturing_task.texturing_backend}, "
+                + f"{os.path.basename(texturing_task.textured_mesh_odp)})",
+                self.process_texturing_task,
+                args=(texturing_task, lazy),
+                dependencies=dependencies,
+                num_cpus=task_num_cpus,
+                memory_in_gb=task_memory_in_gb,
+            )
+
+        reduction_tasks = self.tm.detect_reduction_tasks(
+            reduce_mesh, ssr_config.mesh_lod_face_ratios
+        )
+        for reduction_task in reduction_tasks:
+            mesh_ifp = os.path.normpath(reduction_task.mesh_ifp)
+            dependencies = []
+            if mesh_ifp in mesh_ofp_to_task_id:
+                dependencies.append(mesh_ofp_to_task_id[mesh_ifp])
+            scheduler.add_task(
+                f"reduction ({reduction_task.decimation_backend}, "
+                + f"{reduction_task.meshing_backend}, "
+                + f"{reduction_task.face_ratio})",
+                self.process_reduction_task,
+                args=(reduction_task, lazy),
+                dependencies=dependencies,
+                num_cpus=task_num_cpus,
+                memory_in_gb=task_memory_in_gb,
+            )
+
+        with trace_span("surface_reconstruction_tasks") as span:
+            span.set_count("num_meshing_tasks", len(meshing_tasks))
+            span.set_count("num_texturing_tasks", len(texturing_tasks))
+            span.set_count("num_reduction_tasks", len(reduction_tasks))
+            scheduler.run()
 
     def process_meshing_task(self, meshing_task, lazy):
         from ssr.surface_rec.meshing.meshing import MeshingStep
@@ -126,3 +197,34 @@ class SurfaceReconstructionPipeline:
             )
         else:
             assert False
+
+    def process_reduction_task(self, reduction_task, lazy):
+        from ssr.surface_rec.reduction.reduction import ReductionStep
+
+        if (
+            reduction_task.decimation_backend
+            == DecimationBackends.meshlab.name
+        ):
+            ReductionStep.compute_lod_mesh_with_meshlab(
+                reduction_task.mesh_ifp,
+                reduction_task.lod_mesh_odp,
+                reduction_task.lod_mesh_ply_ofn,
+                reduction_task.face_ratio,
+                temp_dp=self.pm.meshlab_temp_dp,
+                lazy=lazy,
+            )
+        elif (
+            reduction_task.decimation_backend
+            == DecimationBackends.openmvs.name
+        ):
+            ReductionStep.compute_lod_mesh_with_openmvs(
+                reduction_task.colmap_idp,
+                self.pm.sharpened_no_skew_png_dp,
+                reduction_task.mesh_ifp,
+                reduction_task.lod_mesh_odp,
+                reduction_task.lod_mesh_ply_ofn,
+                reduction_task.face_ratio,
+                lazy=lazy,
+            )
+        else:
+            assert False
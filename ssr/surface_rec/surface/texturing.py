@@ -1,6 +1,7 @@
 import os
 from ssr.utility.logging_extension import logger
 from ssr.mvs_utility.mve.mve_mvs import MVEMVSReconstructor
+from ssr.utility.os_extension import file_lock
 
 
 class TexturingStep:
@@ -47,11 +48,14 @@ class TexturingStep:
         mve_mvs_reconstructor = MVEMVSReconstructor()
 
         # Import the colmap reconstruction into MVE exactly once,
-        # since it is identical for all reconstructions.
-        if not os.path.isdir(mve_odp):
-            mve_mvs_reconstructor.create_scene_from_sfm_result(
-                colmap_idp, mve_odp, downscale_level=-1, lazy=lazy
-            )
+        # since it is identical for all reconstructions. The lock prevents
+        # texturing tasks running in parallel from creating the scene
+        # concurrently (or from using an incomplete scene).
+        with file_lock(mve_odp.rstrip(os.sep) + ".lock"):
+            if not os.path.isdir(mve_odp):
+                mve_mvs_reconstructor.create_scene_from_sfm_result(
+                    colmap_idp, mve_odp, downscale_level=-1, lazy=lazy
+                )
 
         mve_mvs_reconstructor.compute_texture(
             mve_workspace=mve_odp,
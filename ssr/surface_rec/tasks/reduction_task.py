@@ -2,7 +2,16 @@ from ssr.surface_rec.tasks.task import Task
 
 
 class ReductionTask(Task):
-    def __init__(self, colmap_idp, mesh_odp):
+    def __init__(
+        self,
+        colmap_idp,
+        mesh_ifp,
+        lod_mesh_odp,
+        lod_mesh_ply_ofn,
+        face_ratio,
+        meshing_backend,
+        decimation_backend,
+    ):
 
         self.__dict__.update(locals())
         # delete self, since it is redundant and a circular reference
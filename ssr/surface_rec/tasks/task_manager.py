@@ -11,9 +11,6 @@ from ssr.surface_rec.tasks.refinement_task import (
 from ssr.surface_rec.tasks.texturing_task import (
     TexturingTask,
 )
-from ssr.surface_rec.backends.mesh_backend import (
-    MeshingBackends,
-)
 
 
 class TaskManager:
@@ -40,26 +37,32 @@ class TaskManager:
                 meshing_tasks.append(meshing_task)
         return meshing_tasks
 
-    def detect_reduction_tasks(self):
+    def detect_reduction_tasks(self, reduce_mesh, face_ratios):
+        """Create a task for each level of detail of each mesh."""
         reduction_tasks = []
-        for meshing_backend in self.bm.meshing_backends:
-            # Reduction only for: Colmap Poisson Meshes
-            if meshing_backend == MeshingBackends.colmap_poisson.name:
-                reduction_odp = os.path.join(
+        if reduce_mesh:
+            for meshing_backend in self.bm.meshing_backends:
+                mesh_odp = os.path.join(
                     self.pm.mesh_workspace_dp, meshing_backend
                 )
-                reduction_task = ReductionTask(
-                    colmap_idp=self.pm.colmap_workspace_no_skew_dp,
-                    mesh_odp=reduction_odp,
-                )
-                reduction_tasks.append(reduction_task)
-            else:
-                assert meshing_backend in [
-                    MeshingBackends.colmap_delaunay.name,
-                    MeshingBackends.openmvs.name,
-                    MeshingBackends.mve_fssr.name,
-                    MeshingBackends.mve_gdmr.name,
-                ]
+                mesh_ifp = os.path.join(mesh_odp, self.pm.plain_mesh_ply_ofn)
+                for decimation_backend in self.bm.decimation_backends:
+                    lod_mesh_odp = os.path.join(
+                        mesh_odp, self.pm.lod_mesh_dn, decimation_backend
+                    )
+                    for face_ratio in face_ratios:
+                        reduction_task = ReductionTask(
+                            colmap_idp=self.pm.colmap_workspace_no_skew_dp,
+                            mesh_ifp=mesh_ifp,
+                            lod_mesh_odp=lod_mesh_odp,
+                            lod_mesh_ply_ofn=self.pm.get_lod_mesh_ply_ofn(
+                                face_ratio
+                            ),
+                            face_ratio=face_ratio,
+                            meshing_backend=meshing_backend,
+                            decimation_backend=decimation_backend,
+                        )
+                        reduction_tasks.append(reduction_task)
         return reduction_tasks
 
     def detect_refinement_tasks(self, refine_mesh):
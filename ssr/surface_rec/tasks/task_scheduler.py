@@ -0,0 +1,160 @@
+import multiprocessing
+import queue
+from ssr.utility.logging_extension import logger
+from ssr.utility.telemetry import trace_span
+
+
+class _ScheduledTask:
+    def __init__(
+        self, task_id, name, function, args, dependencies, num_cpus, memory
+    ):
+        self.task_id = task_id
+        self.name = name
+        self.function = function
+        self.args = args
+        self.dependencies = dependencies
+        self.num_cpus = num_cpus
+        self.memory = memory
+
+
+def _run_task(name, function, args):
+    # Module level function, i.e. it can be executed by the process pool
+    with trace_span(name, category="task"):
+        return function(*args)
+
+
+class TaskScheduler:
+    """Run tasks with dependencies in parallel under a cpu / memory budget.
+
+    A task is started as soon as its dependencies are finished and the
+    resources requested by the task are available. Ready tasks are started
+    in the order in which they were added. A task requesting more resources
+    than the budget is executed, once no other task is running.
+
+    The tasks are executed in a process pool, i.e. the functions and the
+    arguments must be picklable. If only a single task can run at a time,
+    the tasks are executed in the current process.
+    """
+
+    def __init__(self, num_cpus=None, memory_in_gb=None):
+        if num_cpus is None:
+            num_cpus = multiprocessing.cpu_count()
+        assert num_cpus > 0
+        self.num_cpus = num_cpus
+        # If None, the memory is not restricted
+        self.memory_in_gb = memory_in_gb
+        self.scheduled_tasks = []
+
+    def add_task(
+        self,
+        name,
+        function,
+        args=(),
+        dependencies=(),
+        num_cpus=1,
+        memory_in_gb=0.0,
+    ):
+        """Add a task and return its id (used to define dependencies)."""
+        task_id = len(self.scheduled_tasks)
+        # Dependencies on previously added tasks only (prevents cycles)
+        for dependency in dependencies:
+            assert 0 <= dependency < task_id
+        self.scheduled_tasks.append(
+            _ScheduledTask(
+                task_id,
+                name,
+                function,
+                tuple(args),
+                set(dependencies),
+                min(num_cpus, self.num_cpus),
+                memory_in_gb,
+            )
+        )
+        return task_id
+
+    def _fits_into_budget(self, task, used_num_cpus, used_memory):
+        if used_num_cpus + task.num_cpus > self.num_cpus:
+            return False
+        if self.memory_in_gb is None:
+            return True
+        return used_memory + task.memory <= self.memory_in_gb
+
+    def _compute_num_processes(self):
+        if len(self.scheduled_tasks) == 0:
+            return 0
+        min_num_cpus = min(task.num_cpus for task in self.scheduled_tasks)
+        num_processes = max(1, self.num_cpus // max(1, min_num_cpus))
+        return min(num_processes, len(self.scheduled_tasks))
+
+    def _run_sequentially(self):
+        for task in self.scheduled_tasks:
+            logger.info("Running task: " + task.name)
+            _run_task(task.name, task.function, task.args)
+
+    def run(self):
+        num_processes = self._compute_num_processes()
+        logger.vinfo("num_processes", num_processes)
+        if num_processes <= 1:
+            self._run_sequentially()
+            return
+
+        pending_tasks = list(self.scheduled_tasks)
+        running_tasks = {}
+        finished_task_ids = set()
+        used_num_cpus = 0
+        used_memory = 0.0
+        first_exception = None
+        # Filled by the result handler thread of the pool
+        result_queue = queue.Queue()
+
+        with multiprocessing.Pool(processes=num_processes) as pool:
+            while pending_tasks or running_tasks:
+                # Do not start new tasks after a failure
+                while first_exception is None:
+                    ready_tasks = [
+                        task
+                        for task in pending_tasks
+                        if task.dependencies <= finished_task_ids
+                    ]
+                    if not ready_tasks:
+                        break
+                    task = ready_tasks[0]
+                    if running_tasks and not self._fits_into_budget(
+                        task, used_num_cpus, used_memory
+                    ):
+                        break
+                    pending_tasks.remove(task)
+                    running_tasks[task.task_id] = task
+                    used_num_cpus += task.num_cpus
+                    used_memory += task.memory
+                    logger.info("Starting task: " + task.name)
+                    pool.apply_async(
+                        _run_task,
+                        (task.name, task.function, task.args),
+                        callback=lambda _, task_id=task.task_id: (
+                            result_queue.put((task_id, None))
+                        ),
+                        error_callback=lambda exc, task_id=task.task_id: (
+                            result_queue.put((task_id, exc))
+                        ),
+                    )
+
+                if not running_tasks:
+                    break
+
+                task_id, exception = result_queue.get()
+                task = running_tasks.pop(task_id)
+                used_num_cpus -= task.num_cpus
+                used_memory -= task.memory
+                if exception is None:
+                    logger.info("Finished task: " + task.name)
+                    finished_task_ids.add(task_id)
+                else:
+                    logger.info("Failed task: " + task.name)
+                    if first_exception is None:
+                        first_exception = exception
+
+        if first_exception is not None:
+            skipped_task_names = [task.name for task in pending_tasks]
+            logger.vinfo("skipped_tasks", skipped_task_names)
+            raise first_exception
@@ -0,0 +1,176 @@
+import json
+import math
+import numpy as np
+
+
+class Tile:
+    """Rectangular part of an AOI (given in UTM coordinates).
+
+    The tiles of an AOI overlap. The core region of each tile (i.e. the tile
+    without overlap) is used to crop the results, the core regions of all
+    tiles partition the AOI.
+    """
+
+    def __init__(
+        self,
+        row_idx,
+        col_idx,
+        ul_easting,
+        ul_northing,
+        width,
+        height,
+        core_ul_easting,
+        core_ul_northing,
+        core_lr_easting,
+        core_lr_northing,
+    ):
+        self.row_idx = row_idx
+        self.col_idx = col_idx
+        self.ul_easting = ul_easting
+        self.ul_northing = ul_northing
+        self.width = width
+        self.height = height
+        self.core_ul_easting = core_ul_easting
+        self.core_ul_northing = core_ul_northing
+        self.core_lr_easting = core_lr_easting
+        self.core_lr_northing = core_lr_northing
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return "Tile({}, ul_easting={}, ul_northing={}, {} x {})".format(
+            self.get_name(),
+            self.ul_easting,
+            self.ul_northing,
+            self.width,
+            self.height,
+        )
+
+    def get_name(self):
+        return f"tile_{self.row_idx}_{self.col_idx}"
+
+    def get_core_bounds(self):
+        # (easting_min, easting_max, northing_min, northing_max)
+        return (
+            self.core_ul_easting,
+            self.core_lr_easting,
+            self.core_lr_northing,
+            self.core_ul_northing,
+        )
+
+
+def compute_tiles(ul_easting, ul_northing, width, height, tile_size, overlap):
+    """Split the AOI into (approximately) square overlapping tiles.
+
+    The core regions of the tiles have a size of at most tile_size x
+    tile_size. Each tile extends its core region by overlap / 2 on each side
+    (clipped to the AOI). The tiles are returned in row major order.
+    """
+    assert tile_size > 0
+    assert overlap >= 0
+    num_cols = max(1, math.ceil(width / tile_size))
+    num_rows = max(1, math.ceil(height / tile_size))
+    # Neighboring tiles share the same values at the seams (computing the
+    # bounds of each tile separately may result in different rounding)
+    core_eastings = ul_easting + np.arange(num_cols + 1) * (width / num_cols)
+    core_northings = ul_northing - np.arange(num_rows + 1) * (
+        height / num_rows
+    )
+    lr_easting = float(core_eastings[-1])
+    lr_northing = float(core_northings[-1])
+
+    tiles = []
+    for row_idx in range(num_rows):
+        for col_idx in range(num_cols):
+            core_ul_easting = float(core_eastings[col_idx])
+            core_ul_northing = float(core_northings[row_idx])
+            core_lr_easting = float(core_eastings[col_idx + 1])
+            core_lr_northing = float(core_northings[row_idx + 1])
+            tile_ul_easting = max(core_ul_easting - overlap / 2, ul_easting)
+            tile_ul_northing = min(core_ul_northing + overlap / 2, ul_northing)
+            tile_lr_easting = min(core_lr_easting + overlap / 2, lr_easting)
+            tile_lr_northing = max(core_lr_northing - overlap / 2, lr_northing)
+            tile = Tile(
+                row_idx,
+                col_idx,
+                tile_ul_easting,
+                tile_ul_northing,
+                tile_lr_easting - tile_ul_easting,
+                tile_ul_northing - tile_lr_northing,
+                core_ul_easting,
+                core_ul_northing,
+                core_lr_easting,
+                core_lr_northing,
+            )
+            tiles.append(tile)
+    return tiles
+
+
+def compute_tiles_from_config(ssr_config):
+    return compute_tiles(
+        ssr_config.ul_easting,
+        ssr_config.ul_northing,
+        ssr_config.width,
+        ssr_config.height,
+        ssr_config.tile_size,
+        ssr_config.tile_overlap,
+    )
+
+
+def create_tile_config(ssr_config, tile):
+    # All steps of the pipeline use the bounding box of the config
+    return ssr_config.copy(
+        update={
+            "ul_easting": tile.ul_easting,
+            "ul_northing": tile.ul_northing,
+            "width": tile.width,
+            "height": tile.height,
+        }
+    )
+
+
+def parse_observer_point(vissat_aoi_json_ifp):
+    # VisSat reconstructs each AOI in a local East-North-Up (ENU) coordinate
+    # system. The observer point (i.e. the origin) is defined by the center
+    # of the lat / lon bounding box and the minimal altitude (see also
+    # get_observer_point() in ssr/scripts/visualize_sfm_satellite_result.py)
+    with open(vissat_aoi_json_ifp) as aoi_json_file:
+        aoi_dict = json.load(aoi_json_file)
+    lat0 = (aoi_dict["lat_min"] + aoi_dict["lat_max"]) / 2.0
+    lon0 = (aoi_dict["lon_min"] + aoi_dict["lon_max"]) / 2.0
+    alt0 = aoi_dict["alt_min"]
+    return lat0, lon0, alt0
+
+
+def get_utm_epsg_code(zone_number, hemisphere):
+    assert hemisphere in ["N", "S"]
+    if hemisphere == "N":
+        return 32600 + zone_number
+    return 32700 + zone_number
+
+
+def convert_enu_to_utm_coords(
+    enu_coords, observer_point, zone_number, hemisphere, utm_offset
+):
+    """Convert local ENU coordinates to UTM coordinates.
+
+    The result contains easting, northing and altitude relative to
+    utm_offset (to preserve the precision of single precision floats).
+    """
+    import pymap3d
+    import pyproj
+
+    enu_coords = np.asarray(enu_coords, dtype=np.float64)
+    lat0, lon0, alt0 = observer_point
+    lats, lons, alts = pymap3d.enu2geodetic(
+        enu_coords[:, 0], enu_coords[:, 1], enu_coords[:, 2], lat0, lon0, alt0
+    )
+    transformer = pyproj.Transformer.from_crs(
+        "EPSG:4326",
+        "EPSG:{}".format(get_utm_epsg_code(zone_number, hemisphere)),
+        always_xy=True,
+    )
+    eastings, northings = transformer.transform(lons, lats)
+    utm_coords = np.stack((eastings, northings, alts), axis=1)
+    return utm_coords - np.asarray(utm_offset, dtype=np.float64)
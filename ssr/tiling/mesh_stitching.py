@@ -0,0 +1,218 @@
+import os
+import json
+import numpy as np
+
+from ssr.file_handler.ply_file_handler import PLYFileHandler
+from ssr.tiling.aoi_tiling import (
+    parse_observer_point,
+    convert_enu_to_utm_coords,
+)
+from ssr.utility.logging_extension import logger
+from ssr.utility.os_extension import makedirs_safely
+
+
+def remove_unreferenced_vertices(coords, faces, colors=None):
+    used_vertex_indices, faces = np.unique(faces, return_inverse=True)
+    faces = faces.reshape((-1, 3))
+    coords = coords[used_vertex_indices]
+    if colors is not None:
+        colors = colors[used_vertex_indices]
+    return coords, faces, colors
+
+
+def crop_mesh(coords, faces, bounds, colors=None):
+    """Keep the faces whose centroid lies in the (half-open) bounds.
+
+    The bounds are given by (x_min, x_max, y_min, y_max). Since the core
+    regions of the tiles partition the AOI, each face at a seam is kept by
+    exactly one tile.
+    """
+    x_min, x_max, y_min, y_max = bounds
+    centroids = np.mean(coords[faces], axis=1)
+    inside = (
+        (centroids[:, 0] >= x_min)
+        & (centroids[:, 0] < x_max)
+        & (centroids[:, 1] >= y_min)
+        & (centroids[:, 1] < y_max)
+    )
+    return remove_unreferenced_vertices(coords, faces[inside], colors)
+
+
+def compute_boundary_vertex_indices(faces):
+    # Boundary edges are contained in a single face only
+    edges = np.concatenate(
+        (faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]])
+    )
+    edges = np.sort(edges, axis=1)
+    unique_edges, edge_counts = np.unique(edges, axis=0, return_counts=True)
+    return np.unique(unique_edges[edge_counts == 1])
+
+
+def weld_boundary_vertices(coords, faces, mesh_indices, merge_distance):
+    """Merge boundary vertices of different meshes closer than merge_distance.
+
+    mesh_indices contains for each vertex the index of its mesh. Connected
+    groups of such vertices are replaced by their mean. Faces that become
+    degenerate and duplicated faces are removed.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    from scipy.spatial import cKDTree
+
+    boundary_vertex_indices = compute_boundary_vertex_indices(faces)
+    pairs = cKDTree(coords[boundary_vertex_indices]).query_pairs(
+        merge_distance, output_type="ndarray"
+    )
+    pairs = boundary_vertex_indices[pairs.reshape((-1, 2))]
+    # Vertices of the same mesh are not merged
+    pairs = pairs[mesh_indices[pairs[:, 0]] != mesh_indices[pairs[:, 1]]]
+
+    vertex_mapping = np.arange(len(coords))
+    if len(pairs) > 0:
+        num_vertices = len(coords)
+        graph = coo_matrix(
+            (np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])),
+            shape=(num_vertices, num_vertices),
+        )
+        _, component_indices = connected_components(graph, directed=False)
+        welded_vertex_indices = np.unique(pairs)
+        _, cluster_indices = np.unique(
+            component_indices[welded_vertex_indices], return_inverse=True
+        )
+        cluster_indices = cluster_indices.reshape(-1)
+        num_clusters = np.amax(cluster_indices) + 1
+        # Use the first vertex of each cluster as representative
+        representatives = np.full(num_clusters, num_vertices)
+        np.minimum.at(representatives, cluster_indices, welded_vertex_indices)
+        cluster_sizes = np.bincount(cluster_indices)
+        cluster_means = np.stack(
+            [
+                np.bincount(cluster_indices, column) / cluster_sizes
+                for column in coords[welded_vertex_indices].T
+            ],
+            axis=1,
+        )
+        coords = coords.copy()
+        coords[representatives] = cluster_means
+        vertex_mapping[welded_vertex_indices] = representatives[
+            cluster_indices
+        ]
+        logger.vinfo(
+            "num_welded_vertices", len(welded_vertex_indices) - num_clusters
+        )
+
+    faces = vertex_mapping[faces]
+    is_degenerate = (
+        (faces[:, 0] == faces[:, 1])
+        | (faces[:, 1] == faces[:, 2])
+        | (faces[:, 2] == faces[:, 0])
+    )
+    faces = faces[~is_degenerate]
+    # Faces with the same vertices (independent of the orientation)
+    _, unique_face_indices = np.unique(
+        np.sort(faces, axis=1), axis=0, return_index=True
+    )
+    faces = faces[np.sort(unique_face_indices)]
+    return coords, faces
+
+
+def stitch_meshes(mesh_list, merge_distance):
+    """Combine the (cropped) meshes and weld the vertices at the seams.
+
+    Each mesh is given as (coords, faces, colors), colors may be None.
+    Since the cropped meshes do not overlap, the only boundary vertices of
+    different meshes closer than merge_distance are those at the seams.
+    """
+    with_colors = all(colors is not None for _, _, colors in mesh_list)
+    vertex_offsets = np.cumsum(
+        [0] + [len(coords) for coords, _, _ in mesh_list]
+    )
+    coords = np.concatenate([coords for coords, _, _ in mesh_list])
+    faces = np.concatenate(
+        [
+            faces + vertex_offset
+            for (_, faces, _), vertex_offset in zip(mesh_list, vertex_offsets)
+        ]
+    )
+    mesh_indices = np.repeat(
+        np.arange(len(mesh_list)), [len(coords) for coords, _, _ in mesh_list]
+    )
+    colors = None
+    if with_colors:
+        colors = np.concatenate([colors for _, _, colors in mesh_list])
+
+    coords, faces = weld_boundary_vertices(
+        coords, faces, mesh_indices, merge_distance
+    )
+    return remove_unreferenced_vertices(coords, faces, colors)
+
+
+def stitch_tile_meshes(
+    tiles,
+    tile_pms,
+    aoi_pm,
+    meshing_backends,
+    zone_number,
+    hemisphere,
+    merge_distance,
+):
+    """Stitch the meshes of the tiles computed by each meshing backend.
+
+    The meshes of the tiles are given in the local ENU coordinate systems of
+    the corresponding (VisSat) reconstructions. The stitched mesh uses UTM
+    coordinates relative to the upper left corner of the AOI (the offset is
+    stored in a json file next to the mesh).
+    """
+    aoi_ul_easting = min(tile.ul_easting for tile in tiles)
+    aoi_ul_northing = max(tile.ul_northing for tile in tiles)
+    utm_offset = [aoi_ul_easting, aoi_ul_northing, 0.0]
+
+    for meshing_backend in meshing_backends:
+        logger.vinfo("meshing_backend", meshing_backend)
+        mesh_list = []
+        for tile, tile_pm in zip(tiles, tile_pms):
+            mesh_ifp = os.path.join(
+                tile_pm.mesh_workspace_dp,
+                meshing_backend,
+                tile_pm.plain_mesh_ply_ofn,
+            )
+            if not os.path.isfile(mesh_ifp):
+                logger.vinfo("Missing mesh of tile", tile.get_name())
+                assert False, mesh_ifp
+            coords, colors, _, _, faces = PLYFileHandler.read_ply_arrays(
+                mesh_ifp
+            )
+            observer_point = parse_observer_point(tile_pm.vissat_aoi_json_ifp)
+            coords = convert_enu_to_utm_coords(
+                coords, observer_point, zone_number, hemisphere, utm_offset
+            )
+            core_bounds = np.asarray(tile.get_core_bounds()) - np.repeat(
+                utm_offset[0:2], 2
+            )
+            mesh_list.append(crop_mesh(coords, faces, core_bounds, colors))
+
+        coords, faces, colors = stitch_meshes(mesh_list, merge_distance)
+
+        stitched_mesh_odp = os.path.join(
+            aoi_pm.stitched_mesh_workspace_dp, meshing_backend
+        )
+        makedirs_safely(stitched_mesh_odp)
+        PLYFileHandler.write_ply_arrays(
+            os.path.join(stitched_mesh_odp, aoi_pm.plain_mesh_ply_ofn),
+            coords,
+            colors=colors,
+            faces=faces,
+        )
+        with open(
+            os.path.join(stitched_mesh_odp, aoi_pm.stitched_mesh_offset_ofn),
+            "w",
+        ) as offset_json_file:
+            json.dump(
+                {
+                    "zone_number": zone_number,
+                    "hemisphere": hemisphere,
+                    "utm_offset": utm_offset,
+                },
+                offset_json_file,
+                indent=2,
+            )
@@ -1,6 +1,8 @@
 import os
 import shutil
 import re
+import fcntl
+from contextlib import contextmanager
 
 
 def delete_files_in_dir(
@@ -254,3 +256,14 @@ def assert_dirs_equal(idp_1, idp_2):
     fp_2_list = get_file_paths_in_dir(idp_2, base_name_only=True)
     msg = f"{idp_1}: {fp_1_list} vs. {idp_2} {fp_2_list}"
     assert fp_1_list == fp_2_list, msg
+
+
+@contextmanager
+def file_lock(lock_fp):
+    """Exclusive lock (shared between processes) using the file lock_fp."""
+    with open(lock_fp, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
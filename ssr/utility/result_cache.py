@@ -0,0 +1,192 @@
+import os
+import json
+import hashlib
+import tempfile
+import zipfile
+import numpy as np
+from ssr.utility.logging_extension import logger
+
+_cache = None
+
+
+def compute_file_hash(ifp, chunk_num_bytes=2**20):
+    file_hash = hashlib.sha256()
+    with open(ifp, "rb") as ifile:
+        for chunk in iter(lambda: ifile.read(chunk_num_bytes), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def compute_file_fingerprint(ifp, hash_file_content=False):
+    """Return a dict describing the path, size and modification time.
+
+    If hash_file_content is True, the dict contains also the hash of the
+    file content.
+    """
+    stat_result = os.stat(ifp)
+    file_dict = {
+        "path": ifp,
+        "size": stat_result.st_size,
+        "mtime_ns": stat_result.st_mtime_ns,
+    }
+    if hash_file_content:
+        file_dict["sha256"] = compute_file_hash(ifp)
+    return file_dict
+
+
+class ResultCache:
+    """Persistent cache for results that consist of numpy arrays.
+
+    The results are stored as npz files in cache_dp. The key of an entry is
+    computed from the name and the version of the function that computes the
+    result, its parameters and the path, size and modification time (and
+    optionally the content) of each input file. Changing an input file or
+    the version of the function invalidates the entry.
+
+    If the total size of the cache exceeds max_num_bytes, the least recently
+    used entries are removed. The results of the functions in
+    excluded_function_names are never cached.
+    """
+
+    ENTRY_EXT = ".npz"
+
+    def __init__(
+        self,
+        cache_dp,
+        max_num_bytes=2 * 1024**3,
+        hash_file_content=False,
+        excluded_function_names=(),
+    ):
+        self.cache_dp = cache_dp
+        self.max_num_bytes = max_num_bytes
+        self.hash_file_content = hash_file_content
+        self.excluded_function_names = set(excluded_function_names)
+
+    @staticmethod
+    def get_instance():
+        # Returns None, if no cache has been configured
+        return _cache
+
+    @staticmethod
+    def set_instance(cache):
+        global _cache
+        _cache = cache
+
+    def compute_key(self, function_name, function_version, ifp_list, params):
+        key_dict = {
+            "function_name": function_name,
+            "function_version": function_version,
+            "params": [str(param) for param in params],
+            "files": [],
+        }
+        for ifp in ifp_list:
+            key_dict["files"].append(
+                compute_file_fingerprint(
+                    os.path.abspath(ifp), self.hash_file_content
+                )
+            )
+        key_str = json.dumps(key_dict, sort_keys=True)
+        return hashlib.sha256(key_str.encode("utf-8")).hexdigest()
+
+    def _get_entry_fp(self, key):
+        return os.path.join(self.cache_dp, key + self.ENTRY_EXT)
+
+    def load(self, key):
+        """Return the cached arrays as dict or None, if there is no entry."""
+        entry_fp = self._get_entry_fp(key)
+        try:
+            with np.load(entry_fp, allow_pickle=False) as npz_file:
+                arrays = {name: npz_file[name] for name in npz_file.files}
+            # Mark the entry as recently used
+            os.utime(entry_fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zipfile.BadZipFile):
+            # Incomplete or otherwise invalid entries are treated as missing
+            logger.info("Ignoring invalid cache entry: " + entry_fp)
+            return None
+        return arrays
+
+    def store(self, key, arrays):
+        os.makedirs(self.cache_dp, exist_ok=True)
+        entry_fp = self._get_entry_fp(key)
+        # Write to a temporary file and rename it afterwards, so that
+        # concurrent readers never see partially written entries
+        fd, tmp_fp = tempfile.mkstemp(
+            dir=self.cache_dp, suffix=self.ENTRY_EXT + ".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as ofile:
+                np.savez(ofile, **arrays)
+            os.replace(tmp_fp, entry_fp)
+        except BaseException:
+            if os.path.exists(tmp_fp):
+                os.remove(tmp_fp)
+            raise
+        self.evict(keep_fns=[os.path.basename(entry_fp)])
+
+    def evict(self, keep_fns=()):
+        """Remove least recently used entries exceeding max_num_bytes."""
+        entries = []
+        for fn in os.listdir(self.cache_dp):
+            if not fn.endswith(self.ENTRY_EXT) or fn in keep_fns:
+                continue
+            try:
+                stat_result = os.stat(os.path.join(self.cache_dp, fn))
+            except FileNotFoundError:
+                # Removed by a concurrent process
+                continue
+            entries.append((stat_result.st_mtime_ns, stat_result.st_size, fn))
+
+        # The kept entries count towards the budget
+        total_num_bytes = sum(entry[1] for entry in entries)
+        for fn in keep_fns:
+            try:
+                total_num_bytes += os.path.getsize(
+                    os.path.join(self.cache_dp, fn)
+                )
+            except FileNotFoundError:
+                pass
+        for _, num_bytes, fn in sorted(entries):
+            if total_num_bytes <= self.max_num_bytes:
+                break
+            logger.info("Removing cache entry: " + fn)
+            try:
+                os.remove(os.path.join(self.cache_dp, fn))
+            except FileNotFoundError:
+                pass
+            total_num_bytes -= num_bytes
+
+    def get_cached_arrays(
+        self, callback, ifp_list, function_name, function_version, params=()
+    ):
+        """Return callback(*params), which must be a dict of numpy arrays.
+
+        The result is only computed, if there is no valid entry for the
+        input files ifp_list (which are read by the callback).
+        """
+        if function_name in self.excluded_function_names:
+            return callback(*params)
+        key = self.compute_key(
+            function_name, function_version, ifp_list, params
+        )
+        arrays = self.load(key)
+        if arrays is None:
+            logger.info("Computing result of " + function_name)
+            arrays = callback(*params)
+            self.store(key, arrays)
+        else:
+            logger.info("Reading result of " + function_name + " from cache")
+        return arrays
+
+
+def get_cached_arrays(
+    callback, ifp_list, function_name, function_version, params=()
+):
+    """Use the configured cache (if any) to compute callback(*params)."""
+    cache = ResultCache.get_instance()
+    if cache is None:
+        return callback(*params)
+    return cache.get_cached_arrays(
+        callback, ifp_list, function_name, function_version, params
+    )
@@ -0,0 +1,178 @@
+import os
+import json
+import hashlib
+from ssr.utility.logging_extension import logger
+from ssr.utility.result_cache import compute_file_fingerprint
+from ssr.utility.telemetry import trace_span
+
+
+class Stage:
+    """Step of the pipeline reading input_paths and writing output_paths.
+
+    The paths can be files or directories. The params (a dict of json
+    serializable values) contain the options influencing the result of the
+    stage. Disabled stages are never executed.
+    """
+
+    def __init__(
+        self,
+        name,
+        callback,
+        input_paths=(),
+        output_paths=(),
+        params=None,
+        dependencies=(),
+        enabled=True,
+    ):
+        self.name = name
+        self.callback = callback
+        self.input_paths = [path for path in input_paths if path]
+        self.output_paths = [path for path in output_paths if path]
+        if params is None:
+            params = {}
+        self.params = params
+        self.dependencies = list(dependencies)
+        self.enabled = enabled
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __str__(self):
+        return "Stage({})".format(self.name)
+
+
+class StageGraph:
+    """Execute the stages of a pipeline, skipping stages that are up to date.
+
+    After executing a stage, a manifest with the key of the stage is written
+    to manifest_dp. The key is computed from the parameters of the stage,
+    the fingerprints of its input files (see compute_file_fingerprint()) and
+    the keys of the stages it depends on. Thus, changing the parameters of a
+    stage invalidates the stage itself and all stages depending on it.
+
+    A stage is skipped, if the key stored in its manifest matches the
+    current key and all of its outputs exist.
+    """
+
+    MANIFEST_EXT = ".json"
+
+    def __init__(self, manifest_dp, hash_file_content=False):
+        self.manifest_dp = manifest_dp
+        self.hash_file_content = hash_file_content
+        self.stages = []
+
+    def add_stage(self, stage):
+        # Dependencies on previously added stages only (prevents cycles)
+        stage_names = [added_stage.name for added_stage in self.stages]
+        assert stage.name not in stage_names, stage.name
+        for dependency in stage.dependencies:
+            assert dependency in stage_names, dependency
+        self.stages.append(stage)
+        return stage
+
+    def _get_manifest_fp(self, stage):
+        return os.path.join(self.manifest_dp, stage.name + self.MANIFEST_EXT)
+
+    def read_manifest(self, stage):
+        manifest_fp = self._get_manifest_fp(stage)
+        if not os.path.isfile(manifest_fp):
+            return None
+        try:
+            with open(manifest_fp) as manifest_file:
+                return json.load(manifest_file)
+        except ValueError:
+            logger.info("Ignoring invalid manifest: " + manifest_fp)
+            return None
+
+    def write_manifest(self, stage, key):
+        os.makedirs(self.manifest_dp, exist_ok=True)
+        manifest = {
+            "stage": stage.name,
+            "key": key,
+            "params": stage.params,
+            "input_paths": stage.input_paths,
+            "output_paths": stage.output_paths,
+            "dependencies": stage.dependencies,
+        }
+        manifest_fp = self._get_manifest_fp(stage)
+        # Write to a temporary file and rename it afterwards, so that an
+        # interrupted run never leaves an incomplete manifest
+        tmp_fp = manifest_fp + ".tmp"
+        with open(tmp_fp, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+        os.replace(tmp_fp, manifest_fp)
+
+    def remove_manifest(self, stage):
+        manifest_fp = self._get_manifest_fp(stage)
+        if os.path.isfile(manifest_fp):
+            os.remove(manifest_fp)
+
+    def _compute_path_fingerprints(self, path):
+        # Directories are described by the fingerprints of all contained
+        # files (missing paths by an empty list)
+        if os.path.isfile(path):
+            return [compute_file_fingerprint(path, self.hash_file_content)]
+        fingerprints = []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for fn in sorted(files):
+                fingerprints.append(
+                    compute_file_fingerprint(
+                        os.path.join(root, fn), self.hash_file_content
+                    )
+                )
+        return fingerprints
+
+    def compute_key(self, stage, dependency_keys):
+        key_dict = {
+            "stage": stage.name,
+            "params": stage.params,
+            "inputs": {
+                path: self._compute_path_fingerprints(os.path.abspath(path))
+                for path in stage.input_paths
+            },
+            "dependency_keys": dependency_keys,
+        }
+        key_str = json.dumps(key_dict, sort_keys=True, default=str)
+        return hashlib.sha256(key_str.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _outputs_exist(stage):
+        return all(os.path.exists(path) for path in stage.output_paths)
+
+    def run(self, skip_unchanged_stages=True):
+        stage_keys = {}
+        for stage in self.stages:
+            dependency_keys = {
+                dependency: stage_keys[dependency]
+                for dependency in stage.dependencies
+            }
+            manifest = self.read_manifest(stage)
+            if not stage.enabled:
+                # The results of a previous run (if any) are used by the
+                # following stages
+                logger.info("Stage disabled: " + stage.name)
+                stage_keys[stage.name] = None
+                if manifest is not None:
+                    stage_keys[stage.name] = manifest["key"]
+                continue
+
+            key = self.compute_key(stage, dependency_keys)
+            stage_keys[stage.name] = key
+            if (
+                skip_unchanged_stages
+                and manifest is not None
+                and manifest["key"] == key
+                and self._outputs_exist(stage)
+            ):
+                logger.info("Stage up to date: " + stage.name)
+                with trace_span(stage.name, category="stage", skipped=True):
+                    pass
+                continue
+
+            logger.info("Running stage: " + stage.name)
+            # Invalidate the manifest, in case the stage is interrupted
+            self.remove_manifest(stage)
+            with trace_span(stage.name, category="stage", skipped=False):
+                stage.callback()
+            self.write_manifest(stage, key)
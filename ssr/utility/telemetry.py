@@ -0,0 +1,217 @@
+import os
+import re
+import json
+import time
+import resource
+import threading
+from contextlib import contextmanager
+
+_telemetry = None
+
+# Unit of ru_inblock / ru_oublock
+_BLOCK_SIZE = 512
+
+_PROC_STATUS_FP = "/proc/self/status"
+_PROC_CLEAR_REFS_FP = "/proc/self/clear_refs"
+
+
+class Span:
+    """Section of the pipeline recorded by Telemetry.
+
+    Item counts (e.g. the number of processed images) can be added while
+    the span is active.
+    """
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = dict(args)
+        self.counts = {}
+        # Peak rss (in kilobytes) of the process during the span
+        self.peak_rss = 0
+
+    def set_count(self, count_name, value):
+        self.counts[count_name] = value
+
+    def add_count(self, count_name, value=1):
+        self.counts[count_name] = self.counts.get(count_name, 0) + value
+
+
+class Telemetry:
+    """Record the wall time and the resource usage of nested spans.
+
+    Each finished span is appended as a line to trace_ofp. The lines are
+    complete events of the Chrome trace event format (see
+    write_chrome_trace()). Besides the wall time, each event contains the
+    cpu time, the bytes read from / written to storage and the peak rss of
+    the process during the span, as well as the cpu time and the bytes of
+    the child processes (e.g. external tools) terminated during the span.
+
+    Spans of worker processes (e.g. of the TaskScheduler) are written to
+    the same file (with a different pid).
+
+    On Linux, the peak rss of each span is obtained by resetting the high
+    water mark of the process (VmHWM) at the start and at the end of each
+    span. Otherwise, the peak rss is the peak rss of the process so far.
+    """
+
+    def __init__(self, trace_ofp):
+        self.trace_ofp = trace_ofp
+        self._local = threading.local()
+        self.reset_peak_rss = self._reset_high_water_mark()
+
+    @staticmethod
+    def get_instance():
+        # Returns None, if no telemetry has been configured
+        return _telemetry
+
+    @staticmethod
+    def set_instance(telemetry):
+        global _telemetry
+        _telemetry = telemetry
+
+    def _get_span_stack(self):
+        if not hasattr(self._local, "span_stack"):
+            self._local.span_stack = []
+        return self._local.span_stack
+
+    @staticmethod
+    def _reset_high_water_mark():
+        # Sets VmHWM to the current rss (requires Linux 4.0)
+        try:
+            with open(_PROC_CLEAR_REFS_FP, "w") as clear_refs_file:
+                clear_refs_file.write("5")
+        except OSError:
+            return False
+        return True
+
+    @staticmethod
+    def _read_high_water_mark():
+        with open(_PROC_STATUS_FP) as status_file:
+            match = re.search(r"VmHWM:\s+(\d+)", status_file.read())
+        return int(match.group(1))
+
+    def _update_peak_rss(self, span_stack):
+        # The high water mark covers the time since the last reset, i.e. it
+        # is contained in all active spans
+        if self.reset_peak_rss:
+            peak_rss = self._read_high_water_mark()
+            self._reset_high_water_mark()
+        else:
+            peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        for active_span in span_stack:
+            active_span.peak_rss = max(active_span.peak_rss, peak_rss)
+
+    @staticmethod
+    def _get_resource_usage():
+        return (
+            resource.getrusage(resource.RUSAGE_SELF),
+            resource.getrusage(resource.RUSAGE_CHILDREN),
+        )
+
+    @contextmanager
+    def span(self, name, category="pipeline", **args):
+        span = Span(name, category, args)
+        span_stack = self._get_span_stack()
+        parent = "/".join(parent_span.name for parent_span in span_stack)
+        self._update_peak_rss(span_stack)
+        span_stack.append(span)
+        start_time = time.time()
+        start_self_usage, start_children_usage = self._get_resource_usage()
+        status = "failed"
+        try:
+            yield span
+            status = "ok"
+        finally:
+            end_time = time.time()
+            end_self_usage, end_children_usage = self._get_resource_usage()
+            self._update_peak_rss(span_stack)
+            span_stack.pop()
+            self._write_event(
+                span,
+                parent,
+                status,
+                start_time,
+                end_time,
+                (start_self_usage, end_self_usage),
+                (start_children_usage, end_children_usage),
+            )
+
+    @staticmethod
+    def _compute_usage_args(usages, prefix):
+        start_usage, end_usage = usages
+        return {
+            prefix
+            + "cpu_time": (end_usage.ru_utime + end_usage.ru_stime)
+            - (start_usage.ru_utime + start_usage.ru_stime),
+            prefix
+            + "bytes_read": (end_usage.ru_inblock - start_usage.ru_inblock)
+            * _BLOCK_SIZE,
+            prefix
+            + "bytes_written": (end_usage.ru_oublock - start_usage.ru_oublock)
+            * _BLOCK_SIZE,
+        }
+
+    def _write_event(
+        self,
+        span,
+        parent,
+        status,
+        start_time,
+        end_time,
+        self_usages,
+        children_usages,
+    ):
+        args = {"parent": parent, "status": status}
+        args.update(self._compute_usage_args(self_usages, ""))
+        args.update(self._compute_usage_args(children_usages, "children_"))
+        # The peak rss of external tools is stored by the ToolRunner (as
+        # tool_peak_rss_in_mb)
+        args["peak_rss_in_mb"] = span.peak_rss / 1024
+        args.update(span.counts)
+        args.update(span.args)
+        event = {
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            # Timestamps and durations in microseconds
+            "ts": int(start_time * 1e6),
+            "dur": int((end_time - start_time) * 1e6),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        os.makedirs(os.path.dirname(self.trace_ofp), exist_ok=True)
+        # A single write of a line in append mode (shared by the workers)
+        with open(self.trace_ofp, "a") as trace_file:
+            trace_file.write(json.dumps(event, default=str) + "\n")
+
+    def read_events(self):
+        if not os.path.isfile(self.trace_ofp):
+            return []
+        with open(self.trace_ofp) as trace_file:
+            return [json.loads(line) for line in trace_file if line.strip()]
+
+    def write_chrome_trace(self, trace_ofp=None):
+        """Write the events as json file (chrome://tracing, Perfetto)."""
+        if trace_ofp is None:
+            trace_ofp = os.path.splitext(self.trace_ofp)[0] + ".json"
+        trace = {"traceEvents": self.read_events(), "displayTimeUnit": "ms"}
+        with open(trace_ofp, "w") as trace_file:
+            json.dump(trace, trace_file)
+        return trace_ofp
+
+
+@contextmanager
+def trace_span(name, category="pipeline", **args):
+    """Record a span with the configured Telemetry (if any).
+
+    Yields a Span (also if no telemetry has been configured), i.e. item
+    counts can be added unconditionally.
+    """
+    telemetry = Telemetry.get_instance()
+    if telemetry is None:
+        yield Span(name, category, args)
+        return
+    with telemetry.span(name, category, **args) as span:
+        yield span
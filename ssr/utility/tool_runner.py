@@ -0,0 +1,316 @@
+import os
+import json
+import time
+import fcntl
+import signal
+import itertools
+import subprocess
+from contextlib import contextmanager
+from ssr.utility.logging_extension import logger
+from ssr.utility.telemetry import trace_span
+
+_runner = None
+
+
+class ToolCallStats:
+    def __init__(
+        self,
+        tool_name,
+        call,
+        returncode,
+        wall_time,
+        user_cpu_time,
+        system_cpu_time,
+        peak_rss_in_mb,
+        bytes_read,
+        bytes_written,
+        timed_out,
+        stdout_log_fp,
+        stderr_log_fp,
+    ):
+        self.tool_name = tool_name
+        self.call = call
+        self.returncode = returncode
+        self.wall_time = wall_time
+        self.user_cpu_time = user_cpu_time
+        self.system_cpu_time = system_cpu_time
+        self.peak_rss_in_mb = peak_rss_in_mb
+        self.bytes_read = bytes_read
+        self.bytes_written = bytes_written
+        self.timed_out = timed_out
+        self.stdout_log_fp = stdout_log_fp
+        self.stderr_log_fp = stderr_log_fp
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class ToolRunner:
+    """Run the external tools (OpenMVS, MVE, Colmap, ...) of the pipeline.
+
+    Each call is checked for its exit code (a failing call raises a
+    subprocess.CalledProcessError, a call exceeding its timeout a
+    subprocess.TimeoutExpired). If log_dp is given, stdout and stderr of
+    each call are written to separate log files in log_dp and the
+    statistics of each call (wall time, cpu time, peak rss and block I/O)
+    are appended to a json lines file. Otherwise, the output is written to
+    the console.
+
+    Calls of heavy tools acquire one of max_num_heavy_calls slots before
+    they are started. The slots are file locks in slot_dp, i.e. the limit
+    is shared by all processes (e.g. the workers of the TaskScheduler)
+    using the same slot_dp.
+    """
+
+    STATS_FN = "tool_calls.jsonl"
+
+    def __init__(
+        self,
+        log_dp=None,
+        timeouts=None,
+        default_timeout=None,
+        max_num_heavy_calls=None,
+        slot_dp=None,
+    ):
+        self.log_dp = log_dp
+        # Timeouts in seconds per tool name (i.e. the executable name)
+        if timeouts is None:
+            timeouts = {}
+        self.timeouts = timeouts
+        self.default_timeout = default_timeout
+        if max_num_heavy_calls is not None:
+            assert max_num_heavy_calls > 0
+        self.max_num_heavy_calls = max_num_heavy_calls
+        if slot_dp is None:
+            slot_dp = log_dp
+        assert max_num_heavy_calls is None or slot_dp is not None
+        self.slot_dp = slot_dp
+        self._call_counter = itertools.count()
+
+    @staticmethod
+    def get_instance():
+        # Returns a runner without logs and limits, if none has been
+        # configured
+        global _runner
+        if _runner is None:
+            _runner = ToolRunner()
+        return _runner
+
+    @staticmethod
+    def set_instance(runner):
+        global _runner
+        _runner = runner
+
+    @staticmethod
+    def get_tool_name(call):
+        return os.path.basename(str(call[0]))
+
+    def get_timeout(self, tool_name):
+        return self.timeouts.get(tool_name, self.default_timeout)
+
+    def _create_log_fps(self, tool_name):
+        if self.log_dp is None:
+            return None, None
+        os.makedirs(self.log_dp, exist_ok=True)
+        # The process id distinguishes the calls of different workers
+        log_stem = "{}_{}_{:04d}_{}".format(
+            time.strftime("%Y%m%d_%H%M%S"),
+            os.getpid(),
+            next(self._call_counter),
+            tool_name,
+        )
+        return (
+            os.path.join(self.log_dp, log_stem + ".stdout.log"),
+            os.path.join(self.log_dp, log_stem + ".stderr.log"),
+        )
+
+    @contextmanager
+    def _acquire_slot(self, heavy, poll_interval=1.0):
+        if not heavy or self.max_num_heavy_calls is None:
+            yield
+            return
+        os.makedirs(self.slot_dp, exist_ok=True)
+        logged = False
+        while True:
+            for slot_index in range(self.max_num_heavy_calls):
+                slot_fp = os.path.join(
+                    self.slot_dp, "heavy_slot_{}.lock".format(slot_index)
+                )
+                slot_file = open(slot_fp, "a")
+                try:
+                    fcntl.flock(slot_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    slot_file.close()
+                    continue
+                try:
+                    yield
+                finally:
+                    fcntl.flock(slot_file, fcntl.LOCK_UN)
+                    slot_file.close()
+                return
+            if not logged:
+                logger.info("Waiting for a free slot for heavy tools")
+                logged = True
+            time.sleep(poll_interval)
+
+    @staticmethod
+    def _start(call, cwd, stdin_input, stdout=None, stderr=None):
+        process = subprocess.Popen(
+            call,
+            cwd=cwd,
+            stdin=None if stdin_input is None else subprocess.PIPE,
+            stdout=stdout,
+            stderr=stderr,
+        )
+        if stdin_input is not None:
+            # The output of the tool does not pass through a pipe, i.e.
+            # writing the input can not deadlock
+            try:
+                process.stdin.write(stdin_input)
+                process.stdin.close()
+            except BrokenPipeError:
+                # The tool exited early, i.e. the exit code is checked
+                pass
+        return process
+
+    @staticmethod
+    def _wait(process, timeout, max_poll_interval=0.5):
+        # Use wait4() instead of Popen.wait() to obtain the resource usage
+        # of the (terminated) child process
+        start_time = time.monotonic()
+        poll_interval = 0.01
+        timed_out = False
+        while True:
+            pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+            if pid != 0:
+                break
+            if timeout is not None and time.monotonic() - start_time > timeout:
+                process.send_signal(signal.SIGKILL)
+                pid, status, rusage = os.wait4(process.pid, 0)
+                timed_out = True
+                break
+            time.sleep(poll_interval)
+            poll_interval = min(2 * poll_interval, max_poll_interval)
+        # Same convention as Popen.returncode (os.waitstatus_to_exitcode()
+        # requires Python 3.9)
+        if os.WIFSIGNALED(status):
+            process.returncode = -os.WTERMSIG(status)
+        else:
+            assert os.WIFEXITED(status)
+            process.returncode = os.WEXITSTATUS(status)
+        return rusage, timed_out
+
+    def _write_stats(self, stats):
+        if self.log_dp is None:
+            return
+        stats_fp = os.path.join(self.log_dp, self.STATS_FN)
+        # A single write of a line in append mode (shared by the workers)
+        with open(stats_fp, "a") as stats_file:
+            stats_file.write(json.dumps(stats.to_dict()) + "\n")
+
+    @staticmethod
+    def _remove_outputs(output_paths):
+        # Prevents lazy runs from reusing the results of a failed call
+        for output_path in output_paths:
+            if os.path.isfile(output_path):
+                logger.vinfo("Removing output of failed call", output_path)
+                os.remove(output_path)
+
+    def run(
+        self,
+        call,
+        heavy=False,
+        timeout=None,
+        cwd=None,
+        check=True,
+        remove_on_failure=(),
+        stdin_input=None,
+    ):
+        """Run the call (a list of strings) and return its ToolCallStats.
+
+        If timeout is None, the timeout configured for the tool is used.
+        The files in remove_on_failure are removed, if the call fails.
+        If given, stdin_input (bytes) is written to the stdin of the tool.
+        """
+        call = [str(arg) for arg in call]
+        tool_name = self.get_tool_name(call)
+        if timeout is None:
+            timeout = self.get_timeout(tool_name)
+        stdout_log_fp, stderr_log_fp = self._create_log_fps(tool_name)
+
+        with trace_span(tool_name, category="tool", heavy=heavy) as span:
+            logger.vinfo("call", call)
+            with self._acquire_slot(heavy):
+                start_time = time.monotonic()
+                if stdout_log_fp is None:
+                    process = self._start(call, cwd, stdin_input)
+                    rusage, timed_out = self._wait(process, timeout)
+                else:
+                    # The tool writes directly to the files, i.e. the output
+                    # does not pass through (and can not block) this process
+                    with open(stdout_log_fp, "wb") as stdout_file, open(
+                        stderr_log_fp, "wb"
+                    ) as stderr_file:
+                        process = self._start(
+                            call,
+                            cwd,
+                            stdin_input,
+                            stdout=stdout_file,
+                            stderr=stderr_file,
+                        )
+                        rusage, timed_out = self._wait(process, timeout)
+                wall_time = time.monotonic() - start_time
+
+            stats = ToolCallStats(
+                tool_name,
+                call,
+                process.returncode,
+                wall_time,
+                rusage.ru_utime,
+                rusage.ru_stime,
+                # On Linux, ru_maxrss is given in kilobytes
+                rusage.ru_maxrss / 1024,
+                # Block I/O, given in units of 512 bytes
+                rusage.ru_inblock * 512,
+                rusage.ru_oublock * 512,
+                timed_out,
+                stdout_log_fp,
+                stderr_log_fp,
+            )
+            self._write_stats(stats)
+            # The cpu time and the bytes of the tool are contained in the
+            # children_* values of the span
+            span.args.update(
+                {
+                    "returncode": process.returncode,
+                    "timed_out": timed_out,
+                    "tool_peak_rss_in_mb": stats.peak_rss_in_mb,
+                    "stderr_log_fp": stderr_log_fp,
+                }
+            )
+            logger.info(
+                "{} finished (returncode: {}, wall time: {:.1f}s, cpu time: "
+                "{:.1f}s, peak rss: {:.0f} MB)".format(
+                    tool_name,
+                    process.returncode,
+                    wall_time,
+                    rusage.ru_utime + rusage.ru_stime,
+                    stats.peak_rss_in_mb,
+                )
+            )
+
+            if timed_out or (check and process.returncode != 0):
+                if stderr_log_fp is not None:
+                    logger.vinfo("stdout_log_fp", stdout_log_fp)
+                    logger.vinfo("stderr_log_fp", stderr_log_fp)
+                self._remove_outputs(remove_on_failure)
+            if timed_out:
+                raise subprocess.TimeoutExpired(call, timeout)
+            if check and process.returncode != 0:
+                raise subprocess.CalledProcessError(process.returncode, call)
+            return stats
+
+
+def run_tool(call, **kwargs):
+    """Run the call with the configured ToolRunner (see ToolRunner.run())."""
+    return ToolRunner.get_instance().run(call, **kwargs)